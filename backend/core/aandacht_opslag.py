@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Aandacht opslag module voor Focus Tuin
+Append-only tijdreeks van gaze samples met seconde/minuut rollups en bezoeken
+"""
+
+import os
+import glob
+import mmap
+import struct
+import threading
+import time
+import numpy as np
+from .configuratie import OPSLAG_CONFIG
+
+# Ruw sample: tijd_ms, x, y, confidence, vlaggen, gezicht_id (28 bytes)
+RUW_RECORD = struct.Struct('<dfffBxxxI')
+RUW_DTYPE = np.dtype([
+    ('tijd_ms', '<f8'), ('x', '<f4'), ('y', '<f4'), ('confidence', '<f4'),
+    ('vlaggen', 'u1'), ('_pad', 'V3'), ('gezicht_id', '<u4')
+])
+
+# Versie 1 bewaarde gezicht_id als een byte (na 256 bezoekers liepen IDs door elkaar); alleen lezen
+RUW_DTYPE_V1 = np.dtype([
+    ('tijd_ms', '<f8'), ('x', '<f4'), ('y', '<f4'), ('confidence', '<f4'),
+    ('vlaggen', 'u1'), ('gezicht_id', 'u1'), ('_pad', 'V2')
+])
+
+# Segment header: magic, versie, record grootte, capaciteit, aantal, start_ms
+SEGMENT_HEADER = struct.Struct('<4sHHIId')
+SEGMENT_MAGIC = b'AIRS'
+SEGMENT_VERSIE = 2
+SEGMENT_DTYPES = {1: RUW_DTYPE_V1, SEGMENT_VERSIE: RUW_DTYPE}
+
+# Rollup record: bucket start, samples, samples met gezicht, confidence som, dwell
+ROLLUP_RECORD = struct.Struct('<qIIdd')
+ROLLUP_DTYPE = np.dtype([
+    ('start_ms', '<i8'), ('samples', '<u4'), ('gezicht_samples', '<u4'),
+    ('confidence_som', '<f8'), ('dwell_ms', '<f8')
+])
+
+# Bezoek record: start, eind, samples, gezicht_id, confidence som, dwell
+BEZOEK_RECORD = struct.Struct('<qqIIdd')
+BEZOEK_DTYPE = np.dtype([
+    ('start_ms', '<i8'), ('eind_ms', '<i8'), ('samples', '<u4'), ('gezicht_id', '<u4'),
+    ('confidence_som', '<f8'), ('dwell_ms', '<f8')
+])
+
+VLAG_GEZICHT = 0x01
+VLAG_IRIS = 0x02
+
+RESOLUTIES = {"seconde": 1000, "minuut": 60000}
+DAG_MS = 24 * 3600 * 1000
+
+
+class _Segment:
+    """Geheugen-gemapt segment bestand met vaste capaciteit"""
+
+    def __init__(self, pad, capaciteit=None, start_ms=0.0):
+        self.pad = pad
+        nieuw = not os.path.exists(pad)
+
+        if nieuw:
+            grootte = SEGMENT_HEADER.size + capaciteit * RUW_RECORD.size
+            with open(pad, 'wb') as f:
+                f.truncate(grootte)
+
+        self._bestand = open(pad, 'r+b')
+        self.mm = mmap.mmap(self._bestand.fileno(), 0)
+
+        if nieuw:
+            self.capaciteit = capaciteit
+            self.aantal = 0
+            self.start_ms = start_ms
+            self.dtype = RUW_DTYPE
+            self._schrijf_header()
+        else:
+            magic, versie, record_grootte, self.capaciteit, self.aantal, self.start_ms = \
+                SEGMENT_HEADER.unpack_from(self.mm, 0)
+            self.dtype = SEGMENT_DTYPES.get(versie)
+            if magic != SEGMENT_MAGIC or self.dtype is None or record_grootte != self.dtype.itemsize:
+                self.sluit()
+                raise ValueError(f"Onbekend segment formaat: {pad}")
+
+    def _schrijf_header(self):
+        SEGMENT_HEADER.pack_into(self.mm, 0, SEGMENT_MAGIC, SEGMENT_VERSIE, RUW_RECORD.size,
+                                 self.capaciteit, self.aantal, self.start_ms)
+
+    @property
+    def is_vol(self):
+        return self.aantal >= self.capaciteit
+
+    @property
+    def verouderd(self):
+        """Segment in een oud formaat: wel te lezen, niet meer aan te vullen"""
+        return self.dtype is not RUW_DTYPE
+
+    def voeg_toe(self, tijd_ms, x, y, confidence, vlaggen, gezicht_id):
+        """Schrijf een record en werk de teller in de header bij"""
+        offset = SEGMENT_HEADER.size + self.aantal * RUW_RECORD.size
+        RUW_RECORD.pack_into(self.mm, offset, tijd_ms, x, y, confidence, vlaggen, gezicht_id)
+        self.aantal += 1
+        # Teller staat op vaste positie achter magic/versie/grootte/capaciteit
+        struct.pack_into('<I', self.mm, 12, self.aantal)
+
+    def lees(self):
+        """Geef een kopie van alle geschreven records, altijd in het huidige formaat"""
+        records = np.frombuffer(self.mm, dtype=self.dtype, count=self.aantal, offset=SEGMENT_HEADER.size)
+        if not self.verouderd:
+            return records.copy()
+        omgezet = np.zeros(self.aantal, dtype=RUW_DTYPE)
+        for veld in ('tijd_ms', 'x', 'y', 'confidence', 'vlaggen', 'gezicht_id'):
+            omgezet[veld] = records[veld]
+        return omgezet
+
+    def sluit(self):
+        if self.mm is not None:
+            self.mm.flush()
+            self.mm.close()
+            self.mm = None
+        self._bestand.close()
+
+
+class _Bucket:
+    """Accumulator voor een open rollup periode"""
+    __slots__ = ('start_ms', 'samples', 'gezicht_samples', 'confidence_som', 'dwell_ms')
+
+    def __init__(self, start_ms):
+        self.start_ms = start_ms
+        self.samples = 0
+        self.gezicht_samples = 0
+        self.confidence_som = 0.0
+        self.dwell_ms = 0.0
+
+    def als_record(self):
+        return ROLLUP_RECORD.pack(self.start_ms, self.samples, self.gezicht_samples,
+                                  self.confidence_som, self.dwell_ms)
+
+    def als_rij(self):
+        return np.array([(self.start_ms, self.samples, self.gezicht_samples,
+                          self.confidence_som, self.dwell_ms)], dtype=ROLLUP_DTYPE)
+
+
+class AandachtOpslag:
+    """Embedded tijdreeks opslag voor gaze samples met voorberekende rollups"""
+
+    def __init__(self, map_pad=None, segment_records=None, max_segmenten=None, compactie=True):
+        self.map_pad = map_pad or OPSLAG_CONFIG['map']
+        self.segment_records = segment_records or OPSLAG_CONFIG['segment_records']
+        self.max_segmenten = max_segmenten or OPSLAG_CONFIG['max_segmenten']
+        self.max_sample_gat_ms = OPSLAG_CONFIG['max_sample_gat_ms']
+        self.bezoek_gat_ms = OPSLAG_CONFIG['bezoek_gat_ms']
+
+        os.makedirs(self.map_pad, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self._segment = self._open_laatste_segment()
+        self._rollup_bestanden = {
+            naam: open(os.path.join(self.map_pad, f"rollup_{naam}.bin"), 'ab')
+            for naam in RESOLUTIES
+        }
+        self._bezoek_bestand = open(os.path.join(self.map_pad, "bezoeken.bin"), 'ab')
+
+        # Open rollup periodes en per-gezicht toestand
+        self._open_buckets = {naam: None for naam in RESOLUTIES}
+        self._vorige_gezicht_tijd = {}
+        self._open_bezoeken = {}
+
+        # Compactie van rollups en bezoeken buiten het schrijfpad (voeg_toe)
+        self._stop = threading.Event()
+        if compactie:
+            threading.Thread(target=self._compactie_loop, name="opslag-compactie", daemon=True).start()
+
+    # ---- Segmenten ----
+
+    def _segment_paden(self):
+        return sorted(glob.glob(os.path.join(self.map_pad, "segment_*.bin")))
+
+    def _open_laatste_segment(self):
+        paden = self._segment_paden()
+        if paden:
+            try:
+                segment = _Segment(paden[-1])
+                if not segment.is_vol and not segment.verouderd:
+                    return segment
+                segment.sluit()
+            except ValueError as e:
+                print(f"Segment overgeslagen: {e}")
+        return None
+
+    def _nieuw_segment(self, tijd_ms):
+        if self._segment is not None:
+            self._segment.sluit()
+        pad = os.path.join(self.map_pad, f"segment_{int(tijd_ms):016d}.bin")
+        self._segment = _Segment(pad, self.segment_records, tijd_ms)
+
+        # Rotatie: verwijder oudste segmenten boven het maximum
+        paden = self._segment_paden()
+        te_oud = paden[:max(0, len(paden) - self.max_segmenten)]
+        for oud_pad in te_oud:
+            try:
+                os.remove(oud_pad)
+            except OSError as e:
+                print(f"Kan oud segment niet verwijderen: {e}")
+
+    @staticmethod
+    def _segment_start(pad):
+        return float(os.path.basename(pad)[8:-4])
+
+    # ---- Retentie van rollups en bezoeken ----
+
+    def _compactie_loop(self):
+        while not self._stop.wait(OPSLAG_CONFIG['compactie_interval_s']):
+            try:
+                self.compacteer()
+            except OSError as e:
+                print(f"Compactie van de aandacht opslag mislukt: {e}")
+
+    def compacteer(self, nu_ms=None):
+        """Verwijder rollups en bezoeken ouder dan hun bewaartermijn (eigen termijn per bestand).
+
+        Het lezen en herschrijven gebeurt buiten de opslag lock; alleen het overnemen
+        van records die intussen zijn bijgeschreven en het wisselen van bestand niet.
+        """
+        nu_ms = time.time() * 1000 if nu_ms is None else nu_ms
+        for naam, dagen in OPSLAG_CONFIG['rollup_bewaar_dagen'].items():
+            self._compacteer_bestand(f"rollup_{naam}.bin", ROLLUP_DTYPE, 'start_ms', nu_ms - dagen * DAG_MS, naam)
+        self._compacteer_bestand("bezoeken.bin", BEZOEK_DTYPE, 'eind_ms',
+                                 nu_ms - OPSLAG_CONFIG['bezoek_bewaar_dagen'] * DAG_MS, None)
+
+    def _compacteer_bestand(self, bestandsnaam, dtype, veld, grens_ms, rollup):
+        pad = os.path.join(self.map_pad, bestandsnaam)
+        rijen = self._lees_vast_bestand(pad, dtype)
+        masker = rijen[veld] >= grens_ms
+        if masker.all():
+            return
+        momentopname = len(rijen)
+        bewaard = np.array(rijen[masker])
+        del rijen  # Memmap loslaten voor het vervangen
+
+        tijdelijk = pad + ".tmp"
+        f = open(tijdelijk, 'wb')
+        f.write(bewaard.tobytes())
+        with self._lock:
+            if self._stop.is_set():
+                f.close()
+                os.remove(tijdelijk)  # Opslag intussen gesloten
+                return
+            # Records die na de momentopname zijn toegevoegd gaan mee
+            with open(pad, 'rb') as oud:
+                oud.seek(momentopname * dtype.itemsize)
+                f.write(oud.read())
+            f.close()
+            if rollup:
+                self._rollup_bestanden[rollup].close()
+            else:
+                self._bezoek_bestand.close()
+            os.replace(tijdelijk, pad)
+            if rollup:
+                self._rollup_bestanden[rollup] = open(pad, 'ab')
+            else:
+                self._bezoek_bestand = open(pad, 'ab')
+        print(f"Aandacht opslag: {momentopname - len(bewaard)} records uit {bestandsnaam} verlopen")
+
+    # ---- Schrijven ----
+
+    def voeg_toe(self, tijd_ms, oog_data=None, gezicht_id=0):
+        """Voeg een sample toe; oog_data None betekent geen gezicht in beeld"""
+        if oog_data:
+            x = oog_data.get('x', 0.0)
+            y = oog_data.get('y', 0.0)
+            confidence = oog_data.get('confidence', 0.0)
+            vlaggen = (VLAG_GEZICHT if oog_data.get('gezicht_gevonden', False) else 0) | \
+                      (VLAG_IRIS if oog_data.get('iris_detectie', False) else 0)
+        else:
+            x = y = confidence = 0.0
+            vlaggen = 0
+        gezicht = bool(vlaggen & VLAG_GEZICHT)
+
+        with self._lock:
+            if self._segment is None or self._segment.is_vol:
+                self._nieuw_segment(tijd_ms)
+            self._segment.voeg_toe(tijd_ms, x, y, confidence, vlaggen, gezicht_id)
+
+            # Dwell: tijd sinds vorige sample van hetzelfde gezicht, zonder lange gaten
+            dwell = 0.0
+            if gezicht:
+                vorige = self._vorige_gezicht_tijd.get(gezicht_id)
+                if vorige is not None and 0 < tijd_ms - vorige <= self.max_sample_gat_ms:
+                    dwell = tijd_ms - vorige
+                self._vorige_gezicht_tijd[gezicht_id] = tijd_ms
+
+            for naam, breedte in RESOLUTIES.items():
+                bucket = self._bucket_voor(naam, int(tijd_ms // breedte) * breedte)
+                bucket.samples += 1
+                if gezicht:
+                    bucket.gezicht_samples += 1
+                    bucket.confidence_som += confidence
+                    bucket.dwell_ms += dwell
+
+            self._werk_bezoeken_bij(tijd_ms, gezicht, gezicht_id, confidence, dwell)
+
+    def _bucket_voor(self, naam, start_ms):
+        bucket = self._open_buckets[naam]
+        if bucket is not None and bucket.start_ms == start_ms:
+            return bucket
+        if bucket is not None:
+            self._schrijf_bucket(naam, bucket)
+        bucket = self._open_buckets[naam] = _Bucket(start_ms)
+        return bucket
+
+    def _schrijf_bucket(self, naam, bucket):
+        bestand = self._rollup_bestanden[naam]
+        bestand.write(bucket.als_record())
+        bestand.flush()
+
+    def _werk_bezoeken_bij(self, tijd_ms, gezicht, gezicht_id, confidence, dwell):
+        # Sluit bezoeken waarvan het gezicht te lang weg is
+        for gid, bezoek in list(self._open_bezoeken.items()):
+            if tijd_ms - bezoek['eind_ms'] > self.bezoek_gat_ms:
+                self._schrijf_bezoek(gid, self._open_bezoeken.pop(gid))
+
+        if not gezicht:
+            return
+
+        bezoek = self._open_bezoeken.get(gezicht_id)
+        if bezoek is None:
+            bezoek = self._open_bezoeken[gezicht_id] = {
+                'start_ms': tijd_ms, 'eind_ms': tijd_ms, 'samples': 0,
+                'confidence_som': 0.0, 'dwell_ms': 0.0
+            }
+        bezoek['eind_ms'] = tijd_ms
+        bezoek['samples'] += 1
+        bezoek['confidence_som'] += confidence
+        bezoek['dwell_ms'] += dwell
+
+    def _schrijf_bezoek(self, gezicht_id, bezoek):
+        self._bezoek_bestand.write(BEZOEK_RECORD.pack(
+            int(bezoek['start_ms']), int(bezoek['eind_ms']), bezoek['samples'], gezicht_id,
+            bezoek['confidence_som'], bezoek['dwell_ms']
+        ))
+        self._bezoek_bestand.flush()
+
+    # ---- Lezen ----
+
+    @staticmethod
+    def _lees_vast_bestand(pad, dtype):
+        """Map een bestand met vaste records read-only in als numpy array"""
+        if not os.path.exists(pad):
+            return np.empty(0, dtype=dtype)
+        aantal = os.path.getsize(pad) // dtype.itemsize
+        if aantal == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(pad, dtype=dtype, mode='r', shape=(aantal,))
+
+    def _rollup_rijen(self, naam, start_ms, eind_ms):
+        """Rollup rijen met bucket start in [start_ms, eind_ms), inclusief open bucket"""
+        rijen = self._lees_vast_bestand(os.path.join(self.map_pad, f"rollup_{naam}.bin"), ROLLUP_DTYPE)
+        # Buckets worden op volgorde geschreven, dus binair zoeken volstaat
+        begin, eind = np.searchsorted(rijen['start_ms'], [start_ms, eind_ms], side='left')
+        selectie = np.array(rijen[begin:eind])
+
+        bucket = self._open_buckets[naam]
+        if bucket is not None and start_ms <= bucket.start_ms < eind_ms:
+            selectie = np.concatenate([selectie, bucket.als_rij()])
+        return selectie
+
+    def rollups(self, start_ms, eind_ms, resolutie="seconde"):
+        """Geef rollup buckets binnen een tijdsbereik als lijst van dicts"""
+        if resolutie not in RESOLUTIES:
+            raise ValueError(f"Onbekende resolutie: {resolutie}")
+        with self._lock:
+            rijen = self._rollup_rijen(resolutie, start_ms, eind_ms)
+        return [self._als_statistiek(rij['start_ms'], rij['samples'], rij['gezicht_samples'],
+                                     rij['confidence_som'], rij['dwell_ms'])
+                for rij in rijen]
+
+    def statistieken(self, start_ms, eind_ms):
+        """Totale statistieken over een bereik: volle minuten uit minuut rollups, randen uit seconden"""
+        minuut = RESOLUTIES['minuut']
+        eerste_minuut = -(-int(start_ms) // minuut) * minuut
+        laatste_minuut = int(eind_ms) // minuut * minuut
+
+        with self._lock:
+            if eerste_minuut < laatste_minuut:
+                delen = [
+                    self._rollup_rijen('seconde', start_ms, eerste_minuut),
+                    self._rollup_rijen('minuut', eerste_minuut, laatste_minuut),
+                    self._rollup_rijen('seconde', laatste_minuut, eind_ms)
+                ]
+            else:
+                delen = [self._rollup_rijen('seconde', start_ms, eind_ms)]
+        rijen = np.concatenate(delen)
+
+        return self._als_statistiek(
+            int(start_ms), int(rijen['samples'].sum()), int(rijen['gezicht_samples'].sum()),
+            float(rijen['confidence_som'].sum()), float(rijen['dwell_ms'].sum()),
+            eind_ms=int(eind_ms)
+        )
+
+    @staticmethod
+    def _als_statistiek(start_ms, samples, gezicht_samples, confidence_som, dwell_ms, eind_ms=None):
+        statistiek = {
+            'start_ms': int(start_ms),
+            'samples': int(samples),
+            'gezicht_ratio': float(gezicht_samples) / samples if samples else 0.0,
+            'gem_confidence': float(confidence_som) / gezicht_samples if gezicht_samples else 0.0,
+            'dwell_ms': float(dwell_ms)
+        }
+        if eind_ms is not None:
+            statistiek['eind_ms'] = eind_ms
+        return statistiek
+
+    def bezoeken(self, start_ms, eind_ms):
+        """Afgesloten en lopende bezoeken die overlappen met het bereik"""
+        with self._lock:
+            rijen = self._lees_vast_bestand(os.path.join(self.map_pad, "bezoeken.bin"), BEZOEK_DTYPE)
+            masker = (rijen['eind_ms'] >= start_ms) & (rijen['start_ms'] < eind_ms)
+            resultaat = [{
+                'start_ms': int(rij['start_ms']),
+                'eind_ms': int(rij['eind_ms']),
+                'gezicht_id': int(rij['gezicht_id']),
+                'samples': int(rij['samples']),
+                'gem_confidence': float(rij['confidence_som']) / int(rij['samples']) if rij['samples'] else 0.0,
+                'dwell_ms': float(rij['dwell_ms'])
+            } for rij in rijen[masker]]
+
+            for gezicht_id, bezoek in self._open_bezoeken.items():
+                if bezoek['eind_ms'] >= start_ms and bezoek['start_ms'] < eind_ms:
+                    resultaat.append({
+                        'start_ms': int(bezoek['start_ms']),
+                        'eind_ms': int(bezoek['eind_ms']),
+                        'gezicht_id': gezicht_id,
+                        'samples': bezoek['samples'],
+                        'gem_confidence': bezoek['confidence_som'] / bezoek['samples'],
+                        'dwell_ms': bezoek['dwell_ms'],
+                        'lopend': True
+                    })
+        return resultaat
+
+    def lees_samples(self, start_ms, eind_ms):
+        """Lees ruwe samples uit de segmenten (voor analyse en herverwerking)"""
+        delen = []
+        with self._lock:
+            paden = self._segment_paden()
+            starts = [self._segment_start(p) for p in paden]
+            for i, pad in enumerate(paden):
+                volgende_start = starts[i + 1] if i + 1 < len(paden) else float('inf')
+                if starts[i] >= eind_ms or volgende_start <= start_ms:
+                    continue
+                if self._segment is not None and pad == self._segment.pad:
+                    records = self._segment.lees()
+                else:
+                    segment = _Segment(pad)
+                    records = segment.lees()
+                    segment.sluit()
+                masker = (records['tijd_ms'] >= start_ms) & (records['tijd_ms'] < eind_ms)
+                delen.append(records[masker])
+        return np.concatenate(delen) if delen else np.empty(0, dtype=RUW_DTYPE)
+
+    def sluit(self):
+        """Schrijf open buckets en bezoeken weg en sluit alle bestanden"""
+        self._stop.set()
+        with self._lock:
+            for naam, bucket in self._open_buckets.items():
+                if bucket is not None:
+                    self._schrijf_bucket(naam, bucket)
+                self._open_buckets[naam] = None
+            for gezicht_id, bezoek in self._open_bezoeken.items():
+                self._schrijf_bezoek(gezicht_id, bezoek)
+            self._open_bezoeken.clear()
+
+            if self._segment is not None:
+                self._segment.sluit()
+                self._segment = None
+            for bestand in self._rollup_bestanden.values():
+                bestand.close()
+            self._bezoek_bestand.close()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+ASCII palet module voor Focus Tuin
+Kwantiseert de luminance grid server-side naar kant-en-klare ASCII rijen per palet
+"""
+
+import numpy as np
+
+MAX_PALET_LENGTE = 64
+MAX_PALETTEN = 16  # Cache grens; paletten komen van clients
+
+
+def controleer_palet(palet):
+    """ValueError als het palet niet als een byte per karakter verstuurd kan worden"""
+    if not isinstance(palet, str) or not 2 <= len(palet) <= MAX_PALET_LENGTE:
+        raise ValueError(f"Palet moet 2 tot {MAX_PALET_LENGTE} karakters hebben")
+    if any(ord(karakter) > 255 for karakter in palet):
+        raise ValueError("Palet mag alleen Latin-1 karakters bevatten")
+    return palet
+
+
+def maak_lut(palet):
+    """Lookup table luminance (0-255) -> karakter byte, zelfde afronding als de frontend"""
+    index = np.floor(np.arange(256) / 255 * (len(palet) - 1)).astype(np.intp)
+    return np.frombuffer(palet.encode('latin-1'), dtype=np.uint8)[index]
+
+
+class PaletKwantiseerder:
+    """Per palet een LUT en een vaste uitvoer buffer; een keer per frame per palet"""
+
+    def __init__(self):
+        self.luts = {}
+        self.buffers = {}
+
+    def lut(self, palet):
+        lut = self.luts.get(palet)
+        if lut is None:
+            if len(self.luts) >= MAX_PALETTEN:
+                self.luts.clear()
+                self.buffers.clear()
+            lut = self.luts[palet] = maak_lut(palet)
+        return lut
+
+    def rijen(self, grid, palet):
+        """Luminance grid (uint8, hoogte x breedte) naar een string per rij"""
+        uit = self.buffers.get(palet)
+        if uit is None or uit.shape != grid.shape:
+            uit = self.buffers[palet] = np.empty(grid.shape, dtype=np.uint8)
+        np.take(self.lut(palet), grid, out=uit)
+        tekst = uit.tobytes().decode('latin-1')
+        breedte = grid.shape[1]
+        return [tekst[i:i + breedte] for i in range(0, len(tekst), breedte)]
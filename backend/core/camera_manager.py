@@ -4,10 +4,14 @@ Generieke Windows camera detectie en beheer met echte apparaatnamen
 """
 
 import cv2
+import os
+import json
 import time
 import platform
 import subprocess
 import re
+from .configuratie import CAMERA_CONFIG, CAPTURE_CONFIG, PERFORMANCE_CONFIG
+from .native_lock import native_lock, native_rlock
 
 class CameraDetectie:
     def __init__(self):
@@ -17,6 +21,28 @@ class CameraDetectie:
         self.is_windows = platform.system() == "Windows"
         self.device_namen = {}
         
+        # Herbruikbare frame buffers (capture en spiegeling)
+        self._frame_buffer = None
+        self._spiegel_buffer = None
+        self.spiegel_pixels = not CAMERA_CONFIG['spiegel_in_landmarks']
+        
+        # Monotone tijd (ms) waarop het laatste frame van de sensor is opgehaald
+        self.laatste_capture_ms = None
+        
+        # Een capture wordt nooit vrijgegeven terwijl een thread er nog uit leest (bijv.
+        # een in grab() hangende capture thread van de waakhond); die geeft hem zelf vrij.
+        # Lezen en starten lopen via de native thread pool (async_modus.blokkerend): OS locks
+        self._lees_lock = native_lock()
+        self._lezers = {}       # id(capture) -> aantal threads in grab/retrieve
+        self._uitgesteld = {}   # id(capture) -> capture die de laatste lezer vrijgeeft
+        self._start_lock = native_rlock()  # Herstel en camera wissel openen niet tegelijk
+        
+        # Gekozen capture formaat per camera naam, bewaard tussen herstarts
+        self.formaat_cache = self._laad_formaat_cache()
+        
+        # Resolutie en fps uit het actieve prestatie profiel (None = onderhandeld formaat)
+        self.profiel_formaat = None
+        
     def zoek_cameras(self):
         """Zoek alle beschikbare cameras op Windows systeem"""
         self.beschikbare_cameras = []
@@ -68,13 +94,16 @@ class CameraDetectie:
             
             # Probeer een vriendelijke naam te krijgen
             camera_naam = self._krijg_camera_naam(index)
+            sleutel = self._apparaat_sleutel(index, camera_naam)
             
             return {
                 "index": index,
                 "naam": camera_naam,
+                "apparaat_sleutel": sleutel,
                 "resolutie": f"{w}x{h}",
                 "fps": int(fps),
-                "werkt": True
+                "werkt": True,
+                "formaat": self.formaat_cache.get(sleutel)
             }
             
         except Exception as e:
@@ -184,12 +213,256 @@ class CameraDetectie:
         else:
             return f"Camera {index}"
             
+    def _apparaat_sleutel(self, index, camera_naam=None):
+        """Stabiele sleutel voor de formaat cache: het apparaat, niet de index.
+        
+        Op Linux naam, USB vendor:product en serienummer (of USB poort) uit sysfs;
+        elders de echte apparaatnaam. De generieke "Camera N" zegt niets over het
+        apparaat en valt terug op de naam, waarna een mislukt formaat opnieuw onderhandeld wordt.
+        """
+        camera_naam = camera_naam or self._krijg_camera_naam(index)
+        sysfs = f"/sys/class/video4linux/video{index}"
+        if not os.path.isdir(sysfs):
+            return camera_naam
+            
+        def lees(pad):
+            try:
+                with open(pad, 'r', encoding='utf-8') as f:
+                    return f.read().strip()
+            except OSError:
+                return None
+                
+        naam = lees(os.path.join(sysfs, "name")) or camera_naam
+        apparaat = os.path.realpath(os.path.join(sysfs, "device"))
+        # Omhoog naar het USB apparaat (de map met idVendor)
+        usb = apparaat
+        while usb != "/" and not os.path.exists(os.path.join(usb, "idVendor")):
+            usb = os.path.dirname(usb)
+        if usb == "/":
+            return f"{naam}|{apparaat}"
+        vendor_product = f"{lees(os.path.join(usb, 'idVendor'))}:{lees(os.path.join(usb, 'idProduct'))}"
+        serie = lees(os.path.join(usb, "serial")) or os.path.basename(usb)
+        return f"{naam}|{vendor_product}|{serie}"
+        
+    def _sleutel_voor(self, index):
+        camera_info = next((c for c in self.beschikbare_cameras if c['index'] == index), None)
+        if camera_info is not None and camera_info.get("apparaat_sleutel"):
+            return camera_info, camera_info["apparaat_sleutel"]
+        return camera_info, self._apparaat_sleutel(index, camera_info['naam'] if camera_info else None)
+            
+    def _laad_formaat_cache(self):
+        pad = CAPTURE_CONFIG['cache_bestand']
+        if not os.path.exists(pad):
+            return {}
+        try:
+            with open(pad, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Camera formaat cache {pad} kan niet geladen worden: {e}")
+            return {}
+            
+    def _bewaar_formaat_cache(self):
+        pad = CAPTURE_CONFIG['cache_bestand']
+        os.makedirs(os.path.dirname(pad) or ".", exist_ok=True)
+        tijdelijk = f"{pad}.{int(time.time() * 1000)}.tmp"
+        with open(tijdelijk, 'w', encoding='utf-8') as f:
+            json.dump(self.formaat_cache, f, indent=2)
+        os.replace(tijdelijk, pad)  # Atomisch, geen half geschreven cache
+        
+    @staticmethod
+    def _fourcc_tekst(waarde):
+        waarde = int(waarde)
+        tekst = "".join(chr((waarde >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ")
+        return tekst if tekst.isalnum() and tekst.isascii() else ""
+        
+    @staticmethod
+    def _pas_formaat_toe(cap, fourcc, breedte, hoogte, fps):
+        # FOURCC eerst: sommige drivers bepalen de toegestane resoluties per formaat
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, breedte)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, hoogte)
+        cap.set(cv2.CAP_PROP_FPS, fps)
+        
+    def _meet_formaat(self, cap, fourcc, breedte, hoogte, fps):
+        """Stel een kandidaat in en meet geleverde fps en decodeertijd; None als niet ondersteund"""
+        self._pas_formaat_toe(cap, fourcc, breedte, hoogte, fps)
+        
+        # Een paar frames weggooien: na een formaat wissel zijn de eerste vaak traag of leeg
+        for _ in range(3):
+            cap.grab()
+            
+        werkelijk = {
+            "fourcc": self._fourcc_tekst(cap.get(cv2.CAP_PROP_FOURCC)) or fourcc,
+            "breedte": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "hoogte": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        }
+        if (werkelijk["breedte"], werkelijk["hoogte"]) != (breedte, hoogte):
+            return None
+            
+        # grab() wacht op het frame, retrieve() decodeert: zo zijn beide los te meten
+        decodeer_tijd = 0.0
+        frames = 0
+        start = time.perf_counter()
+        for _ in range(CAPTURE_CONFIG['test_frames']):
+            if not cap.grab():
+                continue
+            decodeer_start = time.perf_counter()
+            ret, frame = cap.retrieve()
+            decodeer_tijd += time.perf_counter() - decodeer_start
+            if ret and frame is not None:
+                frames += 1
+        duur = time.perf_counter() - start
+        if frames == 0:
+            return None
+            
+        return dict(werkelijk, fps=fps, geleverde_fps=round(frames / duur, 1),
+                    decodeer_ms=round(decodeer_tijd / frames * 1000, 3))
+        
+    @staticmethod
+    def _formaat_score(resultaat):
+        """Eerst de frame rate halen, dan genoeg resolutie voor de iris, dan goedkoopste decodering"""
+        doel_fps = min(resultaat["fps"], PERFORMANCE_CONFIG['target_fps'])
+        haalt_fps = resultaat["geleverde_fps"] >= doel_fps * CAPTURE_CONFIG['min_fps_factor']
+        genoeg_pixels = resultaat["breedte"] >= CAPTURE_CONFIG['min_breedte']
+        return (haalt_fps, genoeg_pixels, min(resultaat["geleverde_fps"], doel_fps), -resultaat["decodeer_ms"])
+        
+    def onderhandel_formaat(self, cap):
+        """Probeer alle kandidaat formaten op een geopende camera en geef het beste terug"""
+        resultaten = []
+        geziene = set()
+        for fourcc, breedte, hoogte, fps in CAPTURE_CONFIG['kandidaten']:
+            resultaat = self._meet_formaat(cap, fourcc, breedte, hoogte, fps)
+            if resultaat is None:
+                print(f"  Formaat {fourcc} {breedte}x{hoogte}@{fps} niet ondersteund")
+                continue
+            # Driver kan een ander FOURCC teruggeven dan gevraagd; dubbele combinaties overslaan
+            sleutel = (resultaat["fourcc"], resultaat["breedte"], resultaat["hoogte"])
+            if sleutel in geziene:
+                continue
+            geziene.add(sleutel)
+            print(f"  Formaat {resultaat['fourcc']} {breedte}x{hoogte}: {resultaat['geleverde_fps']} fps, "
+                  f"decodeer {resultaat['decodeer_ms']:.2f} ms")
+            resultaten.append(resultaat)
+            
+        if not resultaten:
+            return None
+        return max(resultaten, key=self._formaat_score)
+        
+    def _formaat_werkt(self, cap, formaat):
+        """Onthouden formaat instellen en controleren dat het apparaat het ook levert"""
+        self._pas_formaat_toe(cap, formaat["fourcc"], formaat["breedte"], formaat["hoogte"], formaat["fps"])
+        if (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))) != \
+                (formaat["breedte"], formaat["hoogte"]):
+            return False
+        ret, frame = cap.read()
+        return ret and frame is not None
+        
+    def _kies_formaat(self, index, cap, onderhandel=True):
+        """Formaat uit inventaris of cache; anders eenmalig onderhandelen en onthouden.
+        
+        Een onthouden formaat dat niet (meer) werkt wordt vergeten. Zonder onderhandel
+        (herstel na een storing) geen proefronde: dan None en de standaard instelling.
+        """
+        camera_info, sleutel = self._sleutel_voor(index)
+        
+        formaat = (camera_info or {}).get("formaat") or self.formaat_cache.get(sleutel)
+        if formaat is not None and not self._formaat_werkt(cap, formaat):
+            print(f"Onthouden formaat voor '{sleutel}' werkt niet, opnieuw onderhandelen")
+            self.vergeet_formaat(index)
+            formaat = None
+        if formaat is None:
+            if not onderhandel:
+                return None
+            print(f"Capture formaten testen voor '{sleutel}'...")
+            formaat = self.onderhandel_formaat(cap)
+            if formaat is None:
+                return None
+            self.formaat_cache[sleutel] = formaat
+            try:
+                self._bewaar_formaat_cache()
+            except OSError as e:
+                print(f"Camera formaat cache kan niet opgeslagen worden: {e}")
+                
+        if camera_info is not None:
+            camera_info["formaat"] = formaat
+        return formaat
+        
+    def stel_profiel_formaat_in(self, formaat):
+        """Resolutie en fps van een profiel; direct op een open camera, anders bij de volgende start.
+        
+        None zet het onderhandelde formaat terug. Geeft de werkelijk geleverde resolutie, of None.
+        """
+        self.profiel_formaat = formaat
+        with self._lees_lock:
+            capture = self.huidige_camera
+            bezet = capture is not None and bool(self._lezers.get(id(capture)))
+        if capture is None or not capture.isOpened():
+            return None
+        if bezet:
+            # Een (hangende) lezer zit nog in grab(): heropenen in plaats van omzetten
+            if not self.start_camera(self.camera_index):
+                return None
+            capture = self.huidige_camera
+        else:
+            camera_info = self.krijg_huidige_camera_info() or {}
+            gekozen = camera_info.get("formaat") or {}
+            doel = formaat or gekozen
+            if not doel:
+                return None
+            fourcc = self._fourcc_tekst(capture.get(cv2.CAP_PROP_FOURCC)) or gekozen.get("fourcc", "MJPG")
+            self._pas_formaat_toe(capture, fourcc, doel["breedte"], doel["hoogte"], doel["fps"])
+        return (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        
+    def vergeet_formaat(self, index):
+        """Wis het gekozen formaat, zodat de volgende start opnieuw onderhandelt"""
+        camera_info, sleutel = self._sleutel_voor(index)
+        if camera_info is not None:
+            camera_info["formaat"] = None
+        if self.formaat_cache.pop(sleutel, None) is not None:
+            try:
+                self._bewaar_formaat_cache()
+            except OSError as e:
+                print(f"Camera formaat cache kan niet opgeslagen worden: {e}")
+            
     def krijg_beschikbare_cameras(self):
         """Geef lijst van beschikbare cameras terug"""
         return self.beschikbare_cameras.copy()
         
-    def start_camera(self, index=None):
-        """Start specifieke camera of de eerste beschikbare"""
+    def start_camera(self, index=None, onderhandel=True, geldig=None):
+        """Start specifieke camera of de eerste beschikbare.
+        
+        onderhandel=False slaat de formaat proefronde over bij een onbekend apparaat
+        (herstel na een storing mag niet seconden lang testen). geldig wordt na het
+        openen onder de start lock nagekeken; False (de aanvrager is intussen gestopt)
+        geeft de nieuwe capture meteen weer vrij, voordat een ander de camera start.
+        """
+        with self._start_lock:
+            if not self._start_camera(index, onderhandel):
+                return False
+            if geldig is not None and not geldig():
+                self.stop_camera()
+                return False
+            return True
+            
+    def _laat_los(self, capture):
+        """Geef een capture vrij, of laat dat over aan de thread die er nog uit leest"""
+        if capture is None:
+            return
+        with self._lees_lock:
+            if self._lezers.get(id(capture)):
+                self._uitgesteld[id(capture)] = capture
+                return
+        capture.release()
+        
+    def _ontkoppel_camera(self):
+        """Huidige capture loskoppelen; lezers werken nog met hun eigen referentie"""
+        with self._lees_lock:
+            capture, self.huidige_camera = self.huidige_camera, None
+        self._laat_los(capture)
+        return capture
+            
+    def _start_camera(self, index, onderhandel):
         if index is None:
             if self.beschikbare_cameras:
                 index = self.beschikbare_cameras[0]['index']
@@ -198,41 +471,53 @@ class CameraDetectie:
                 return False
                 
         # Stop huidige camera als die er is
-        if self.huidige_camera:
-            self.huidige_camera.release()
+        if self._ontkoppel_camera() is not None:
             time.sleep(0.1)
             
         print(f"Starten van camera {index}...")
         
-        # Probeer camera te starten
+        # Nieuwe capture pas publiceren als hij frames levert; tot dan leest niemand eruit
+        capture = None
         try:
             if self.is_windows:
-                self.huidige_camera = cv2.VideoCapture(index, cv2.CAP_DSHOW)
+                capture = cv2.VideoCapture(index, cv2.CAP_DSHOW)
             else:
-                self.huidige_camera = cv2.VideoCapture(index)
+                capture = cv2.VideoCapture(index)
                 
-            if not self.huidige_camera.isOpened():
+            if not capture.isOpened():
                 print(f"Camera {index} kan niet worden geopend")
+                capture.release()
                 return False
                 
-            # Stel basis instellingen in
-            self.huidige_camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.huidige_camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.huidige_camera.set(cv2.CAP_PROP_FPS, 30)
+            # Gekozen formaat (FOURCC, resolutie, fps) of de oude standaard als niets werkt
+            formaat = self._kies_formaat(index, capture, onderhandel)
+            if formaat:
+                self._pas_formaat_toe(capture, formaat["fourcc"], formaat["breedte"],
+                                      formaat["hoogte"], formaat["fps"])
+            else:
+                capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+                capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+                capture.set(cv2.CAP_PROP_FPS, 30)
+            if self.profiel_formaat:
+                self._pas_formaat_toe(capture, (formaat or {}).get("fourcc", "MJPG"),
+                                      self.profiel_formaat["breedte"], self.profiel_formaat["hoogte"],
+                                      self.profiel_formaat["fps"])
             
             # Buffer grootte minimaliseren voor lagere latency
-            self.huidige_camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             
             # Wacht even voor stabilisatie
             time.sleep(0.3)
             
             # Test of we frames kunnen lezen
-            ret, test_frame = self.huidige_camera.read()
+            ret, test_frame = capture.read()
             if not ret or test_frame is None:
                 print(f"Camera {index} kan geen frames produceren")
-                self.huidige_camera.release()
+                capture.release()
                 return False
                 
+            with self._lees_lock:
+                self.huidige_camera = capture
             self.camera_index = index
             camera_info = next((c for c in self.beschikbare_cameras if c['index'] == index), None)
             camera_naam = camera_info['naam'] if camera_info else f"Camera {index}"
@@ -242,9 +527,8 @@ class CameraDetectie:
             
         except Exception as e:
             print(f"Fout bij starten camera {index}: {e}")
-            if self.huidige_camera:
-                self.huidige_camera.release()
-                self.huidige_camera = None
+            if capture is not None:
+                capture.release()
             return False
             
     def wissel_camera(self, nieuwe_index):
@@ -262,16 +546,56 @@ class CameraDetectie:
         return self.start_camera(nieuwe_index)
         
     def krijg_frame(self):
-        """Krijg het huidige frame van de camera"""
-        if not self.huidige_camera or not self.huidige_camera.isOpened():
+        """Krijg het huidige frame van de camera.
+        
+        Het frame leeft in een herbruikbare buffer en is alleen geldig tot de
+        volgende aanroep; wie het langer nodig heeft maakt zelf een kopie.
+        """
+        # Eigen referentie: grab en retrieve lezen dezelfde capture, ook als er intussen gewisseld wordt
+        with self._lees_lock:
+            capture = self.huidige_camera
+            if capture is None:
+                return None
+            self._lezers[id(capture)] = self._lezers.get(id(capture), 0) + 1
+        try:
+            frame = self._lees(capture)
+        finally:
+            with self._lees_lock:
+                self._lezers[id(capture)] -= 1
+                if not self._lezers[id(capture)]:
+                    del self._lezers[id(capture)]
+                    vrij_te_geven = self._uitgesteld.pop(id(capture), None)
+                else:
+                    vrij_te_geven = None
+            if vrij_te_geven is not None:
+                vrij_te_geven.release()  # Losgekoppeld tijdens het lezen
+        return frame
+        
+    def _lees(self, capture):
+        if not capture.isOpened():
             return None
             
-        ret, frame = self.huidige_camera.read()
+        # grab() eerst: het tijdstip ligt zo dicht mogelijk bij de opname, niet na het decoderen
+        if not capture.grab():
+            return None
+        with self._lees_lock:
+            if id(capture) in self._uitgesteld:
+                return None  # Losgekoppeld tijdens grab(); dit frame hoort bij de oude camera
+        self.laatste_capture_ms = time.monotonic() * 1000
+        ret, frame = capture.retrieve(self._frame_buffer)
         if not ret or frame is None:
             return None
+        self._frame_buffer = frame
+            
+        if not self.spiegel_pixels:
+            # Spiegeling gebeurt in landmark coordinaten (OogDetectie)
+            return frame
             
         # Spiegel het frame voor een natuurlijk gevoel (zoals bij selfies)
-        return cv2.flip(frame, 1)
+        if self._spiegel_buffer is None or self._spiegel_buffer.shape != frame.shape:
+            self._spiegel_buffer = cv2.flip(frame, 1)
+            return self._spiegel_buffer
+        return cv2.flip(frame, 1, dst=self._spiegel_buffer)
         
     def krijg_huidige_camera_info(self):
         """Krijg informatie over de huidige camera"""
@@ -283,9 +607,7 @@ class CameraDetectie:
         
     def stop_camera(self):
         """Stop de huidige camera"""
-        if self.huidige_camera:
-            self.huidige_camera.release()
-            self.huidige_camera = None
+        if self._ontkoppel_camera() is not None:
             print("Camera gestopt")
             
     def __del__(self):
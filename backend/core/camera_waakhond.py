@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Camera waakhond module voor Focus Tuin
+Capture in een eigen thread met deadline; vastgelopen of losgekoppelde cameras worden op de achtergrond heropend
+"""
+
+import threading
+import time
+import numpy as np
+from .configuratie import WAAKHOND_CONFIG
+from .kader_buffers import KaderBuffers
+
+STATUS_OK = "ok"
+STATUS_GESTALD = "stalled"
+STATUS_HERSTEL = "recovering"
+STATUS_HERSTELD = "recovered"
+STATUS_FAILOVER = "failover"
+
+
+def _directe_aanroep(functie, *args):
+    return functie(*args)
+
+
+class CameraWaakhond:
+    """Houdt de blokkerende camera aanroepen weg van de thread die gaze verstuurt.
+
+    De capture thread haalt frames op en bewaart alleen het laatste; lees_frame
+    wacht hooguit een timeout. Komt er langer dan stal_ms geen frame, dan start een
+    herstel thread die de camera heropent met exponentiele backoff en na een aantal
+    mislukte pogingen uitwijkt naar een andere camera uit de inventaris. Een capture
+    thread die in de driver blijft hangen wordt achtergelaten (generatie teller).
+    """
+
+    def __init__(self, camera, blokkerend=None, config=None):
+        self.camera = camera
+        self.blokkerend = blokkerend or _directe_aanroep
+        self.config = dict(WAAKHOND_CONFIG, **(config or {}))
+
+        self.lock = threading.Lock()
+        self.nieuw = threading.Event()
+        self.loopt = False
+        self.generatie = 0
+        self.resultaat = None  # (volgnummer, frame, capture_ms)
+        self.volgnummer = 0
+        self._gelezen = 0
+        self._uitgegeven = None  # Frame van de laatste lees_frame; de lezer gebruikt het nog
+        self.buffers = KaderBuffers()
+        self.laatste_frame_ms = None
+
+        self.toestand = STATUS_OK
+        self.capture_thread = None
+        self.herstel_thread = None
+        self._wekker = threading.Event()
+        self._meldingen = []
+
+    @property
+    def herstelt(self):
+        return self.loopt and self.toestand != STATUS_OK
+
+    def start(self):
+        if self.loopt:
+            return
+        self.loopt = True
+        self.toestand = STATUS_OK
+        self.laatste_frame_ms = time.monotonic() * 1000
+        self._start_capture()
+
+    def stop(self):
+        """Stop en wacht tot de threads klaar zijn, zodat de aanroeper de camera daarna veilig
+        kan omzetten of vrijgeven. Een thread die in de driver hangt wordt na stop_timeout_s
+        achtergelaten (de camera geeft een capture pas vrij als die thread eruit is).
+        
+        Geeft False als een thread na de timeout nog liep.
+        """
+        self.loopt = False
+        with self.lock:
+            self.generatie += 1
+            self.resultaat = None
+        self._wekker.set()
+        self.nieuw.set()
+        
+        einde = time.monotonic() + self.config['stop_timeout_s']
+        klaar = True
+        for thread in (self.capture_thread, self.herstel_thread):
+            if thread is None or thread is threading.current_thread():
+                continue
+            thread.join(max(0.0, einde - time.monotonic()))
+            klaar = klaar and not thread.is_alive()
+        return klaar
+
+    def _start_capture(self):
+        with self.lock:
+            self.generatie += 1
+            generatie = self.generatie
+        self.capture_thread = threading.Thread(target=self._capture_loop, args=(generatie,),
+                                               name=f"capture-{generatie}", daemon=True)
+        self.capture_thread.start()
+
+    def _capture_loop(self, generatie):
+        while self.loopt and generatie == self.generatie:
+            frame = self.blokkerend(self.camera.krijg_frame)
+            if generatie != self.generatie:
+                break  # Achtergelaten tijdens herstel; dit frame hoort bij een oude camera
+            if frame is None:
+                time.sleep(0.05)
+                continue
+            capture_ms = self.camera.laatste_capture_ms or time.monotonic() * 1000
+
+            # Eigen kopie: de camera buffer wordt bij de volgende grab hergebruikt. Ring buffer
+            # naast het laatste resultaat en het frame dat de lezer nog heeft, dus zonder allocatie
+            with self.lock:
+                if generatie != self.generatie:
+                    break
+                bezet = {id(self._uitgegeven)}
+                if self.resultaat is not None:
+                    bezet.add(id(self.resultaat[1]))
+                kopie = self.buffers.ring_buffer("capture", frame.shape, bezet, frame.dtype)
+                np.copyto(kopie, frame)
+                self.volgnummer += 1
+                self.resultaat = (self.volgnummer, kopie, capture_ms)
+                self.laatste_frame_ms = time.monotonic() * 1000
+            self.nieuw.set()
+
+    def lees_frame(self, timeout):
+        """(frame, capture_ms) van een nieuw frame, of None na timeout; blokkeert nooit langer.
+
+        Het frame blijft geldig tot de volgende aanroep.
+        """
+        if not self.loopt:
+            return None
+        if self.nieuw.wait(timeout):
+            self.nieuw.clear()
+        with self.lock:
+            resultaat = self.resultaat
+            laatste_frame_ms = self.laatste_frame_ms
+            if resultaat is not None and resultaat[0] != self._gelezen:
+                self._uitgegeven = resultaat[1]
+
+        if resultaat is not None and resultaat[0] != self._gelezen:
+            self._gelezen = resultaat[0]
+            return resultaat[1], resultaat[2]
+
+        stil_ms = time.monotonic() * 1000 - laatste_frame_ms
+        if self.toestand == STATUS_OK and stil_ms > self.config['stal_ms']:
+            self._start_herstel(stil_ms)
+        return None
+
+    def _start_herstel(self, stil_ms):
+        self.toestand = STATUS_HERSTEL
+        self._meld(STATUS_GESTALD, self.camera.camera_index, stil_ms=round(stil_ms))
+        with self.lock:
+            self.generatie += 1  # Huidige capture thread stopt (of wordt achtergelaten)
+            self.resultaat = None
+        self._wekker.clear()
+        self.herstel_thread = threading.Thread(target=self._herstel, name="camera-herstel", daemon=True)
+        self.herstel_thread.start()
+
+    def _kandidaten(self):
+        """Huidige camera eerst, dan de rest van de inventaris"""
+        oorspronkelijk = self.camera.camera_index
+        return [oorspronkelijk] + [c['index'] for c in self.camera.beschikbare_cameras if c['index'] != oorspronkelijk]
+
+    def _mag_herstellen(self):
+        return self.loopt and not self._wekker.is_set()
+
+    def _herstel(self):
+        kandidaten = self._kandidaten()
+        wacht = self.config['backoff_s']
+        poging = 0
+        while self._mag_herstellen():
+            index = kandidaten[(poging // self.config['pogingen_per_camera']) % len(kandidaten)]
+            poging += 1
+            # Heropenen (en het vrijgeven van een hangende capture) mag hier blokkeren;
+            # zonder formaat proefronde, die zou het herstel seconden ophouden. Na een
+            # stop() die niet op ons wachtte geeft start_camera het apparaat weer vrij
+            if self.blokkerend(self.camera.start_camera, index, False, self._mag_herstellen):
+                if not self._mag_herstellen():
+                    return  # Net na het openen gestopt; stop() wacht hierop en de aanroeper beheert de camera
+                self.toestand = STATUS_OK
+                self.laatste_frame_ms = time.monotonic() * 1000
+                self._start_capture()
+                self._meld(STATUS_FAILOVER if index != kandidaten[0] else STATUS_HERSTELD, index, poging=poging)
+                return
+            if not self._mag_herstellen():
+                return  # Gestopt tijdens het openen; de capture is al vrijgegeven
+            self._meld(STATUS_HERSTEL, index, poging=poging, volgende_poging_s=wacht)
+            if self._wekker.wait(wacht):
+                return  # Gestopt
+            wacht = min(wacht * 2, self.config['max_backoff_s'])
+
+    def _meld(self, status, camera_index, **extra):
+        print(f"Camera waakhond: {status} (camera {camera_index})")
+        with self.lock:
+            self._meldingen.append(dict({'status': status, 'camera_index': camera_index}, **extra))
+
+    def meldingen(self):
+        """Status wijzigingen sinds de vorige aanroep, voor 'camera_health' events"""
+        with self.lock:
+            meldingen, self._meldingen = self._meldingen, []
+        return meldingen
+
+    def status(self):
+        laatste = self.laatste_frame_ms
+        return {
+            'status': self.toestand,
+            'camera_index': self.camera.camera_index,
+            'stil_ms': round(time.monotonic() * 1000 - laatste) if laatste is not None else None
+        }
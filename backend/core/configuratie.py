@@ -9,7 +9,48 @@ CAMERA_CONFIG = {
     "preferred_index": 0,
     "detection_confidence": 0.3,
     "tracking_confidence": 0.3,
-    "fallback_cameras": [0, 1]
+    "fallback_cameras": [0, 1],
+    "spiegel_in_landmarks": True  # Spiegel landmarks i.p.v. pixels (geen cv2.flip per frame)
+}
+
+# Capture formaat onderhandeling (eenmalig per camera, daarna uit de cache)
+CAPTURE_CONFIG = {
+    "kandidaten": [             # (FOURCC, breedte, hoogte, fps) in volgorde van voorkeur
+        ("MJPG", 640, 480, 30),
+        ("YUYV", 640, 480, 30),
+        ("MJPG", 1280, 720, 30),
+        ("YUYV", 1280, 720, 30),
+        ("MJPG", 800, 600, 30),
+        ("YUYV", 320, 240, 30)
+    ],
+    "test_frames": 20,          # Frames per kandidaat voor de gemeten fps en decodeertijd
+    "min_breedte": 640,         # Kleiner levert te weinig pixels per iris op
+    "min_fps_factor": 0.9,      # Geleverde fps moet minstens dit deel van target_fps halen
+    "cache_bestand": "data/camera_formaten.json"
+}
+
+# Waakhond voor vastgelopen of losgekoppelde cameras
+WAAKHOND_CONFIG = {
+    "actief": True,
+    "lees_timeout_s": 0.1,      # Maximale wachttijd van de tracking loop op een frame
+    "stal_ms": 2000,            # Zo lang geen frame: camera geldt als vastgelopen
+    "backoff_s": 0.5,           # Eerste wachttijd tussen heropen pogingen, verdubbelt per poging
+    "max_backoff_s": 10.0,
+    "pogingen_per_camera": 3,   # Daarna uitwijken naar de volgende camera uit de inventaris
+    "stop_timeout_s": 1.0       # stop() wacht zo lang op de capture en herstel threads
+}
+
+# Meerdere cameras tegelijk met een gefuseerde gaze schatting
+MULTI_CAMERA_CONFIG = {
+    "actief": False,            # Alleen met minstens twee werkende cameras
+    "indices": None,            # None = alle gevonden cameras
+    "max_tijdsverschil_ms": 40, # Resultaten verder van de nieuwste opname doen niet mee aan de fusie
+    "max_leeftijd_ms": 250,     # Oudere kanaal resultaten tellen niet meer
+    "min_confidence": 0.3,      # Minimum per kanaal om mee te wegen
+    "lock_confidence": 0.7,     # Leider boven deze confidence: andere cameras gaan naar probe rate
+    "wissel_marge": 0.1,        # Confidence voorsprong nodig om van leider te wisselen
+    "max_afwijking": 0.25,      # Gekalibreerde afstand tot de leider waarboven een camera een ander gezicht ziet
+    "probe_hz": 2.0
 }
 
 # Eye tracking configuratie
@@ -17,7 +58,13 @@ EYE_TRACKING_CONFIG = {
     "ear_threshold": 0.25,
     "focus_tolerance": 65,
     "stabilization_time": 250,
-    "smoothing_factor": 0.8
+    "smoothing_factor": 0.8,
+    "max_gezichten": 1,              # >1 schakelt multi-bezoeker modus in
+    "gezicht_koppel_afstand": 0.15,  # Max verplaatsing per frame (genormaliseerd) voor zelfde ID
+    "gezicht_vergeet_tijd": 1.0,     # Seconden zonder detectie voordat een ID vervalt
+    "detector_backend": "face_mesh", # "face_mesh" (synchroon) of "face_landmarker" (Tasks, live stream)
+    "face_landmarker_model": "models/face_landmarker.task",
+    "max_resultaat_leeftijd": 0.25   # Seconden; oudere live stream resultaten vervallen
 }
 
 # Server configuratie
@@ -25,14 +72,157 @@ SERVER_CONFIG = {
     "host": "0.0.0.0",
     "port": 5001,
     "debug": False,
-    "cors_origins": "*"
+    "cors_origins": "*",
+    "async_mode": "threading"   # Of "eventlet"/"gevent" (main_server.py --async-modus)
 }
 
 # Performance configuratie
 PERFORMANCE_CONFIG = {
     "target_fps": 30,
     "max_frame_skip": 3,
-    "debug_interval": 3.0
+    "debug_interval": 3.0,
+    "gaze_wachtrij": 8           # Gaze resultaten die opslag/levering mag achterlopen; daarna vervalt de oudste
+}
+
+# Latentie budget: kwaliteit stapt omlaag/omhoog op gemeten frametijd
+LATENTIE_CONFIG = {
+    "actief": True,
+    "budget_ms": 30.0,          # Verwerkingstijd per frame (exclusief wachten)
+    "omlaag_factor": 1.0,       # Boven budget * factor: een niveau omlaag
+    "omhoog_factor": 0.6,       # Onder budget * factor: een niveau omhoog
+    "omlaag_frames": 30,        # Aaneengesloten frames boven budget voor een stap omlaag
+    "omhoog_frames": 150,       # Langer wachten voor omhoog, voorkomt heen-en-weer springen
+    "ema_factor": 0.1
+}
+
+# Kwaliteit niveaus van hoog naar laag (inferentie_breedte None = volledig frame)
+KWALITEIT_NIVEAUS = [
+    {"naam": "hoog", "inferentie_breedte": None, "ascii_fps": 15, "ascii_breedte": 80, "ascii_hoogte": 40},
+    {"naam": "middel", "inferentie_breedte": 480, "ascii_fps": 12, "ascii_breedte": 80, "ascii_hoogte": 40},
+    {"naam": "laag", "inferentie_breedte": 320, "ascii_fps": 10, "ascii_breedte": 64, "ascii_hoogte": 32},
+    {"naam": "minimaal", "inferentie_breedte": 256, "ascii_fps": 6, "ascii_breedte": 48, "ascii_hoogte": 24}
+]
+
+# Benoemde prestatie profielen (main_server.py --profiel of het 'set_profile' event).
+# capture None = het onderhandelde formaat houden; keyframe_interval 1 = elk frame FaceMesh,
+# hoger = optical flow daartussen; kwaliteit_niveaus zijn namen uit KWALITEIT_NIVEAUS (eerste = start).
+PROFIELEN = {
+    "low-power": {
+        "capture": {"breedte": 640, "hoogte": 480, "fps": 15},
+        "target_fps": 15,
+        "keyframe_interval": 3,
+        "kwaliteit_niveaus": ["laag", "minimaal"],
+        "levering_hz": 2.0,
+        "levering_batch_ms": 500.0,
+        "hub_batch_hz": 5,
+        "sse_hz": 2.0
+    },
+    "balanced": {
+        "capture": None,
+        "target_fps": 30,
+        "keyframe_interval": 1,
+        "kwaliteit_niveaus": ["hoog", "middel", "laag", "minimaal"],
+        "levering_hz": 5.0,
+        "levering_batch_ms": 200.0,
+        "hub_batch_hz": 10,
+        "sse_hz": 5.0
+    },
+    "low-latency": {
+        "capture": {"breedte": 640, "hoogte": 480, "fps": 60},
+        "target_fps": 60,
+        "keyframe_interval": 1,
+        "kwaliteit_niveaus": ["middel", "laag", "minimaal"],
+        "levering_hz": 30.0,
+        "levering_batch_ms": 50.0,
+        "hub_batch_hz": 20,
+        "sse_hz": 15.0
+    }
+}
+STANDAARD_PROFIEL = None  # None = bovenstaande losse configuratie ongewijzigd gebruiken
+
+# End-to-end latentie meting (klok sync met clients)
+LATENTIE_METING_CONFIG = {
+    "ping_interval": 2.0,       # Seconden tussen klok pings per client
+    "klok_samples": 8,          # Laatste ping/pong rondes; de kortste round-trip telt
+    "verdeling_grootte": 512    # Latenties per verdeling (schuivend venster)
+}
+
+# Opname van uitgaande stream events (replay en load tests)
+RECORDER_CONFIG = {
+    "actief": False,            # Ook aan te zetten met main_server.py --opnemen
+    "map": "data/opnames"
+}
+
+# Gaze leveringsmodi per client (every, latest op N Hz, batch per N ms)
+LEVERING_CONFIG = {
+    "standaard_hz": 5.0,
+    "min_hz": 0.5,
+    "max_hz": 60.0,
+    "standaard_batch_ms": 200.0,
+    "min_batch_ms": 20.0,
+    "max_batch_ms": 5000.0
+}
+
+# Server-side gaze doelen (benoemde schermrechthoeken per client)
+GAZE_DOEL_CONFIG = {
+    "cel_grootte": 128,      # Pixels per raster cel van de ruimtelijke index
+    "dwell_ms": 800,         # Standaard blik duur voor een dwell event
+    "min_confidence": 0.3,   # Lagere samples veranderen de doel toestand niet
+    "max_doelen": 256        # Per client
+}
+
+# HTTP toegang tot de laatste gaze (signage, licht controllers zonder Socket.IO)
+HTTP_GAZE_CONFIG = {
+    "max_long_poll_s": 25.0,    # Maximale wachttijd voor /gaze/latest met If-None-Match
+    "sse_hz": 5.0,              # Standaard rate van /gaze/stream
+    "max_sse_hz": 30.0,
+    "sse_keepalive_s": 15.0
+}
+
+# Venue hub: bundelt meerdere tracker nodes voor een centraal dashboard
+HUB_CONFIG = {
+    "batch_hz": 10,             # Node -> hub bundels per seconde
+    "focus_tolerantie_x": 20,   # Pixels rond schermcentrum (gelijk aan FOCUS_ZONE_CONFIG)
+    "focus_tolerantie_y": 15,
+    "min_confidence": 0.6,
+    "dashboard_hz": 4,          # Hub -> dashboard updates per seconde
+    "venster_s": 60,            # Schuivend venster voor rates en focus ratio
+    "node_timeout_s": 5.0,      # Geen batch in deze tijd: node telt als offline
+    "host": "0.0.0.0",
+    "port": 5100
+}
+
+# Aandacht opslag configuratie (lokale tijdreeks, geen externe database)
+OPSLAG_CONFIG = {
+    "actief": True,
+    "map": "data/aandacht",
+    "segment_records": 65536,   # Ruwe samples per segment bestand
+    "max_segmenten": 256,       # Oudste segmenten worden verwijderd boven dit aantal
+    "max_sample_gat_ms": 500,   # Langere gaten tellen niet mee als dwell tijd
+    "bezoek_gat_ms": 3000,      # Zo lang geen gezicht = bezoek afgelopen
+    # Rollups en bezoeken leven langer dan de ruwe samples (statistieken per dag/maand)
+    "rollup_bewaar_dagen": {"seconde": 31, "minuut": 730},
+    "bezoek_bewaar_dagen": 730,
+    "compactie_interval_s": 3600  # Achtergrond thread die verlopen rollups en bezoeken opruimt
+}
+
+# Optical flow tussen FaceMesh keyframes (voor trage kiosk hardware)
+OPTICAL_FLOW_CONFIG = {
+    "actief": False,
+    "keyframe_interval": 3,     # FaceMesh elke N frames, daartussen Lucas-Kanade
+    "min_confidence": 0.4,      # Lagere confidence forceert een nieuwe keyframe
+    "max_fb_fout": 1.0,         # Max forward-backward fout in pixels
+    "roi_marge": 24,            # Pixels rond de oogpunten
+    "win_grootte": 15,
+    "max_niveau": 2
+}
+
+# Kalibratie configuratie (server-side polynoom fit met opgeslagen profielen)
+KALIBRATIE_CONFIG = {
+    "map": "data/kalibratie",
+    "polynoom_graad": 2,
+    "min_samples": 9,
+    "max_sample_leeftijd": 0.5  # Seconden; oudere gaze metingen worden geweigerd
 }
 
 # MediaPipe Face Mesh landmarks (behoud exact)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Gaze berekening module voor Focus Tuin
+Gevectoriseerde gaze kernels over (N, ...) numpy arrays, gedeeld door streaming en batch
+"""
+
+from itertools import combinations
+import numpy as np
+from .configuratie import (
+    LINKER_IRIS, RECHTER_IRIS, LINKER_OOG_HOEKEN, RECHTER_OOG_HOEKEN, CAMERA_CONFIG
+)
+
+# Normalisatie van iris verschuiving binnen het oog (pixels)
+IRIS_NORM_X = 30.0
+IRIS_NORM_Y = 20.0
+
+# Deel van het halve frame dat door de gaze bestreken wordt
+BEREIK_X = 0.9
+BEREIK_Y = 0.8
+
+# Zachte frame grenzen
+RAND_MIN = 0.05
+RAND_MAX = 0.95
+
+
+def landmarks_naar_pixels(landmarks, breedte, hoogte):
+    """Genormaliseerde (..., K, 2) landmarks naar integer pixel coordinaten"""
+    return np.multiply(np.asarray(landmarks, dtype=np.float64), [breedte, hoogte]).astype(int)
+
+
+def spiegel_landmarks(landmarks):
+    """Spiegel (..., K, 2) genormaliseerde landmarks horizontaal, als was het kader geflipt.
+
+    Linker en rechter oog wisselen daarbij van kant; alleen de iris en ooghoek
+    groepen worden omgewisseld, de overige punten worden alleen gespiegeld.
+    """
+    gespiegeld = np.array(landmarks, dtype=np.float64)
+    gespiegeld[..., 0] = 1.0 - gespiegeld[..., 0]
+    for links, rechts in ((LINKER_IRIS, RECHTER_IRIS), (LINKER_OOG_HOEKEN, RECHTER_OOG_HOEKEN)):
+        gespiegeld[..., links + rechts, :] = gespiegeld[..., rechts + links, :]
+    return gespiegeld
+
+
+def min_omsluitende_cirkels(punten):
+    """Kleinste omsluitende cirkel per rij van (N, P, 2) punten -> centra (N, 2), radii (N,)"""
+    punten = np.asarray(punten, dtype=np.float64)
+    n, p = punten.shape[:2]
+
+    kandidaat_centra = []
+    kandidaat_radii = []
+
+    # Cirkels met een puntenpaar als diameter
+    for a, b in combinations(range(p), 2):
+        centrum = (punten[:, a] + punten[:, b]) / 2
+        kandidaat_centra.append(centrum)
+        kandidaat_radii.append(np.hypot(*(punten[:, a] - centrum).T))
+
+    # Omgeschreven cirkels van drie punten (collineaire drietallen vallen af)
+    for a, b, c in combinations(range(p), 3):
+        ax, ay = punten[:, a].T
+        bx, by = punten[:, b].T
+        cx, cy = punten[:, c].T
+        d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+        geldig = d != 0
+        d = np.where(geldig, d, 1.0)
+        a2, b2, c2 = ax * ax + ay * ay, bx * bx + by * by, cx * cx + cy * cy
+        ux = (a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / d
+        uy = (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / d
+        centrum = np.stack([ux, uy], axis=1)
+        kandidaat_centra.append(centrum)
+        kandidaat_radii.append(np.where(geldig, np.hypot(ax - ux, ay - uy), np.inf))
+
+    centra = np.stack(kandidaat_centra, axis=1)   # (N, C, 2)
+    radii = np.stack(kandidaat_radii, axis=1)     # (N, C)
+
+    # Kandidaat moet alle punten omsluiten (kleine tolerantie voor afronding)
+    afstanden = np.linalg.norm(punten[:, None, :, :] - centra[:, :, None, :], axis=3)
+    omsluit = np.all(afstanden <= radii[:, :, None] * (1 + 1e-9) + 1e-9, axis=2)
+    radii = np.where(omsluit, radii, np.inf)
+
+    keuze = np.argmin(radii, axis=1)
+    rijen = np.arange(n)
+    return centra[rijen, keuze], radii[rijen, keuze]
+
+
+def iris_centra(iris_punten):
+    """Iris centra (afgekapt naar int32 zoals de streaming pixel output) en radii"""
+    centra, radii = min_omsluitende_cirkels(iris_punten)
+    return centra.astype(np.int32), radii
+
+
+def relatieve_gaze(linker_centra, rechter_centra, linker_hoeken, rechter_hoeken):
+    """Gemiddelde relatieve iris positie binnen beide ogen -> (N, 2)"""
+    linker_oog_centrum = np.mean(linker_hoeken, axis=1)
+    rechter_oog_centrum = np.mean(rechter_hoeken, axis=1)
+
+    linker_rel_x = (linker_centra[:, 0] - linker_oog_centrum[:, 0]) / IRIS_NORM_X
+    rechter_rel_x = (rechter_centra[:, 0] - rechter_oog_centrum[:, 0]) / IRIS_NORM_X
+
+    linker_rel_y = (linker_centra[:, 1] - linker_oog_centrum[:, 1]) / IRIS_NORM_Y
+    rechter_rel_y = (rechter_centra[:, 1] - rechter_oog_centrum[:, 1]) / IRIS_NORM_Y
+
+    return np.stack([(linker_rel_x + rechter_rel_x) / 2, (linker_rel_y + rechter_rel_y) / 2], axis=1)
+
+
+def kalibreer(gem_rel, schaal_x, schaal_y, offset_x, offset_y):
+    """Lineaire kalibratie: schaal en offset per as"""
+    return np.stack([
+        gem_rel[:, 0] * schaal_x + offset_x,
+        gem_rel[:, 1] * schaal_y + offset_y
+    ], axis=1)
+
+
+def naar_frame_positie(gecalibreerd, frame_breedte, frame_hoogte):
+    """Gekalibreerde gaze naar begrensde frame coordinaten"""
+    center_x = frame_breedte / 2
+    center_y = frame_hoogte / 2
+
+    abs_x = center_x + gecalibreerd[:, 0] * center_x * BEREIK_X
+    abs_y = center_y + gecalibreerd[:, 1] * center_y * BEREIK_Y
+
+    abs_x = np.clip(abs_x, frame_breedte * RAND_MIN, frame_breedte * RAND_MAX)
+    abs_y = np.clip(abs_y, frame_hoogte * RAND_MIN, frame_hoogte * RAND_MAX)
+    return np.stack([abs_x, abs_y], axis=1)
+
+
+def afvlakken(posities, factor, vorige=None):
+    """Exponentiele afvlakking over (N, 2) posities; NaN rijen laten de toestand ongemoeid.
+
+    De recursie is inherent sequentieel; de lus werkt op Python floats zodat elke
+    stap exact dezelfde bewerkingen doet als de streaming afvlakking.
+    """
+    uitvoer = np.full(posities.shape, np.nan)
+    vorige_x, vorige_y = vorige if vorige is not None else (None, None)
+
+    for i, (x, y) in enumerate(posities.tolist()):
+        if x != x or y != y:  # NaN: geen gezicht in dit frame
+            continue
+        if vorige_x is not None and vorige_y is not None:
+            x = factor * vorige_x + (1 - factor) * x
+            y = factor * vorige_y + (1 - factor) * y
+        uitvoer[i, 0] = vorige_x = x
+        uitvoer[i, 1] = vorige_y = y
+
+    laatste = (vorige_x, vorige_y) if vorige_x is not None else None
+    return uitvoer, laatste
+
+
+def naar_scherm(frame_posities, frame_breedte, frame_hoogte, scherm_breedte, scherm_hoogte):
+    """Frame coordinaten naar scherm coordinaten"""
+    norm_x = np.clip(frame_posities[:, 0] / frame_breedte, 0.0, 1.0)
+    norm_y = np.clip(frame_posities[:, 1] / frame_hoogte, 0.0, 1.0)
+    return np.stack([norm_x * scherm_breedte, norm_y * scherm_hoogte], axis=1)
+
+
+def bereken_confidence(linker_centra, rechter_centra, linker_radii, rechter_radii):
+    """Confidence op basis van iris afstand en iris grootte"""
+    verschil = (linker_centra - rechter_centra).astype(np.float64)
+    iris_afstand = np.sqrt(verschil[:, 0] * verschil[:, 0] + verschil[:, 1] * verschil[:, 1])
+
+    confidence = np.minimum(iris_afstand / 80.0, 1.0)
+    confidence = np.where(iris_afstand < 40, confidence * 0.5, confidence)
+    confidence = np.where((linker_radii < 2) | (rechter_radii < 2), confidence * 0.6, confidence)
+    return np.maximum(confidence, 0.2), iris_afstand
+
+
+def verwerk_batch(landmarks, timestamps, frame_breedte, frame_hoogte,
+                  scherm_breedte=1920, scherm_hoogte=1080,
+                  schaal_x=1.2, schaal_y=1.1, offset_x=0.0, offset_y=0.0,
+                  afvlakking=0.8, vorige=None, profiel=None, spiegel=None):
+    """Verwerk een opgenomen sessie: (N, K, 2) genormaliseerde landmarks + N timestamps.
+
+    Frames zonder gezicht worden als NaN landmarks aangeleverd; hun uitvoer is NaN
+    en ze laten de afvlakking ongemoeid, net als in de streaming route. Met een
+    kalibratie profiel vervangt de polynoom mapping schaal en offset. Landmarks
+    zijn camera coordinaten; spiegel (standaard CAMERA_CONFIG['spiegel_in_landmarks'])
+    spiegelt ze zoals de detector dat live doet.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if landmarks.ndim != 3 or landmarks.shape[2] != 2:
+        raise ValueError(f"Verwacht landmarks met vorm (N, K, 2), kreeg {landmarks.shape}")
+    if timestamps.shape != (landmarks.shape[0],):
+        raise ValueError("Aantal timestamps komt niet overeen met aantal frames")
+    if CAMERA_CONFIG['spiegel_in_landmarks'] if spiegel is None else spiegel:
+        landmarks = spiegel_landmarks(landmarks)
+
+    nodig = LINKER_IRIS + RECHTER_IRIS + LINKER_OOG_HOEKEN + RECHTER_OOG_HOEKEN
+    gevonden = ~np.isnan(landmarks[:, nodig]).any(axis=(1, 2))
+    punten = landmarks_naar_pixels(np.where(gevonden[:, None, None], landmarks, 0.0),
+                                   frame_breedte, frame_hoogte)
+
+    linker_centra, linker_radii = iris_centra(punten[:, LINKER_IRIS])
+    rechter_centra, rechter_radii = iris_centra(punten[:, RECHTER_IRIS])
+
+    gem_rel = relatieve_gaze(linker_centra, rechter_centra,
+                             punten[:, LINKER_OOG_HOEKEN], punten[:, RECHTER_OOG_HOEKEN])
+    if profiel is not None:
+        gecalibreerd = profiel.pas_toe(gem_rel)
+    else:
+        gecalibreerd = kalibreer(gem_rel, schaal_x, schaal_y, offset_x, offset_y)
+    frame_posities = naar_frame_positie(gecalibreerd, frame_breedte, frame_hoogte)
+    frame_posities[~gevonden] = np.nan
+
+    afgevlakt, laatste = afvlakken(frame_posities, afvlakking, vorige)
+    scherm = naar_scherm(afgevlakt, frame_breedte, frame_hoogte, scherm_breedte, scherm_hoogte)
+    confidence, _ = bereken_confidence(linker_centra, rechter_centra, linker_radii, rechter_radii)
+
+    return {
+        "timestamp": timestamps,
+        "x": scherm[:, 0],
+        "y": scherm[:, 1],
+        "confidence": np.where(gevonden, confidence, np.nan),
+        "gezicht_gevonden": gevonden,
+        "linker_iris": linker_centra,
+        "rechter_iris": rechter_centra,
+        "vorige": laatste
+    }
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Gaze doelen module voor Focus Tuin
+Benoemde schermrechthoeken in een uniform raster, met enter/leave/dwell per gezicht
+"""
+
+import threading
+from .configuratie import GAZE_DOEL_CONFIG
+
+
+class RasterIndex:
+    """Uniform raster over schermcoordinaten: een punt bekijkt alleen de doelen in zijn cel"""
+
+    def __init__(self, cel_grootte=None):
+        self.cel_grootte = cel_grootte or GAZE_DOEL_CONFIG['cel_grootte']
+        self.cellen = {}   # (cx, cy) -> set van namen
+        self.doelen = {}   # naam -> (x0, y0, x1, y1)
+
+    def _cellen_van(self, x0, y0, x1, y1):
+        c = self.cel_grootte
+        for cx in range(int(x0 // c), int(x1 // c) + 1):
+            for cy in range(int(y0 // c), int(y1 // c) + 1):
+                yield cx, cy
+
+    def voeg_toe(self, naam, x, y, breedte, hoogte):
+        if naam in self.doelen:
+            self.verwijder(naam)
+        rechthoek = (x, y, x + breedte, y + hoogte)
+        self.doelen[naam] = rechthoek
+        for cel in self._cellen_van(*rechthoek):
+            self.cellen.setdefault(cel, set()).add(naam)
+
+    def verwijder(self, naam):
+        rechthoek = self.doelen.pop(naam, None)
+        if rechthoek is None:
+            return False
+        for cel in self._cellen_van(*rechthoek):
+            namen = self.cellen.get(cel)
+            if namen is not None:
+                namen.discard(naam)
+                if not namen:
+                    del self.cellen[cel]
+        return True
+
+    def zoek(self, x, y):
+        """Namen van alle doelen die het punt bevatten"""
+        namen = self.cellen.get((int(x // self.cel_grootte), int(y // self.cel_grootte)))
+        if not namen:
+            return set()
+        treffers = set()
+        for naam in namen:
+            x0, y0, x1, y1 = self.doelen[naam]
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                treffers.add(naam)
+        return treffers
+
+    def __len__(self):
+        return len(self.doelen)
+
+
+class GazeDoelVolger:
+    """Toestand per gezicht: welke doelen het bekijkt en sinds wanneer.
+
+    Levert alleen overgangen op: enter bij binnenkomen, dwell een keer per bezoek
+    zodra de blik lang genoeg blijft, leave bij verlaten of verdwijnen van het gezicht.
+    """
+
+    def __init__(self):
+        self.index = RasterIndex()
+        self.dwell_ms = {}   # naam -> eigen dwell drempel
+        self.bezoeken = {}   # gezicht_id -> {naam: [start_ms, dwell_gemeld]}
+        # Registratie komt van socket handlers, verwerking van de tracking thread
+        self.lock = threading.Lock()
+
+    def registreer(self, naam, x, y, breedte, hoogte, dwell_ms=None):
+        if breedte <= 0 or hoogte <= 0:
+            raise ValueError("Doel moet een positieve breedte en hoogte hebben")
+        with self.lock:
+            if naam not in self.index.doelen and len(self.index) >= GAZE_DOEL_CONFIG['max_doelen']:
+                raise ValueError(f"Maximaal {GAZE_DOEL_CONFIG['max_doelen']} gaze doelen per client")
+            self.index.voeg_toe(naam, x, y, breedte, hoogte)
+            self.dwell_ms[naam] = dwell_ms if dwell_ms is not None else GAZE_DOEL_CONFIG['dwell_ms']
+
+    def verwijder(self, naam, tijd_ms):
+        """Verwijder een doel; lopende bezoeken eindigen met een leave"""
+        with self.lock:
+            return self._verwijder(naam, tijd_ms)
+
+    def _verwijder(self, naam, tijd_ms):
+        if not self.index.verwijder(naam):
+            return []
+        del self.dwell_ms[naam]
+        gebeurtenissen = []
+        for gezicht_id, bezoeken in self.bezoeken.items():
+            bezoek = bezoeken.pop(naam, None)
+            if bezoek:
+                gebeurtenissen.append(self._gebeurtenis('leave', naam, gezicht_id, tijd_ms, bezoek[0]))
+        return gebeurtenissen
+
+    def wis(self, tijd_ms):
+        with self.lock:
+            gebeurtenissen = []
+            for naam in list(self.index.doelen):
+                gebeurtenissen.extend(self._verwijder(naam, tijd_ms))
+            self.bezoeken.clear()
+            return gebeurtenissen
+
+    @property
+    def actief(self):
+        return len(self.index) > 0 or bool(self.bezoeken)
+
+    def _gebeurtenis(self, soort, naam, gezicht_id, tijd_ms, start_ms):
+        return {'type': soort, 'doel': naam, 'gezicht_id': gezicht_id,
+                'timestamp': tijd_ms, 'duur_ms': round(tijd_ms - start_ms, 1)}
+
+    def verwerk(self, gezichten, tijd_ms):
+        """Gaze van een frame (dicts met x, y, confidence, gezicht_id) naar gebeurtenissen.
+
+        Gezichten die dit frame ontbreken verlaten al hun doelen; samples onder de
+        minimale confidence veranderen niets, zodat een korte knipper geen leave geeft.
+        """
+        with self.lock:
+            return self._verwerk(gezichten, tijd_ms)
+
+    def _verwerk(self, gezichten, tijd_ms):
+        gebeurtenissen = []
+        gezien = set()
+        for gezicht in gezichten:
+            gezicht_id = gezicht['gezicht_id']
+            gezien.add(gezicht_id)
+            if gezicht['confidence'] < GAZE_DOEL_CONFIG['min_confidence']:
+                continue
+            bezoeken = self.bezoeken.setdefault(gezicht_id, {})
+            treffers = self.index.zoek(gezicht['x'], gezicht['y'])
+
+            for naam in [naam for naam in bezoeken if naam not in treffers]:
+                gebeurtenissen.append(self._gebeurtenis('leave', naam, gezicht_id, tijd_ms, bezoeken.pop(naam)[0]))
+            for naam in treffers:
+                bezoek = bezoeken.get(naam)
+                if bezoek is None:
+                    bezoeken[naam] = [tijd_ms, False]
+                    gebeurtenissen.append(self._gebeurtenis('enter', naam, gezicht_id, tijd_ms, tijd_ms))
+                elif not bezoek[1] and tijd_ms - bezoek[0] >= self.dwell_ms[naam]:
+                    bezoek[1] = True
+                    gebeurtenissen.append(self._gebeurtenis('dwell', naam, gezicht_id, tijd_ms, bezoek[0]))
+
+        for gezicht_id in [gid for gid in self.bezoeken if gid not in gezien]:
+            for naam, bezoek in self.bezoeken.pop(gezicht_id).items():
+                gebeurtenissen.append(self._gebeurtenis('leave', naam, gezicht_id, tijd_ms, bezoek[0]))
+        return gebeurtenissen
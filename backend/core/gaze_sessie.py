@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Gaze sessie module voor Focus Tuin
+Goedkope per-client gaze toestand: scherm mapping, kalibratie en afvlakking
+"""
+
+import numpy as np
+from .configuratie import EYE_TRACKING_CONFIG
+from . import gaze_berekening
+
+
+class GazeSessie:
+    """Zet een gedeelde landmark meting om naar schermcoordinaten voor een client"""
+
+    def __init__(self):
+        # Volledige scherm afmetingen voor gaze tracking
+        self.scherm_breedte = 1920
+        self.scherm_hoogte = 1080
+
+        # Bewegingsfiltering voor stabiliteit
+        self.vorige_gaze_x = None
+        self.vorige_gaze_y = None
+        self.afvlakkingsFactor = EYE_TRACKING_CONFIG['smoothing_factor']
+
+        # Kalibratie parameters voor volledige scherm nauwkeurigheid
+        self.kalibratie_offset_x = 0.0
+        self.kalibratie_offset_y = 0.0
+        self.gaze_schaal_x = 1.2  # Aangepast voor volledig scherm
+        self.gaze_schaal_y = 1.1  # Aangepast voor volledig scherm
+
+        # Meerpunts polynoom kalibratie (vervangt schaal/offset als actief)
+        self.kalibratie_profiel = None
+
+    def stel_scherm_in(self, breedte, hoogte):
+        """Stel volledige schermgrootte in voor accurate gaze mapping"""
+        self.scherm_breedte = breedte
+        self.scherm_hoogte = hoogte
+
+        # Pas gaze gevoeligheid aan op basis van schermgrootte
+        scherm_ratio = breedte / hoogte
+        if scherm_ratio > 1.5:  # Breed scherm
+            self.gaze_schaal_x = 1.4
+            self.gaze_schaal_y = 1.2
+        else:  # Normaal scherm
+            self.gaze_schaal_x = 1.2
+            self.gaze_schaal_y = 1.1
+
+    def kalibreer_centrum(self, offset_x=0.0, offset_y=0.0):
+        """Kalibreer het centrum punt voor betere nauwkeurigheid"""
+        self.kalibratie_offset_x = offset_x
+        self.kalibratie_offset_y = offset_y
+
+    def pas_gevoeligheid_aan(self, schaal_x=1.5, schaal_y=1.3):
+        """Pas gaze gevoeligheid aan"""
+        self.gaze_schaal_x = schaal_x
+        self.gaze_schaal_y = schaal_y
+
+    def stel_kalibratie_profiel_in(self, profiel):
+        """Activeer een gefit kalibratie profiel (None = terug naar schaal/offset)"""
+        self.kalibratie_profiel = profiel
+        self.vorige_gaze_x = None
+        self.vorige_gaze_y = None
+
+    def kalibreer(self, gem_rel):
+        """Pas kalibratie toe: polynoom profiel of schaal en offset"""
+        if self.kalibratie_profiel is not None:
+            return self.kalibratie_profiel.pas_toe(gem_rel)
+        return gaze_berekening.kalibreer(
+            gem_rel, self.gaze_schaal_x, self.gaze_schaal_y,
+            self.kalibratie_offset_x, self.kalibratie_offset_y
+        )
+
+    def bereken_frame_positie(self, gem_rel, frame_breedte, frame_hoogte):
+        """Kalibratie, frame mapping en afvlakking voor een (1, 2) relatieve gaze"""
+        frame_positie = gaze_berekening.naar_frame_positie(self.kalibreer(gem_rel), frame_breedte, frame_hoogte)
+
+        vorige = None
+        if self.vorige_gaze_x is not None and self.vorige_gaze_y is not None:
+            vorige = (self.vorige_gaze_x, self.vorige_gaze_y)
+        afgevlakt, (self.vorige_gaze_x, self.vorige_gaze_y) = gaze_berekening.afvlakken(
+            frame_positie, self.afvlakkingsFactor, vorige
+        )
+        return afgevlakt
+
+    def kopie(self):
+        """Nieuwe sessie met dezelfde scherm en kalibratie instellingen, zonder afvlakkingstoestand"""
+        sessie = GazeSessie()
+        sessie.scherm_breedte = self.scherm_breedte
+        sessie.scherm_hoogte = self.scherm_hoogte
+        sessie.afvlakkingsFactor = self.afvlakkingsFactor
+        sessie.kalibratie_offset_x = self.kalibratie_offset_x
+        sessie.kalibratie_offset_y = self.kalibratie_offset_y
+        sessie.gaze_schaal_x = self.gaze_schaal_x
+        sessie.gaze_schaal_y = self.gaze_schaal_y
+        sessie.kalibratie_profiel = self.kalibratie_profiel
+        return sessie
+
+    def bereken(self, meting):
+        """Gaze resultaat voor deze sessie uit een gedeelde meting (zie OogDetectie.meet)"""
+        if meting is None:
+            return None
+        return bereken_gezichten([self], [meting])[0]
+
+    def verwerk_batch(self, landmarks, timestamps, frame_breedte, frame_hoogte, **overschrijvingen):
+        """Herverwerk een opgenomen sessie met de huidige (of overschreven) kalibratie.
+
+        Raakt de afvlakkingstoestand van de streaming route niet aan.
+        """
+        parameters = {
+            "scherm_breedte": self.scherm_breedte,
+            "scherm_hoogte": self.scherm_hoogte,
+            "schaal_x": self.gaze_schaal_x,
+            "schaal_y": self.gaze_schaal_y,
+            "offset_x": self.kalibratie_offset_x,
+            "offset_y": self.kalibratie_offset_y,
+            "afvlakking": self.afvlakkingsFactor,
+            "profiel": self.kalibratie_profiel
+        }
+        parameters.update(overschrijvingen)
+        return gaze_berekening.verwerk_batch(landmarks, timestamps, frame_breedte, frame_hoogte, **parameters)
+
+
+def bereken_gezichten(sessies, metingen):
+    """Goedkope stap voor F gezichten tegelijk: sessies[i] hoort bij metingen[i].
+
+    Kalibratie, frame mapping, afvlakking en scherm mapping zijn vector bewerkingen
+    over alle gezichten; alleen polynoom profielen worden per gezicht toegepast.
+    """
+    if not metingen:
+        return []
+
+    frame_breedte = metingen[0]["frame_breedte"]
+    frame_hoogte = metingen[0]["frame_hoogte"]
+    gem_rel = np.stack([meting["gem_rel"] for meting in metingen])
+
+    # Schaal en offset als arrays, zodat de lineaire kalibratie een enkele bewerking is
+    gecalibreerd = gaze_berekening.kalibreer(
+        gem_rel,
+        np.array([s.gaze_schaal_x for s in sessies]), np.array([s.gaze_schaal_y for s in sessies]),
+        np.array([s.kalibratie_offset_x for s in sessies]), np.array([s.kalibratie_offset_y for s in sessies])
+    )
+    for i, sessie in enumerate(sessies):
+        if "gekalibreerd" in metingen[i]:
+            # Multi camera fusie: al met het profiel van elke camera in schermruimte
+            gecalibreerd[i] = metingen[i]["gekalibreerd"]
+        elif sessie.kalibratie_profiel is not None:
+            gecalibreerd[i] = sessie.kalibratie_profiel.pas_toe(gem_rel[i:i + 1])[0]
+
+    posities = gaze_berekening.naar_frame_positie(gecalibreerd, frame_breedte, frame_hoogte)
+
+    # Een afvlakkingsstap per gezicht, als vector over alle gezichten
+    heeft_vorige = np.array([s.vorige_gaze_x is not None and s.vorige_gaze_y is not None for s in sessies])
+    if heeft_vorige.any():
+        factor = np.array([s.afvlakkingsFactor for s in sessies])[:, np.newaxis]
+        vorige = np.array([(s.vorige_gaze_x, s.vorige_gaze_y) if heeft else (0.0, 0.0)
+                           for s, heeft in zip(sessies, heeft_vorige)])
+        afgevlakt = factor * vorige + (1 - factor) * posities
+        posities = np.where(heeft_vorige[:, np.newaxis], afgevlakt, posities)
+    for sessie, (x, y) in zip(sessies, posities.tolist()):
+        sessie.vorige_gaze_x = x
+        sessie.vorige_gaze_y = y
+
+    scherm = gaze_berekening.naar_scherm(
+        posities, frame_breedte, frame_hoogte,
+        np.array([s.scherm_breedte for s in sessies]), np.array([s.scherm_hoogte for s in sessies])
+    )
+
+    return [{
+        "x": float(scherm[i, 0]),
+        "y": float(scherm[i, 1]),
+        "confidence": meting["confidence"],
+        "gezicht_id": meting.get("gezicht_id", 0),
+        "ogen_aantal": 2,  # MediaPipe detecteert altijd beide ogen
+        "gezicht_gevonden": True,
+        "iris_detectie": True,
+        "linker_iris": meting["linker_iris"],
+        "rechter_iris": meting["rechter_iris"]
+    } for i, meting in enumerate(metingen)]
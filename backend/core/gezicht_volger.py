@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Gezicht volger module voor Focus Tuin
+Stabiele gezicht ID's over frames door koppeling aan de dichtstbijzijnde vorige positie
+"""
+
+import time
+import numpy as np
+from .configuratie import EYE_TRACKING_CONFIG
+
+
+class GezichtVolger:
+    """Koppelt gedetecteerde gezichten per frame aan bestaande ID's"""
+
+    def __init__(self, koppel_afstand=None, vergeet_tijd=None):
+        # Afstanden in genormaliseerde frame coordinaten (0-1)
+        self.koppel_afstand = koppel_afstand or EYE_TRACKING_CONFIG['gezicht_koppel_afstand']
+        self.vergeet_tijd = vergeet_tijd or EYE_TRACKING_CONFIG['gezicht_vergeet_tijd']
+        self.sporen = {}  # id -> {"positie": ndarray(2), "laatst_gezien": float}
+        self._volgende_id = 0
+
+    def koppel(self, posities, nu=None):
+        """Geef een ID per positie in (F, 2); onbekende gezichten krijgen een nieuw ID"""
+        nu = time.time() if nu is None else nu
+
+        # Vergeten sporen opruimen voordat er gekoppeld wordt
+        for gezicht_id in [gid for gid, spoor in self.sporen.items()
+                           if nu - spoor["laatst_gezien"] > self.vergeet_tijd]:
+            del self.sporen[gezicht_id]
+
+        posities = np.asarray(posities, dtype=np.float64).reshape(-1, 2)
+        ids = [None] * len(posities)
+        spoor_ids = list(self.sporen)
+
+        if spoor_ids and len(posities):
+            vorige = np.stack([self.sporen[gid]["positie"] for gid in spoor_ids])
+            afstanden = np.linalg.norm(posities[:, None, :] - vorige[None, :, :], axis=2)
+
+            # Gretig koppelen op oplopende afstand; bij een paar gezichten gelijk aan optimaal
+            vrije_sporen = set(range(len(spoor_ids)))
+            for plat in np.argsort(afstanden, axis=None):
+                rij, kolom = divmod(int(plat), len(spoor_ids))
+                if afstanden[rij, kolom] > self.koppel_afstand:
+                    break
+                if ids[rij] is None and kolom in vrije_sporen:
+                    ids[rij] = spoor_ids[kolom]
+                    vrije_sporen.discard(kolom)
+
+        for i, positie in enumerate(posities):
+            if ids[i] is None:
+                ids[i] = self._volgende_id
+                self._volgende_id += 1
+            self.sporen[ids[i]] = {"positie": positie, "laatst_gezien": nu}
+
+        return ids
+
+    def actieve_ids(self):
+        return set(self.sporen)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Kader buffers module voor Focus Tuin
+Herbruikbare beeldbuffers zodat het frame pad per frame niets nieuws alloceert
+"""
+
+import cv2
+import numpy as np
+
+
+class KaderBuffers:
+    """Gedeelde RGB en grijs conversies per frame, geschreven in vaste buffers via dst="""
+
+    def __init__(self, ring_grootte=3):
+        self._buffers = {}
+        self._ringen = {}
+        self.ring_grootte = ring_grootte
+        self.kader = None
+        self._rgb = None
+        self._grijs = None
+
+    def buffer(self, naam, vorm, dtype=np.uint8):
+        """Buffer met deze naam; alleen opnieuw aangemaakt als vorm of type verandert"""
+        buffer = self._buffers.get(naam)
+        if buffer is None or buffer.shape != vorm or buffer.dtype != dtype:
+            buffer = self._buffers[naam] = np.empty(vorm, dtype)
+        return buffer
+
+    def ring_buffer(self, naam, vorm, bezet, dtype=np.uint8):
+        """Buffer uit een ring die niemand meer leest (bezet: ids van buffers in gebruik).
+
+        Voor frames die tegelijk door meerdere fasen gelezen worden; de ring groeit
+        alleen als alle buffers bezet zijn, bijvoorbeeld door een trage consument.
+        """
+        ring = self._ringen.get(naam)
+        if ring is None or ring[0].shape != vorm or ring[0].dtype != dtype:
+            ring = self._ringen[naam] = [np.empty(vorm, dtype) for _ in range(self.ring_grootte)]
+        for buffer in ring:
+            if id(buffer) not in bezet:
+                return buffer
+        buffer = np.empty(vorm, dtype)
+        ring.append(buffer)
+        return buffer
+
+    def nieuw_frame(self, kader):
+        """Begin een nieuw frame; conversies worden pas bij het eerste gebruik gemaakt"""
+        self.kader = kader
+        self._rgb = None
+        self._grijs = None
+
+    def rgb(self):
+        if self._rgb is None:
+            self._rgb = cv2.cvtColor(self.kader, cv2.COLOR_BGR2RGB, dst=self.buffer("rgb", self.kader.shape))
+        return self._rgb
+
+    def grijs(self):
+        if self._grijs is None:
+            self._grijs = cv2.cvtColor(self.kader, cv2.COLOR_BGR2GRAY, dst=self.buffer("grijs", self.kader.shape[:2]))
+        return self._grijs
+
+    def verklein(self, naam, bron, breedte, hoogte, interpolatie=cv2.INTER_LINEAR):
+        vorm = (hoogte, breedte) + bron.shape[2:]
+        return cv2.resize(bron, (breedte, hoogte), dst=self.buffer(naam, vorm), interpolation=interpolatie)
+
+    def spiegel(self, naam, bron):
+        """Horizontaal gespiegelde kopie in een vaste buffer"""
+        return cv2.flip(bron, 1, dst=self.buffer(naam, bron.shape))
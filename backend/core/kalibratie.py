@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Kalibratie module voor Focus Tuin
+Meerpunts polynoom kalibratie met least squares fit en opgeslagen profielen
+"""
+
+import os
+import re
+import json
+import time
+from datetime import datetime
+import numpy as np
+from .configuratie import KALIBRATIE_CONFIG
+from .gaze_berekening import BEREIK_X, BEREIK_Y, RAND_MIN, RAND_MAX
+
+PROFIEL_VERSIE = 1
+
+
+def polynoom_kenmerken(gem_rel, graad):
+    """Polynoom kenmerken [1, x, y, x^2, xy, y^2, ...] per rij van (N, 2) relatieve gaze"""
+    x = gem_rel[:, 0]
+    y = gem_rel[:, 1]
+    kolommen = [np.ones_like(x)]
+    for totaal in range(1, graad + 1):
+        for macht_y in range(totaal + 1):
+            kolommen.append(x ** (totaal - macht_y) * y ** macht_y)
+    return np.stack(kolommen, axis=1)
+
+
+def aantal_kenmerken(graad):
+    return (graad + 1) * (graad + 2) // 2
+
+
+def scherm_naar_gecalibreerd(doelen, scherm_breedte, scherm_hoogte):
+    """Scherm doelpunten naar de gekalibreerde ruimte die naar_frame_positie verwacht"""
+    u = np.asarray(doelen, dtype=np.float64)[:, 0] / scherm_breedte
+    v = np.asarray(doelen, dtype=np.float64)[:, 1] / scherm_hoogte
+    return np.stack([(2 * u - 1) / BEREIK_X, (2 * v - 1) / BEREIK_Y], axis=1)
+
+
+def gecalibreerd_naar_scherm(gecalibreerd, scherm_breedte, scherm_hoogte):
+    """Inverse van scherm_naar_gecalibreerd, inclusief de zachte frame grenzen"""
+    u = np.clip((gecalibreerd[:, 0] * BEREIK_X + 1) / 2, RAND_MIN, RAND_MAX)
+    v = np.clip((gecalibreerd[:, 1] * BEREIK_Y + 1) / 2, RAND_MIN, RAND_MAX)
+    return np.stack([u * scherm_breedte, v * scherm_hoogte], axis=1)
+
+
+class KalibratieProfiel:
+    """Gefitte polynoom mapping van relatieve gaze naar gekalibreerde ruimte"""
+
+    def __init__(self, coefficienten, graad, camera="", scherm=(0, 0), fout_px=None, punten=0, aangemaakt=None):
+        self.coefficienten = np.asarray(coefficienten, dtype=np.float64)
+        self.graad = graad
+        self.camera = camera
+        self.scherm = tuple(scherm)
+        self.fout_px = fout_px
+        self.punten = punten
+        self.aangemaakt = aangemaakt or datetime.now().isoformat(timespec='seconds')
+
+        if self.coefficienten.shape != (aantal_kenmerken(graad), 2):
+            raise ValueError(f"Coefficienten hebben vorm {self.coefficienten.shape}, "
+                             f"verwacht {(aantal_kenmerken(graad), 2)}")
+
+    def pas_toe(self, gem_rel):
+        """Een matrix vermenigvuldiging per frame: (N, F) kenmerken x (F, 2) coefficienten"""
+        return polynoom_kenmerken(gem_rel, self.graad) @ self.coefficienten
+
+    def als_dict(self):
+        return {
+            "versie": PROFIEL_VERSIE,
+            "camera": self.camera,
+            "scherm": list(self.scherm),
+            "graad": self.graad,
+            "coefficienten": self.coefficienten.tolist(),
+            "fout_px": self.fout_px,
+            "punten": self.punten,
+            "aangemaakt": self.aangemaakt
+        }
+
+    @classmethod
+    def van_dict(cls, data):
+        if data.get("versie") != PROFIEL_VERSIE:
+            raise ValueError(f"Onbekende profiel versie: {data.get('versie')}")
+        return cls(data["coefficienten"], data["graad"], data.get("camera", ""),
+                   data.get("scherm", (0, 0)), data.get("fout_px"), data.get("punten", 0),
+                   data.get("aangemaakt"))
+
+
+class KalibratieVerzamelaar:
+    """Verzamelt (relatieve gaze, scherm doel) paren tijdens een kalibratie sessie"""
+
+    def __init__(self, scherm_breedte, scherm_hoogte, graad=None):
+        self.scherm_breedte = scherm_breedte
+        self.scherm_hoogte = scherm_hoogte
+        self.graad = graad or KALIBRATIE_CONFIG['polynoom_graad']
+        self.ruwe_samples = []
+        self.doelen = []
+
+    def voeg_sample_toe(self, gem_rel, doel_x, doel_y):
+        """Eerst alles omzetten en controleren, zodat samples en doelen even lang blijven"""
+        sample = (float(gem_rel[0]), float(gem_rel[1]))
+        doel = (float(doel_x), float(doel_y))
+        if not np.isfinite(doel).all():
+            raise ValueError(f"Ongeldig kalibratie doelpunt: {doel}")
+        self.ruwe_samples.append(sample)
+        self.doelen.append(doel)
+        return len(self.ruwe_samples)
+
+    def fit(self, camera=""):
+        """Least squares fit; valt terug op lagere graad als er te weinig punten zijn"""
+        if len(self.ruwe_samples) < KALIBRATIE_CONFIG['min_samples']:
+            raise ValueError(f"Te weinig kalibratie samples: {len(self.ruwe_samples)} "
+                             f"(minimaal {KALIBRATIE_CONFIG['min_samples']})")
+
+        ruw = np.array(self.ruwe_samples)
+        doelen = np.array(self.doelen)
+        unieke_doelen = len(np.unique(doelen, axis=0))
+
+        graad = self.graad
+        while graad > 1 and unieke_doelen < aantal_kenmerken(graad):
+            graad -= 1
+
+        kenmerken = polynoom_kenmerken(ruw, graad)
+        doel_ruimte = scherm_naar_gecalibreerd(doelen, self.scherm_breedte, self.scherm_hoogte)
+        coefficienten, _, rang, _ = np.linalg.lstsq(kenmerken, doel_ruimte, rcond=None)
+        if rang < kenmerken.shape[1]:
+            raise ValueError("Kalibratie samples zijn onvoldoende gespreid voor een fit")
+
+        voorspeld = gecalibreerd_naar_scherm(kenmerken @ coefficienten, self.scherm_breedte, self.scherm_hoogte)
+        fout_px = float(np.sqrt(np.mean(np.sum((voorspeld - doelen) ** 2, axis=1))))
+
+        return KalibratieProfiel(coefficienten, graad, camera, (self.scherm_breedte, self.scherm_hoogte),
+                                 fout_px, len(ruw))
+
+
+class ProfielOpslag:
+    """Bewaart kalibratie profielen op schijf, per camera en schermgrootte"""
+
+    def __init__(self, map_pad=None):
+        self.map_pad = map_pad or KALIBRATIE_CONFIG['map']
+
+    @staticmethod
+    def sleutel(camera, scherm_breedte, scherm_hoogte):
+        camera_deel = re.sub(r'[^a-zA-Z0-9]+', '_', str(camera)).strip('_').lower() or "camera"
+        return f"{camera_deel}_{int(scherm_breedte)}x{int(scherm_hoogte)}"
+
+    def _pad(self, camera, scherm_breedte, scherm_hoogte):
+        return os.path.join(self.map_pad, self.sleutel(camera, scherm_breedte, scherm_hoogte) + ".json")
+
+    def bewaar(self, profiel):
+        os.makedirs(self.map_pad, exist_ok=True)
+        pad = self._pad(profiel.camera, *profiel.scherm)
+        tijdelijk = f"{pad}.{int(time.time() * 1000)}.tmp"
+        with open(tijdelijk, 'w', encoding='utf-8') as f:
+            json.dump(profiel.als_dict(), f, indent=2)
+        os.replace(tijdelijk, pad)  # Atomisch, geen half geschreven profielen
+        return pad
+
+    def laad(self, camera, scherm_breedte, scherm_hoogte):
+        pad = self._pad(camera, scherm_breedte, scherm_hoogte)
+        if not os.path.exists(pad):
+            return None
+        try:
+            with open(pad, 'r', encoding='utf-8') as f:
+                return KalibratieProfiel.van_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Kalibratie profiel {pad} kan niet geladen worden: {e}")
+            return None
+
+    def verwijder(self, camera, scherm_breedte, scherm_hoogte):
+        pad = self._pad(camera, scherm_breedte, scherm_hoogte)
+        if os.path.exists(pad):
+            os.remove(pad)
+            return True
+        return False
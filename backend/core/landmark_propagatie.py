@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Landmark propagatie module voor Focus Tuin
+Iris en ooghoek punten tussen FaceMesh keyframes doorzetten met Lucas-Kanade optical flow
+"""
+
+import cv2
+import numpy as np
+from .configuratie import (
+    LINKER_IRIS, RECHTER_IRIS, LINKER_OOG_HOEKEN, RECHTER_OOG_HOEKEN, OPTICAL_FLOW_CONFIG
+)
+
+# Alleen deze punten zijn nodig voor gaze, confidence en gezicht ID's
+OOG_PUNTEN = LINKER_IRIS + RECHTER_IRIS + LINKER_OOG_HOEKEN + RECHTER_OOG_HOEKEN
+
+
+class LandmarkPropagator:
+    """Houdt de oogpunten van de laatste keyframe bij en volgt ze met pyramidal LK"""
+
+    def __init__(self, config=None):
+        self.config = dict(OPTICAL_FLOW_CONFIG, **(config or {}))
+        self.lk_parameters = dict(
+            winSize=(self.config['win_grootte'], self.config['win_grootte']),
+            maxLevel=self.config['max_niveau'],
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        )
+        self.reset()
+
+    def reset(self):
+        self.vorig_grijs = None
+        self.punten = None        # (F, P, 2) float32 pixel coordinaten
+        self.aantal_landmarks = 0
+        self.frames_sinds_keyframe = 0
+
+    def wil_keyframe(self):
+        """True als FaceMesh moet draaien (interval verstreken of geen bruikbare toestand)"""
+        return self.punten is None or self.frames_sinds_keyframe + 1 >= self.config['keyframe_interval']
+
+    def forceer_keyframe(self):
+        self.punten = None
+
+    def zet_keyframe(self, grijs, genormaliseerd):
+        """Sla de oogpunten van een volledige FaceMesh detectie op als startpunt"""
+        hoogte, breedte = grijs.shape[:2]
+        self.punten = (genormaliseerd[:, OOG_PUNTEN] * [breedte, hoogte]).astype(np.float32)
+        self.aantal_landmarks = genormaliseerd.shape[1]
+        self._bewaar_grijs(grijs)
+        self.frames_sinds_keyframe = 0
+
+    def _bewaar_grijs(self, grijs):
+        """Eigen kopie: het grijsbeeld komt uit een gedeelde buffer die elk frame overschreven wordt"""
+        if self.vorig_grijs is None or self.vorig_grijs.shape != grijs.shape:
+            self.vorig_grijs = grijs.copy()
+        else:
+            np.copyto(self.vorig_grijs, grijs)
+
+    def _roi(self, hoogte, breedte):
+        """Kleine uitsnede rond alle oogpunten, zodat LK alleen het oog gebied bekijkt"""
+        marge = self.config['roi_marge']
+        punten = self.punten.reshape(-1, 2)
+        x0 = max(int(punten[:, 0].min()) - marge, 0)
+        y0 = max(int(punten[:, 1].min()) - marge, 0)
+        x1 = min(int(punten[:, 0].max()) + marge + 1, breedte)
+        y1 = min(int(punten[:, 1].max()) + marge + 1, hoogte)
+        return x0, y0, x1, y1
+
+    def propageer(self, grijs):
+        """Volg de oogpunten naar dit frame; None betekent dat opnieuw gedetecteerd moet worden.
+
+        Geeft (F, K, 2) genormaliseerde landmarks terug waarin alleen de oogpunten gevuld zijn.
+        """
+        if self.punten is None or self.vorig_grijs is None or self.vorig_grijs.shape != grijs.shape:
+            return None
+
+        hoogte, breedte = grijs.shape[:2]
+        x0, y0, x1, y1 = self._roi(hoogte, breedte)
+        if x1 - x0 < 8 or y1 - y0 < 8:
+            return None
+
+        vorig_roi = self.vorig_grijs[y0:y1, x0:x1]
+        huidig_roi = grijs[y0:y1, x0:x1]
+        start = (self.punten.reshape(-1, 1, 2) - [x0, y0]).astype(np.float32)
+
+        vooruit, status_v, _ = cv2.calcOpticalFlowPyrLK(vorig_roi, huidig_roi, start, None, **self.lk_parameters)
+        if vooruit is None:
+            return None
+        terug, status_t, _ = cv2.calcOpticalFlowPyrLK(huidig_roi, vorig_roi, vooruit, None, **self.lk_parameters)
+        if terug is None:
+            return None
+
+        # Forward-backward check: elk punt moet na heen-en-terug op zijn plek uitkomen
+        fb_fout = np.linalg.norm((start - terug).reshape(-1, 2), axis=1)
+        geldig = (status_v.ravel() == 1) & (status_t.ravel() == 1) & (fb_fout <= self.config['max_fb_fout'])
+        if not geldig.all():
+            self.forceer_keyframe()
+            return None
+
+        self.punten = (vooruit.reshape(self.punten.shape) + [x0, y0]).astype(np.float32)
+        self._bewaar_grijs(grijs)
+        self.frames_sinds_keyframe += 1
+
+        genormaliseerd = np.zeros((self.punten.shape[0], self.aantal_landmarks, 2))
+        genormaliseerd[:, OOG_PUNTEN] = self.punten / [breedte, hoogte]
+        return genormaliseerd
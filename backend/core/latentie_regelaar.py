@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Latentie regelaar module voor Focus Tuin
+Stapt kwaliteit niveaus omlaag of omhoog op gemeten frametijd, met hysterese
+"""
+
+from .configuratie import LATENTIE_CONFIG, KWALITEIT_NIVEAUS
+
+
+class LatentieRegelaar:
+    """Houdt de verwerkingstijd per frame binnen het budget door kwaliteit te verschuiven"""
+
+    def __init__(self, config=None, niveaus=None):
+        self.config = dict(LATENTIE_CONFIG, **(config or {}))
+        self.niveaus = niveaus or KWALITEIT_NIVEAUS
+        self.niveau_index = 0
+        self.gemiddelde_ms = None
+        self._boven = 0
+        self._onder = 0
+
+    @property
+    def niveau(self):
+        return self.niveaus[self.niveau_index]
+
+    def status(self):
+        """Huidig niveau en gemeten latentie, zoals naar clients gestuurd"""
+        return {
+            "niveau": self.niveau_index,
+            "aantal_niveaus": len(self.niveaus),
+            "gemiddelde_ms": round(self.gemiddelde_ms, 2) if self.gemiddelde_ms is not None else None,
+            "budget_ms": self.config['budget_ms'],
+            **self.niveau
+        }
+
+    def registreer(self, latentie_ms):
+        """Verwerk een frametijd; geeft het nieuwe niveau terug bij een wissel, anders None"""
+        factor = self.config['ema_factor']
+        if self.gemiddelde_ms is None:
+            self.gemiddelde_ms = latentie_ms
+        else:
+            self.gemiddelde_ms = factor * latentie_ms + (1 - factor) * self.gemiddelde_ms
+
+        budget = self.config['budget_ms']
+        if self.gemiddelde_ms > budget * self.config['omlaag_factor']:
+            self._boven += 1
+            self._onder = 0
+        elif self.gemiddelde_ms < budget * self.config['omhoog_factor']:
+            self._onder += 1
+            self._boven = 0
+        else:
+            # Binnen de hysterese band: niets doen
+            self._boven = 0
+            self._onder = 0
+
+        if self._boven >= self.config['omlaag_frames'] and self.niveau_index < len(self.niveaus) - 1:
+            return self._wissel(self.niveau_index + 1)
+        if self._onder >= self.config['omhoog_frames'] and self.niveau_index > 0:
+            return self._wissel(self.niveau_index - 1)
+        return None
+
+    def _wissel(self, index):
+        self.niveau_index = index
+        self._boven = 0
+        self._onder = 0
+        # Meting van het oude niveau zegt weinig over het nieuwe
+        self.gemiddelde_ms = None
+        return self.niveau
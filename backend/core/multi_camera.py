@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Multi camera module voor Focus Tuin
+Meerdere cameras tegelijk, elk met eigen capture thread en detector, gefuseerd tot een gaze schatting
+"""
+
+import threading
+import time
+import numpy as np
+from .camera_manager import CameraDetectie
+from .oog_detectie import maak_oog_detector
+from .kader_buffers import KaderBuffers
+from .configuratie import MULTI_CAMERA_CONFIG, PERFORMANCE_CONFIG
+
+
+def _directe_aanroep(functie, *args):
+    return functie(*args)
+
+
+def fuseer_primair(leider, resultaten, profielen, config=None):
+    """Confidence-gewogen gaze van het primaire gezicht, in gekalibreerde (scherm) ruimte.
+
+    gem_rel hangt af van de plaats en hoek van elke camera: elk kanaal gaat eerst
+    met zijn eigen kalibratie profiel (profielen: index -> KalibratieProfiel) naar
+    schermruimte. Zonder profiel voor de leider is er geen gemeenschappelijke
+    ruimte en blijft de meting van de leider ongewijzigd. Gezicht ID's zijn per
+    camera; of het primaire gezicht overal dezelfde persoon is volgt uit
+    overeenstemming: alleen kanalen binnen max_afwijking van de leider, binnen
+    max_tijdsverschil_ms van zijn opname en met voldoende confidence wegen mee.
+    Overige gezichten en ID's komen van de leider.
+    """
+    config = config or MULTI_CAMERA_CONFIG
+    metingen = leider["metingen"]
+    profiel = profielen.get(leider["index"])
+    if not metingen or profiel is None:
+        return metingen
+
+    leider_positie = profiel.pas_toe(metingen[0]["gem_rel"][np.newaxis])[0]
+    posities = [leider_positie]
+    gewichten = [metingen[0]["confidence"]]
+    for resultaat in resultaten:
+        profiel = profielen.get(resultaat["index"])
+        if resultaat is leider or profiel is None or not resultaat["metingen"]:
+            continue
+        meting = resultaat["metingen"][0]
+        if abs(resultaat["capture_ms"] - leider["capture_ms"]) > config["max_tijdsverschil_ms"] \
+                or meting["confidence"] < config["min_confidence"]:
+            continue
+        positie = profiel.pas_toe(meting["gem_rel"][np.newaxis])[0]
+        if np.hypot(*(positie - leider_positie)) > config["max_afwijking"]:
+            continue  # Ander gezicht of slecht gekalibreerde camera
+        posities.append(positie)
+        gewichten.append(meting["confidence"])
+
+    # bereken_gezichten gebruikt gekalibreerd in plaats van de kalibratie van de sessie
+    gekalibreerd = np.average(np.stack(posities), axis=0, weights=gewichten)
+    primair = dict(metingen[0], gekalibreerd=gekalibreerd, camera_aantal=len(posities),
+                   bron="fusie" if len(posities) > 1 else metingen[0].get("bron"))
+    return [primair] + metingen[1:]
+
+
+class CameraKanaal:
+    """Een camera met eigen detector en capture thread; bewaart alleen het laatste resultaat"""
+
+    def __init__(self, index, beschikbare_cameras, nieuw, blokkerend=None, bezet=None):
+        self.index = index
+        self.camera = CameraDetectie()
+        self.camera.beschikbare_cameras = beschikbare_cameras
+        self.detector = maak_oog_detector()
+        self.nieuw = nieuw  # Gedeeld met MultiCamera: gezet bij elk nieuw resultaat
+        self.blokkerend = blokkerend or _directe_aanroep
+
+        # Frame kopieen in een ring; bezet() geeft ids van frames die verderop nog gelezen worden
+        self.buffers = KaderBuffers()
+        self.bezet = bezet or set
+        self.uitgegeven = None  # id van het frame dat MultiCamera als laatste teruggaf
+
+        self.lock = threading.Lock()
+        self.resultaat = None
+        self.volgnummer = 0
+        self.fps = 0.0
+        self.loopt = False
+        self.thread = None
+
+        # Probe: lage rate zolang een andere camera een zeker gezicht heeft
+        self._probe = False
+        self._wekker = threading.Event()
+
+    @property
+    def naam(self):
+        camera_info = self.camera.krijg_huidige_camera_info()
+        return camera_info['naam'] if camera_info else f"Camera {self.index}"
+
+    @property
+    def probe(self):
+        return self._probe
+
+    @probe.setter
+    def probe(self, waarde):
+        if self._probe and not waarde:
+            self._wekker.set()  # Direct terug naar volle rate, niet de probe pauze uitzitten
+        self._probe = waarde
+
+    def start(self):
+        if not self.blokkerend(self.camera.start_camera, self.index):
+            return False
+        self.loopt = True
+        self.thread = threading.Thread(target=self._loop, name=f"camera-{self.index}", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.loopt = False
+        self._wekker.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.camera.stop_camera()
+
+    def laatste(self):
+        with self.lock:
+            return self.resultaat
+
+    def _loop(self):
+        vorige_start = None
+        while self.loopt:
+            start = time.perf_counter()
+            frame = self.blokkerend(self.camera.krijg_frame)
+            if frame is None:
+                time.sleep(0.1)
+                continue
+            capture_ms = self.camera.laatste_capture_ms or time.monotonic() * 1000
+            metingen = self.blokkerend(self.detector.meet_gezichten, frame, capture_ms)
+
+            # Eigen kopie: de camera buffer wordt bij de volgende grab hergebruikt
+            with self.lock:
+                bezet = {self.uitgegeven, id(self.resultaat["frame"]) if self.resultaat else None}
+            kopie = self.buffers.ring_buffer("frame", frame.shape, bezet | self.bezet(), frame.dtype)
+            np.copyto(kopie, frame)
+            resultaat = {
+                "index": self.index,
+                "frame": kopie,
+                "capture_ms": capture_ms,
+                "metingen": metingen,
+                "actieve_ids": self.detector.gezicht_volger.actieve_ids()
+            }
+            with self.lock:
+                self.volgnummer += 1
+                resultaat["volgnummer"] = self.volgnummer
+                self.resultaat = resultaat
+            self.nieuw.set()
+
+            if vorige_start is not None:
+                self.fps = 0.9 * self.fps + 0.1 / max(start - vorige_start, 1e-6)
+            vorige_start = start
+
+            interval = 1.0 / (MULTI_CAMERA_CONFIG['probe_hz'] if self._probe else PERFORMANCE_CONFIG['target_fps'])
+            self._wekker.wait(max(interval - (time.perf_counter() - start), 0.001))
+            self._wekker.clear()
+
+
+class MultiCamera:
+    """Fuseert de kanalen tot een resultaat per nieuw frame van de leidende camera.
+
+    De leider is het kanaal met de hoogste confidence op het primaire gezicht (met
+    hysterese). Heeft de leider een zekere lock, dan zakken de andere kanalen naar
+    de probe rate; bij verlies van de lock draaien alle kanalen weer op volle rate.
+    """
+
+    def __init__(self, indices, beschikbare_cameras, blokkerend=None, config=None, bezet=None):
+        self.config = dict(MULTI_CAMERA_CONFIG, **(config or {}))
+        self.nieuw = threading.Event()
+        self.kanalen = [CameraKanaal(index, beschikbare_cameras, self.nieuw, blokkerend, bezet) for index in indices]
+        self.profielen = {}  # index -> KalibratieProfiel van die camera, voor de fusie
+        self.leider = None
+        self.lock_actief = False
+        self._geleverd = None  # (index, volgnummer) van het laatst teruggegeven resultaat
+
+        # Zelfde vorm als OogDetectie, voor kalibratie samples
+        self.laatste_meting = None
+        self.laatste_metingen = {}
+
+    def start(self):
+        """Start alle kanalen; kanalen die niet starten vallen af. False bij minder dan twee"""
+        self.kanalen = [kanaal for kanaal in self.kanalen if kanaal.start()]
+        if len(self.kanalen) < 2:
+            print(f"Multi camera: slechts {len(self.kanalen)} camera(s) gestart")
+            self.stop()
+            return False
+        print(f"Multi camera gestart met cameras {[kanaal.index for kanaal in self.kanalen]}")
+        return True
+
+    def stop(self):
+        for kanaal in self.kanalen:
+            kanaal.stop()
+        self.nieuw.set()
+
+    @property
+    def actief(self):
+        return any(kanaal.loopt for kanaal in self.kanalen)
+
+    def namen(self):
+        return [kanaal.naam for kanaal in self.kanalen]
+
+    def leider_naam(self):
+        """Naam van de leidende camera: kalibratie samples komen van zijn ruwe meting"""
+        kanaal = next((k for k in self.kanalen if k.index == self.leider), None) or self.kanalen[0]
+        return kanaal.naam
+
+    def laad_profielen(self, opslag, scherm_breedte, scherm_hoogte):
+        """Kalibratie profiel per camera; kanalen zonder profiel doen niet mee aan de fusie"""
+        self.profielen = {kanaal.index: opslag.laad(kanaal.naam, scherm_breedte, scherm_hoogte)
+                          for kanaal in self.kanalen}
+        gekalibreerd = [index for index, profiel in self.profielen.items() if profiel is not None]
+        print(f"Multi camera: kalibratie profielen voor cameras {gekalibreerd}")
+
+    def stel_inferentie_breedte_in(self, breedte):
+        for kanaal in self.kanalen:
+            kanaal.detector.inferentie_breedte = breedte
+
+    @staticmethod
+    def _score(resultaat):
+        return resultaat["metingen"][0]["confidence"] if resultaat["metingen"] else -1.0
+
+    def _kies_leider(self, resultaten):
+        beste = max(resultaten, key=lambda index: self._score(resultaten[index]))
+        if self.leider not in resultaten or (
+            self._score(resultaten[beste]) > self._score(resultaten[self.leider]) + self.config['wissel_marge']
+        ):
+            self.leider = beste
+
+        self.lock_actief = self._score(resultaten[self.leider]) >= self.config['lock_confidence']
+        for kanaal in self.kanalen:
+            kanaal.probe = self.lock_actief and kanaal.index != self.leider
+
+    def wacht_op_resultaat(self, timeout):
+        """(frame, capture_ms, metingen, actieve_ids) van de leider met gefuseerd primair gezicht.
+
+        None als er binnen timeout geen nieuw frame van de leider is.
+        """
+        if not self.nieuw.wait(timeout):
+            return None
+        self.nieuw.clear()
+
+        nu_ms = time.monotonic() * 1000
+        resultaten = {}
+        for kanaal in self.kanalen:
+            resultaat = kanaal.laatste()
+            if resultaat is not None and nu_ms - resultaat["capture_ms"] <= self.config['max_leeftijd_ms']:
+                resultaten[kanaal.index] = resultaat
+        if not resultaten:
+            return None
+
+        self._kies_leider(resultaten)
+        leider = resultaten[self.leider]
+        sleutel = (self.leider, leider["volgnummer"])
+        if sleutel == self._geleverd:
+            return None  # Alleen een ander kanaal is bijgewerkt
+        self._geleverd = sleutel
+        kanaal = next(k for k in self.kanalen if k.index == self.leider)
+        with kanaal.lock:
+            kanaal.uitgegeven = id(leider["frame"])  # Tot de capture fase het in de pipeline zet
+
+        metingen = fuseer_primair(leider, resultaten.values(), self.profielen, self.config)
+        if metingen:
+            self.laatste_meting = metingen[0]
+            self.laatste_metingen = {meting["gezicht_id"]: meting for meting in metingen}
+        return leider["frame"], leider["capture_ms"], metingen, leider["actieve_ids"]
+
+    def status(self):
+        kanalen = []
+        for kanaal in self.kanalen:
+            resultaat = kanaal.laatste()
+            kanalen.append({
+                'index': kanaal.index,
+                'naam': kanaal.naam,
+                'fps': round(kanaal.fps, 1),
+                'probe': kanaal.probe,
+                'confidence': round(self._score(resultaat), 3) if resultaat and resultaat["metingen"] else None
+            })
+        return {'leider': self.leider, 'lock': self.lock_actief, 'kanalen': kanalen}
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Native lock module voor Focus Tuin
+Locks van het besturingssysteem voor data die native threads delen, ook onder eventlet/gevent
+"""
+
+import sys
+import threading
+
+
+def _originele_threading(naam):
+    """Lock of RLock uit de ongepatchte threading module.
+
+    Een green lock in een native thread (eventlet tpool, gevent threadpool, de
+    MediaPipe callback) heeft geen hub om op te wachten; zulke locks moeten van
+    het OS zijn. Zonder monkey patching is dat gewoon threading.
+    """
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        if patcher.is_monkey_patched('thread'):
+            return getattr(patcher.original('threading'), naam)
+    if 'gevent' in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            return monkey.get_original('threading', naam)
+    return getattr(threading, naam)
+
+
+def native_lock():
+    """Lock voor korte kritieke secties die ook native threads binnengaan"""
+    return _originele_threading('Lock')()
+
+
+def native_rlock():
+    return _originele_threading('RLock')()
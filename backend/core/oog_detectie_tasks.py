@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Oog detectie tasks module voor Focus Tuin
+Asynchrone detector backend op MediaPipe Tasks FaceLandmarker in LIVE_STREAM modus
+"""
+
+import os
+import time
+import numpy as np
+import mediapipe as mp
+from .configuratie import EYE_TRACKING_CONFIG, CAMERA_CONFIG
+from .oog_detectie import OogDetectie
+from .native_lock import native_lock
+
+try:
+    from mediapipe.tasks.python import BaseOptions
+    from mediapipe.tasks.python import vision as _vision
+except Exception as e:
+    print(f"MediaPipe Tasks import warning: {e}")
+    _vision = None
+
+
+class TasksOogDetectie(OogDetectie):
+    """Zelfde metingen als OogDetectie, maar inferentie loopt los van de capture loop.
+
+    Frames worden met een monotone timestamp ingediend; MediaPipe laat frames vallen
+    zolang de vorige nog bezig is. De callback bewaart alleen het nieuwste resultaat,
+    de capture thread zet dat om naar metingen.
+    """
+
+    def _maak_detector(self):
+        if _vision is None:
+            raise ImportError("MediaPipe Tasks vision module could not be imported")
+
+        model_pad = EYE_TRACKING_CONFIG['face_landmarker_model']
+        if not os.path.exists(model_pad):
+            raise FileNotFoundError(f"FaceLandmarker model niet gevonden: {model_pad}")
+
+        self._resultaat_lock = native_lock()  # Callback draait in een MediaPipe thread
+        self._nieuw_resultaat = None      # (timestamp_ms, landmarks, breedte, hoogte)
+        self._laatste_timestamp_ms = -1
+        self._laatste_metingen = []
+        self._laatste_metingen_ms = None
+        self._kader_afmetingen = None
+
+        opties = _vision.FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_pad),
+            running_mode=_vision.RunningMode.LIVE_STREAM,
+            num_faces=EYE_TRACKING_CONFIG['max_gezichten'],
+            min_face_detection_confidence=CAMERA_CONFIG['detection_confidence'],
+            min_tracking_confidence=CAMERA_CONFIG['tracking_confidence'],
+            result_callback=self._ontvang_resultaat
+        )
+        self.face_landmarker = _vision.FaceLandmarker.create_from_options(opties)
+
+        # Optical flow keyframes gaan uit van synchrone detectie
+        self.propagator = None
+
+    def sluit(self):
+        self.face_landmarker.close()
+
+    def _ontvang_resultaat(self, resultaat, uitvoer_beeld, timestamp_ms):
+        """Callback uit de MediaPipe thread: alleen opslaan, niet rekenen"""
+        landmarks = None
+        if resultaat.face_landmarks:
+            landmarks = np.array([[(p.x, p.y) for p in gezicht] for gezicht in resultaat.face_landmarks])
+        with self._resultaat_lock:
+            if self._nieuw_resultaat is None or timestamp_ms > self._nieuw_resultaat[0]:
+                breedte, hoogte = self._kader_afmetingen or (uitvoer_beeld.width, uitvoer_beeld.height)
+                self._nieuw_resultaat = (timestamp_ms, landmarks, breedte, hoogte)
+
+    def _dien_in(self, kader, capture_ms=None):
+        """Stuur een frame naar de landmarker zonder op het resultaat te wachten"""
+        # Opname tijd als timestamp, zodat het resultaat bij zijn eigen frame hoort;
+        # timestamps moeten strikt oplopen, ook als twee frames dezelfde ms krijgen
+        bron_ms = capture_ms if capture_ms is not None else time.monotonic() * 1000
+        timestamp_ms = max(int(bron_ms), self._laatste_timestamp_ms + 1)
+        self._laatste_timestamp_ms = timestamp_ms
+
+        # Pixel afmetingen van het originele kader, ook als inferentie verkleind draait
+        self._kader_afmetingen = (kader.shape[1], kader.shape[0])
+        self.buffers.nieuw_frame(kader)
+        rgb_kader = self._inferentie_kader(self.buffers.rgb())
+        beeld = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_kader)
+        try:
+            self.face_landmarker.detect_async(beeld, timestamp_ms)
+        except Exception as e:
+            print(f"DEBUG: FaceLandmarker detect_async error: {e}")
+
+    def meet_gezichten(self, kader, capture_ms=None):
+        """Dien het frame in en geef metingen van het nieuwste binnengekomen resultaat.
+
+        Zonder nieuw resultaat blijven de vorige metingen geldig tot ze ouder zijn
+        dan max_resultaat_leeftijd; te late resultaten vervallen zo vanzelf.
+        """
+        if kader is None:
+            return []
+
+        self._dien_in(kader, capture_ms)
+
+        with self._resultaat_lock:
+            nieuw, self._nieuw_resultaat = self._nieuw_resultaat, None
+
+        if nieuw is not None:
+            timestamp_ms, landmarks, breedte, hoogte = nieuw
+            self._laatste_metingen_ms = timestamp_ms
+            if landmarks is None:
+                self._laatste_metingen = []
+            else:
+                self._laatste_metingen = self._meet_landmarks(landmarks, breedte, hoogte, bron="face_landmarker",
+                                                              capture_ms=float(timestamp_ms))
+
+        if self._laatste_metingen_ms is None:
+            return []
+        leeftijd = (time.monotonic() * 1000 - self._laatste_metingen_ms) / 1000
+        if leeftijd > EYE_TRACKING_CONFIG['max_resultaat_leeftijd']:
+            return []
+        return self._laatste_metingen
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Pipeline module voor Focus Tuin
+Fasen met eigen worker, verbonden door kanalen met de laatste waarde of een begrensde wachtrij
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class LaatsteWaardeKanaal:
+    """Begrensd kanaal van grootte een: een nieuwe waarde vervangt de vorige.
+
+    Een trage lezer krijgt altijd de nieuwste waarde in plaats van een groeiende
+    achterstand. Meerdere lezers kunnen tegelijk lezen; elk houdt zelf bij welk
+    volgnummer het laatst gezien is. Het kanaal onthoudt welke waarde elke lezer
+    verwerkt, zodat een bron zijn buffers kan hergebruiken zodra niemand ze meer leest.
+    """
+
+    def __init__(self, naam):
+        self.naam = naam
+        self.volgnummer = 0
+        self.waarde = None
+        self._conditie = threading.Condition()
+        self._in_gebruik = {}  # lezer -> waarde die hij nu verwerkt
+
+    def zet(self, waarde):
+        with self._conditie:
+            self.volgnummer += 1
+            self.waarde = waarde
+            self._conditie.notify_all()
+
+    def wacht(self, gezien, timeout, lezer=None):
+        """(volgnummer, waarde) zodra er iets nieuwer dan gezien is, of None na timeout.
+
+        Met een lezer blijft de waarde als in gebruik geregistreerd tot klaar(lezer).
+        """
+        with self._conditie:
+            if self.volgnummer == gezien:
+                self._conditie.wait(timeout)
+            if self.volgnummer == gezien:
+                return None
+            if lezer is not None:
+                self._in_gebruik[lezer] = self.waarde
+            return self.volgnummer, self.waarde
+
+    def klaar(self, lezer):
+        with self._conditie:
+            self._in_gebruik.pop(lezer, None)
+
+    def bezet(self):
+        """Waarden die nog gelezen worden of kunnen worden: de laatste plus alles in verwerking"""
+        with self._conditie:
+            return [self.waarde] + list(self._in_gebruik.values())
+
+    def wek(self):
+        with self._conditie:
+            self._conditie.notify_all()
+
+
+class WachtrijKanaal(LaatsteWaardeKanaal):
+    """Begrensde FIFO: elke lezer krijgt alle waarden op volgorde, zolang hij niet
+    meer dan grootte achterloopt.
+
+    Voor resultaten die allemaal opgeslagen of verstuurd moeten worden (gaze samples),
+    waar de laatste waarde alleen te veel weggooit zodra een lezer even hapert. Loopt
+    een lezer verder achter, dan vervalt de oudste waarde; Fase telt die als overgeslagen.
+    """
+
+    def __init__(self, naam, grootte):
+        super().__init__(naam)
+        self._waarden = deque(maxlen=grootte)
+
+    def zet(self, waarde):
+        with self._conditie:
+            self.volgnummer += 1
+            self.waarde = waarde
+            self._waarden.append(waarde)
+            self._conditie.notify_all()
+
+    def wacht(self, gezien, timeout, lezer=None):
+        """(volgnummer, waarde) van de oudste waarde na gezien die nog bewaard is, of None na timeout"""
+        with self._conditie:
+            if self.volgnummer == gezien:
+                self._conditie.wait(timeout)
+            if self.volgnummer == gezien:
+                return None
+            eerste = self.volgnummer - len(self._waarden) + 1
+            volgnummer = max(gezien + 1, eerste)
+            waarde = self._waarden[volgnummer - eerste]
+            if lezer is not None:
+                self._in_gebruik[lezer] = waarde
+            return volgnummer, waarde
+
+    def bezet(self):
+        with self._conditie:
+            return list(self._waarden) + list(self._in_gebruik.values())
+
+
+class Fase:
+    """Een stap van de pipeline: leest uit een kanaal (of niets, voor een bron) en schrijft naar een kanaal.
+
+    functie krijgt de invoer waarde (bron fasen geen argument) en geeft de uitvoer
+    terug, of None als er niets te publiceren is. hz begrenst de rate; mag een
+    callable zijn voor een rate die tijdens het draaien verandert.
+    """
+
+    def __init__(self, naam, functie, invoer=None, uitvoer=None, hz=None):
+        self.naam = naam
+        self.functie = functie
+        self.invoer = invoer
+        self.uitvoer = uitvoer
+        self.hz = hz
+
+        self.verwerkt = 0
+        self.overgeslagen = 0   # Invoer waarden die overschreven werden voordat deze fase ze las
+        self.gemiddelde_ms = None
+        self._gezien = 0
+        self._laatste_start = None
+        self.fps = 0.0
+
+    def interval(self):
+        hz = self.hz() if callable(self.hz) else self.hz
+        return 1.0 / hz if hz else 0.0
+
+    def stap(self):
+        """Een keer invoer lezen en verwerken; geeft de verwerkingstijd in seconden of None"""
+        if self.invoer is not None:
+            item = self.invoer.wacht(self._gezien, 0.1, lezer=self)
+            if item is None:
+                return None
+            volgnummer, waarde = item
+            if self._gezien:
+                self.overgeslagen += volgnummer - self._gezien - 1
+            self._gezien = volgnummer
+            start = time.perf_counter()
+            try:
+                resultaat = self.functie(waarde)
+            finally:
+                self.invoer.klaar(self)
+        else:
+            start = time.perf_counter()
+            resultaat = self.functie()
+        duur = time.perf_counter() - start
+
+        if resultaat is not None and self.uitvoer is not None:
+            self.uitvoer.zet(resultaat)
+        self.verwerkt += 1
+        duur_ms = duur * 1000
+        self.gemiddelde_ms = duur_ms if self.gemiddelde_ms is None else 0.9 * self.gemiddelde_ms + 0.1 * duur_ms
+        if self._laatste_start is not None:
+            self.fps = 0.9 * self.fps + 0.1 / max(start - self._laatste_start, 1e-6)
+        self._laatste_start = start
+        return duur
+
+    def status(self):
+        return {
+            'invoer': self.invoer.naam if self.invoer else None,
+            'uitvoer': self.uitvoer.naam if self.uitvoer else None,
+            'fps': round(self.fps, 1),
+            'gemiddelde_ms': round(self.gemiddelde_ms, 2) if self.gemiddelde_ms is not None else None,
+            'verwerkt': self.verwerkt,
+            'overgeslagen': self.overgeslagen
+        }
+
+
+class Pipeline:
+    """Graaf van fasen; elke fase draait in een eigen worker (thread of greenlet).
+
+    Nieuwe consumenten haken aan op een bestaand kanaal met voeg_fase_toe, ook
+    terwijl de pipeline draait, zonder de andere fasen aan te passen.
+    """
+
+    def __init__(self):
+        self.kanalen = {}
+        self.fasen = {}
+        self.loopt = False
+        self._start_taak = None
+        self._slaap = time.sleep
+        self._actief = 0
+        self._lock = threading.Lock()
+
+    def kanaal(self, naam, wachtrij=None):
+        """Kanaal op naam; met wachtrij (grootte) bij het aanmaken een FIFO in plaats van laatste waarde"""
+        if naam not in self.kanalen:
+            self.kanalen[naam] = WachtrijKanaal(naam, wachtrij) if wachtrij else LaatsteWaardeKanaal(naam)
+        return self.kanalen[naam]
+
+    def voeg_fase_toe(self, naam, functie, invoer=None, uitvoer=None, hz=None):
+        if naam in self.fasen:
+            raise ValueError(f"Fase '{naam}' bestaat al")
+        fase = Fase(naam, functie, self.kanaal(invoer) if invoer else None,
+                    self.kanaal(uitvoer) if uitvoer else None, hz)
+        self.fasen[naam] = fase
+        if self.loopt:
+            self._start_fase(fase)
+        return fase
+
+    def verwijder_fase(self, naam):
+        """De worker stopt na zijn huidige stap"""
+        self.fasen.pop(naam, None)
+
+    def start(self, start_taak=None, slaap=None):
+        """start_taak(functie, *args) start een worker; standaard een daemon thread"""
+        self._start_taak = start_taak or self._start_thread
+        self._slaap = slaap or time.sleep
+        self.loopt = True
+        for fase in list(self.fasen.values()):
+            self._start_fase(fase)
+
+    def stop(self):
+        self.loopt = False
+        for kanaal in self.kanalen.values():
+            kanaal.wek()
+
+    @staticmethod
+    def _start_thread(functie, *args):
+        thread = threading.Thread(target=functie, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    def _start_fase(self, fase):
+        # Hier al tellen, zodat wacht_op_einde ook een nog niet gestarte worker afwacht
+        with self._lock:
+            self._actief += 1
+        self._start_taak(self._draai, fase)
+
+    def _draai(self, fase):
+        try:
+            while self.loopt and self.fasen.get(fase.naam) is fase:
+                try:
+                    duur = fase.stap()
+                except Exception as e:
+                    print(f"Fout in pipeline fase '{fase.naam}': {e}")
+                    self._slaap(0.1)
+                    continue
+                if duur is None:
+                    continue
+                wacht = fase.interval() - duur
+                if wacht > 0:
+                    self._slaap(wacht)
+        finally:
+            with self._lock:
+                self._actief -= 1
+
+    def wacht_op_einde(self, timeout):
+        """Wacht (na stop) tot alle workers hun laatste stap afgerond hebben"""
+        einde = time.monotonic() + timeout
+        while self._actief and time.monotonic() < einde:
+            self._slaap(0.01)
+        return self._actief == 0
+
+    def status(self):
+        return {naam: fase.status() for naam, fase in self.fasen.items()}
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Profielen module voor Focus Tuin
+Benoemde prestatie profielen: validatie en het bijwerken van de gedeelde configuratie
+"""
+
+from .configuratie import (
+    PROFIELEN, KWALITEIT_NIVEAUS, PERFORMANCE_CONFIG, OPTICAL_FLOW_CONFIG, LEVERING_CONFIG,
+    HUB_CONFIG, HTTP_GAZE_CONFIG
+)
+
+PROFIEL_VELDEN = {
+    "capture", "target_fps", "keyframe_interval", "kwaliteit_niveaus",
+    "levering_hz", "levering_batch_ms", "hub_batch_hz", "sse_hz"
+}
+
+
+def _positief(profiel, veld, naam):
+    waarde = profiel[veld]
+    if isinstance(waarde, bool) or not isinstance(waarde, (int, float)) or waarde <= 0:
+        raise ValueError(f"Profiel '{naam}': {veld} moet een positief getal zijn")
+    return waarde
+
+
+def controleer_profiel(naam, profielen=None):
+    """Gevalideerd profiel met kwaliteit niveaus als dicts; ValueError bij een fout.
+
+    Alles wordt vooraf gecontroleerd, zodat toepassen daarna niet halverwege kan falen.
+    """
+    profielen = PROFIELEN if profielen is None else profielen
+    if naam not in profielen:
+        raise ValueError(f"Onbekend profiel '{naam}' (kies uit {', '.join(profielen)})")
+    profiel = profielen[naam]
+
+    ontbrekend = PROFIEL_VELDEN - set(profiel)
+    onbekend = set(profiel) - PROFIEL_VELDEN
+    if ontbrekend or onbekend:
+        raise ValueError(f"Profiel '{naam}': ontbrekend {sorted(ontbrekend)}, onbekend {sorted(onbekend)}")
+
+    for veld in ("target_fps", "hub_batch_hz"):
+        _positief(profiel, veld, naam)
+    if _positief(profiel, "sse_hz", naam) > HTTP_GAZE_CONFIG['max_sse_hz']:
+        raise ValueError(f"Profiel '{naam}': sse_hz boven {HTTP_GAZE_CONFIG['max_sse_hz']}")
+    if not isinstance(profiel["keyframe_interval"], int) or profiel["keyframe_interval"] < 1:
+        raise ValueError(f"Profiel '{naam}': keyframe_interval moet een geheel getal van minstens 1 zijn")
+    if not LEVERING_CONFIG['min_hz'] <= _positief(profiel, "levering_hz", naam) <= LEVERING_CONFIG['max_hz']:
+        raise ValueError(f"Profiel '{naam}': levering_hz buiten {LEVERING_CONFIG['min_hz']}-{LEVERING_CONFIG['max_hz']}")
+    if not (LEVERING_CONFIG['min_batch_ms'] <= _positief(profiel, "levering_batch_ms", naam)
+            <= LEVERING_CONFIG['max_batch_ms']):
+        raise ValueError(f"Profiel '{naam}': levering_batch_ms buiten "
+                         f"{LEVERING_CONFIG['min_batch_ms']}-{LEVERING_CONFIG['max_batch_ms']}")
+
+    capture = profiel["capture"]
+    if capture is not None:
+        if set(capture) != {"breedte", "hoogte", "fps"}:
+            raise ValueError(f"Profiel '{naam}': capture heeft breedte, hoogte en fps nodig")
+        for veld in ("breedte", "hoogte", "fps"):
+            _positief(capture, veld, naam)
+
+    niveaus_per_naam = {niveau["naam"]: niveau for niveau in KWALITEIT_NIVEAUS}
+    namen = profiel["kwaliteit_niveaus"]
+    if not namen or any(niveau not in niveaus_per_naam for niveau in namen):
+        raise ValueError(f"Profiel '{naam}': kwaliteit_niveaus moet bestaan uit {', '.join(niveaus_per_naam)}")
+
+    return dict(profiel, naam=naam, kwaliteit_niveaus=[niveaus_per_naam[niveau] for niveau in namen])
+
+
+def pas_config_toe(profiel):
+    """Zet de waarden die per gebruik uit de configuratie gelezen worden (rates, standaarden)"""
+    PERFORMANCE_CONFIG['target_fps'] = profiel["target_fps"]
+    OPTICAL_FLOW_CONFIG['actief'] = profiel["keyframe_interval"] > 1
+    OPTICAL_FLOW_CONFIG['keyframe_interval'] = profiel["keyframe_interval"]
+    LEVERING_CONFIG['standaard_hz'] = float(profiel["levering_hz"])
+    LEVERING_CONFIG['standaard_batch_ms'] = float(profiel["levering_batch_ms"])
+    HUB_CONFIG['batch_hz'] = profiel["hub_batch_hz"]
+    HTTP_GAZE_CONFIG['sse_hz'] = float(profiel["sse_hz"])
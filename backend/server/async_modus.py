@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Async modus module voor Focus Tuin
+Kiest de Socket.IO async backend (threading, eventlet, gevent) en een native thread pool voor blokkerend werk
+"""
+
+ASYNC_MODI = ("threading", "eventlet", "gevent")
+
+_modus = "threading"
+
+
+def activeer(modus):
+    """Monkey patch de standaard bibliotheek voor eventlet/gevent.
+
+    Moet aangeroepen worden voordat eye_server (en daarmee Flask, OpenCV en de
+    threading module van de server) geimporteerd wordt.
+    """
+    global _modus
+    if modus not in ASYNC_MODI:
+        raise ValueError(f"Onbekende async modus '{modus}' (kies uit {', '.join(ASYNC_MODI)})")
+    if modus == "eventlet":
+        import eventlet
+        eventlet.monkey_patch()
+    elif modus == "gevent":
+        from gevent import monkey
+        monkey.patch_all()
+    if modus != "threading":
+        print(f"Async modus '{modus}' is experimenteel: locks die native threads delen zijn OS locks (native_lock)")
+    _modus = modus
+    return modus
+
+
+def huidige_modus():
+    return _modus
+
+
+def blokkerend(functie, *args):
+    """Voer een blokkerende C-aanroep (camera grab, inferentie) uit zonder de event loop te blokkeren.
+
+    Bij threading draait de aanroeper al in een eigen OS thread; bij eventlet/gevent
+    gaat de aanroep naar de native thread pool, zodat andere verbindingen doorlopen.
+    """
+    if _modus == "eventlet":
+        from eventlet import tpool
+        return tpool.execute(functie, *args)
+    if _modus == "gevent":
+        import gevent
+        return gevent.get_hub().threadpool.apply(functie, args)
+    return functie(*args)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Binaire codering module voor Focus Tuin
+Vaste struct records voor de hoog-frequente stream events, als opt-in alternatief voor JSON
+"""
+
+import struct
+import numpy as np
+from .sessie_opname import GAZE_RECORD, GAZE_VELDEN, ASCII_HEADER, pak_gaze, lees_gaze
+
+# Alle binaire berichten gaan via dit event; het eerste byte bepaalt het oorspronkelijke event
+BINAIR_EVENT = "stream_bin"
+
+CODERING_JSON = "json"
+CODERING_STRUCT = "struct"
+CODERINGEN = (CODERING_JSON, CODERING_STRUCT)
+
+TYPE_GAZE = 1         # gaze_data: GAZE_RECORD
+TYPE_ASCII = 2        # ascii_webcam_frame met luminance: ASCII_HEADER + breedte * hoogte bytes
+TYPE_ASCII_RIJEN = 3  # ascii_webcam_frame met rijen: ASCII_HEADER + breedte * hoogte Latin-1 bytes
+TYPE_GEZICHTEN = 4    # gaze_faces: LIJST_HEADER + aantal * GAZE_RECORD
+TYPE_BATCH = 5        # gaze_batch: LIJST_HEADER + aantal * GAZE_RECORD
+
+BERICHT_TYPE = struct.Struct('<B')
+# Lijst: timestamp, aantal records
+LIJST_HEADER = struct.Struct('<dH')
+
+
+def _gaze_lijst(type_code, gezichten, timestamp):
+    return b''.join([BERICHT_TYPE.pack(type_code), LIJST_HEADER.pack(timestamp, len(gezichten))]
+                    + [pak_gaze(gezicht) for gezicht in gezichten])
+
+
+def codeer(event, data):
+    """Stream event naar bytes, of None als er geen vaste layout voor is (dan blijft het JSON)"""
+    if event == 'gaze_data' and set(data) == GAZE_VELDEN:
+        return BERICHT_TYPE.pack(TYPE_GAZE) + pak_gaze(data)
+    if event == 'gaze_faces' and all(set(g) == GAZE_VELDEN for g in data['gezichten']):
+        return _gaze_lijst(TYPE_GEZICHTEN, data['gezichten'], data['timestamp'])
+    if event == 'gaze_batch' and all(set(g) == GAZE_VELDEN for g in data['samples']):
+        return _gaze_lijst(TYPE_BATCH, data['samples'], data['timestamp'])
+    if event == 'ascii_webcam_frame':
+        header = ASCII_HEADER.pack(data['width'], data['height'], data['timestamp'])
+        if 'rows' in data:
+            return BERICHT_TYPE.pack(TYPE_ASCII_RIJEN) + header + ''.join(data['rows']).encode('latin-1')
+        return BERICHT_TYPE.pack(TYPE_ASCII) + header + np.asarray(data['luminance_data'], dtype=np.uint8).tobytes()
+    return None
+
+
+def decodeer(bericht):
+    """Bytes terug naar (event, data); spiegel van de decoder in de frontend"""
+    (type_code,) = BERICHT_TYPE.unpack_from(bericht)
+    offset = BERICHT_TYPE.size
+    if type_code == TYPE_GAZE:
+        return 'gaze_data', lees_gaze(bericht, offset)
+    if type_code in (TYPE_GEZICHTEN, TYPE_BATCH):
+        timestamp, aantal = LIJST_HEADER.unpack_from(bericht, offset)
+        offset += LIJST_HEADER.size
+        gezichten = [lees_gaze(bericht, offset + i * GAZE_RECORD.size) for i in range(aantal)]
+        if type_code == TYPE_GEZICHTEN:
+            return 'gaze_faces', {'gezichten': gezichten, 'timestamp': timestamp}
+        return 'gaze_batch', {'samples': gezichten, 'timestamp': timestamp}
+    if type_code in (TYPE_ASCII, TYPE_ASCII_RIJEN):
+        breedte, hoogte, timestamp = ASCII_HEADER.unpack_from(bericht, offset)
+        inhoud = bytes(bericht[offset + ASCII_HEADER.size:])
+        data = {'width': breedte, 'height': hoogte, 'timestamp': timestamp}
+        if type_code == TYPE_ASCII_RIJEN:
+            tekst = inhoud.decode('latin-1')
+            data['rows'] = [tekst[i:i + breedte] for i in range(0, len(tekst), breedte)]
+        else:
+            data['luminance_data'] = np.frombuffer(inhoud, dtype=np.uint8).reshape(hoogte, breedte).tolist()
+        return 'ascii_webcam_frame', data
+    raise ValueError(f"Onbekend binair bericht type {type_code}")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Client sessie module voor Focus Tuin
+Per verbonden Socket.IO client: eigen gaze mapping, kalibratie en tracking status
+"""
+
+import threading
+import time
+from ..core.gaze_sessie import GazeSessie
+from ..core.configuratie import EYE_TRACKING_CONFIG
+from ..core.gaze_doelen import GazeDoelVolger
+from .klok_sync import KlokSchatter, LatentieVerdeling
+from .gaze_levering import GazeLevering
+from .binaire_codering import CODERING_JSON, CODERING_STRUCT
+
+# Room waarin alle tracking clients zitten (gedeelde ASCII stream)
+TRACKING_ROOM = "tracking"
+# Clients zonder palet krijgen ruwe luminance; met palet een gedeelde room per palet (en codering)
+ASCII_RUW_ROOM = "ascii_ruw"
+
+
+def ascii_room(palet, binair=False):
+    room = f"ascii:{palet}" if palet else ASCII_RUW_ROOM
+    return room + ":bin" if binair else room
+
+
+class ClientSessie:
+    """Toestand van een enkele verbonden client"""
+
+    def __init__(self, sid):
+        self.sid = sid
+        self.gaze = GazeSessie()
+        self.gezicht_sessies = {}  # gezicht_id -> GazeSessie in multi-bezoeker modus
+        self.gezicht_lock = threading.Lock()  # Pipeline en socket handlers wijzigen gezicht_sessies
+        self.volgt = False
+        self.hub = False  # Venue hub die de gebundelde binaire stream ontvangt
+        self.ascii_palet = None  # None: ruwe luminance (0-255) in plaats van ASCII rijen
+        self.doelen = GazeDoelVolger()  # Geregistreerde schermdoelen in het scherm van deze client
+        self.levering = GazeLevering()  # Hoe vaak en in welke vorm deze client gaze krijgt
+        self.codering = CODERING_JSON   # Bij connect onderhandeld: 'json' of 'struct'
+        self.kalibratie_verzamelaar = None
+        self.kalibratie_gezicht_id = None
+        self.verbonden_sinds = time.time()
+        
+        # Klok offset en latentie verdelingen (capture -> emit, capture -> render)
+        self.klok = KlokSchatter()
+        self.latentie_emit = LatentieVerdeling()
+        self.latentie_render = LatentieVerdeling()
+
+    @property
+    def room(self):
+        """Elke client heeft een eigen room (Socket.IO maakt die per sid aan)"""
+        return self.sid
+
+    @property
+    def binair(self):
+        return self.codering == CODERING_STRUCT
+
+    @property
+    def ascii_room(self):
+        return ascii_room(self.ascii_palet, self.binair)
+
+    def latentie_status(self):
+        return {
+            'capture_naar_emit': self.latentie_emit.samenvatting(),
+            'capture_naar_render': self.latentie_render.samenvatting(),
+            'klok_offset_ms': self.klok.offset_ms,
+            'klok_rtt_ms': self.klok.rtt_ms
+        }
+        
+    def gaze_sessies_voor(self, metingen, actieve_ids=()):
+        """Gaze sessie per meting; in multi-bezoeker modus een eigen sessie per gezicht ID.
+
+        Nieuwe gezichten erven scherm en kalibratie van de basis sessie; gezichten
+        die de volger vergeten is, worden ook hier opgeruimd.
+        """
+        if EYE_TRACKING_CONFIG['max_gezichten'] <= 1:
+            return [self.gaze for _ in metingen]
+
+        ids = [meting["gezicht_id"] for meting in metingen]
+        with self.gezicht_lock:
+            for gezicht_id in [gid for gid in self.gezicht_sessies if gid not in ids and gid not in actieve_ids]:
+                del self.gezicht_sessies[gezicht_id]
+            for gezicht_id in ids:
+                if gezicht_id not in self.gezicht_sessies:
+                    self.gezicht_sessies[gezicht_id] = self.gaze.kopie()
+            return [self.gezicht_sessies[gezicht_id] for gezicht_id in ids]
+
+    def gaze_voor_gezicht(self, gezicht_id=None):
+        """Doel voor kalibratie: een specifiek gezicht of de basis sessie"""
+        with self.gezicht_lock:
+            if gezicht_id is None:
+                # Basis wijzigt: gezicht sessies opnieuw laten afleiden
+                self.gezicht_sessies.clear()
+                return self.gaze
+            sessie = self.gezicht_sessies.get(gezicht_id)
+            if sessie is None:
+                sessie = self.gezicht_sessies[gezicht_id] = self.gaze.kopie()
+            return sessie
@@ -4,27 +4,172 @@ Focus Tuin Eye-tracking Server
 Eenvoudige oogtracking server met modulaire opzet
 """
 
-from flask import Flask
-from flask_socketio import SocketIO, emit
+from flask import Flask, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import threading
 import time
 import os
 from datetime import datetime
 from typing import Optional
-import cv2
 import numpy as np
 import base64
 
 from ..core.camera_manager import CameraDetectie
-from ..core.oog_detectie import OogDetectie
-from ..core.configuratie import SERVER_CONFIG, PERFORMANCE_CONFIG
+from ..core.oog_detectie import maak_oog_detector
+from ..core.multi_camera import MultiCamera
+from ..core.camera_waakhond import CameraWaakhond
+from ..core.kader_buffers import KaderBuffers
+from ..core.pipeline import Pipeline
+from ..core.aandacht_opslag import AandachtOpslag
+from ..core.kalibratie import KalibratieVerzamelaar, ProfielOpslag
+from ..core.gaze_sessie import bereken_gezichten
+from ..core.latentie_regelaar import LatentieRegelaar
+from ..core.landmark_propagatie import LandmarkPropagator
+from ..core.profielen import controleer_profiel, pas_config_toe
+from ..core.ascii_palet import PaletKwantiseerder, controleer_palet
+from ..core.configuratie import (
+    SERVER_CONFIG, PERFORMANCE_CONFIG, OPSLAG_CONFIG, KALIBRATIE_CONFIG, EYE_TRACKING_CONFIG,
+    LATENTIE_CONFIG, KWALITEIT_NIVEAUS, RECORDER_CONFIG, HUB_CONFIG, MULTI_CAMERA_CONFIG,
+    WAAKHOND_CONFIG, PROFIELEN, STANDAARD_PROFIEL
+)
+from .client_sessie import ClientSessie, TRACKING_ROOM, ascii_room
+from .binaire_codering import BINAIR_EVENT, CODERINGEN, CODERING_JSON, codeer
+from .async_modus import huidige_modus, blokkerend
+from .gaze_levering import MODUS_ELK
+from .klok_sync import monotone_ms
+from .sessie_opname import SessieRecorder, lees_opname
+from .hub_link import HubUitzender, HUB_ROOM
+from .http_gaze import GazeMomentopname, registreer_routes
 
 class OogtrackingServer:
     def __init__(self):
         self.camera = CameraDetectie()
-        self.oog_detector = OogDetectie()
+        self.oog_detector = maak_oog_detector()
+        self.multi_camera: Optional[MultiCamera] = None  # Alleen met MULTI_CAMERA_CONFIG['actief']
+        # Capture met deadline en herstel op de achtergrond; zonder waakhond leest de loop zelf
+        self.waakhond: Optional[CameraWaakhond] = (
+            CameraWaakhond(self.camera, blokkerend) if WAAKHOND_CONFIG['actief'] else None
+        )
         self.is_actief = False
-        self.tracking_thread: Optional[threading.Thread] = None
+        self.tracking_thread = None  # Background task van socketio (thread of greenlet)
+        self.stream_loopt = False
+        self.stream_lock = threading.Lock()
+        self.camera_lock = threading.Lock()  # Loop leest geen frames tijdens een camera wissel
+        
+        # Tracking als graaf van fasen; consumenten haken aan op een kanaal (voeg_consument_toe)
+        self.pipeline: Optional[Pipeline] = None
+        self.consumenten = []
+        # Eigen buffers voor de ASCII fase, die naast de detector op een andere thread draait
+        self.ascii_buffers = KaderBuffers()
+        # Ring van frame buffers voor het 'frame' kanaal; een buffer wordt pas hergebruikt
+        # als geen fase hem meer leest
+        self.capture_buffers = KaderBuffers()
+        self.opslag: Optional[AandachtOpslag] = AandachtOpslag() if OPSLAG_CONFIG['actief'] else None
+        self.profiel_opslag = ProfielOpslag()
+        
+        # Per-client toestand; de tracking loop leest een kopie van de lijst
+        self.sessies: dict[str, ClientSessie] = {}
+        self.sessie_lock = threading.Lock()
+        
+        # Canonieke mapping (standaard scherm, geen client kalibratie) voor de opslag
+        self.opslag_sessie = ClientSessie(None)
+        
+        # Kwaliteit niveau volgens het latentie budget
+        self.regelaar: Optional[LatentieRegelaar] = LatentieRegelaar() if LATENTIE_CONFIG['actief'] else None
+        self.pas_kwaliteit_toe(self.regelaar.niveau if self.regelaar else KWALITEIT_NIVEAUS[0])
+        
+        # Prestatie profiel; tijdens tracking wacht een nieuw profiel op de volgende frame grens
+        self.profiel = None
+        self.volgend_profiel = None
+        self.profiel_lock = threading.Lock()
+        if STANDAARD_PROFIEL:
+            self.kies_profiel(STANDAARD_PROFIEL)
+        
+        # Opname van de uitgaande stream en replay modus (opname afspelen i.p.v. camera)
+        self.recorder: Optional[SessieRecorder] = SessieRecorder() if RECORDER_CONFIG['actief'] else None
+        self.replay_pad: Optional[str] = None
+        self.replay_snelheid = 1.0
+        
+        # Gebundelde binaire stream voor venue hubs (kosten onafhankelijk van aantal dashboards)
+        self.hub_uitzender = HubUitzender(self.opslag_sessie.gaze.scherm_breedte, self.opslag_sessie.gaze.scherm_hoogte)
+        
+        # ASCII rijen per palet, een keer per frame gedeeld door alle clients met dat palet
+        self.kwantiseerder = PaletKwantiseerder()
+        
+        # Laatste sample voor HTTP clients; de loop vervangt alleen een referentie
+        self.momentopname = GazeMomentopname()
+        
+    def krijg_sessie(self, sid):
+        """Bestaande of nieuwe sessie voor een client"""
+        with self.sessie_lock:
+            sessie = self.sessies.get(sid)
+            if sessie is None:
+                sessie = self.sessies[sid] = ClientSessie(sid)
+            return sessie
+            
+    def verwijder_sessie(self, sid):
+        with self.sessie_lock:
+            return self.sessies.pop(sid, None)
+            
+    def volgende_sessies(self):
+        """Momentopname van sessies die gaze data willen ontvangen"""
+        with self.sessie_lock:
+            return [sessie for sessie in self.sessies.values() if sessie.volgt]
+            
+    def ascii_ontvangers(self):
+        """Gebruikte (palet, binair) combinaties; palet None betekent ruwe luminance"""
+        with self.sessie_lock:
+            return {(sessie.ascii_palet, sessie.binair) for sessie in self.sessies.values() if sessie.volgt}
+            
+    def heeft_ontvangers(self):
+        """Iemand wil de stream: een volgende client of een hub"""
+        with self.sessie_lock:
+            return any(sessie.volgt or sessie.hub for sessie in self.sessies.values())
+            
+    def heeft_hubs(self):
+        with self.sessie_lock:
+            return any(sessie.hub for sessie in self.sessies.values())
+            
+    def start_stream_thread(self, socketio):
+        """Start de tracking (of replay) loop als background task als die nog niet draait.
+        
+        Via socketio.start_background_task, zodat de loop een greenlet is onder
+        eventlet/gevent en een gewone thread in threading modus.
+        """
+        with self.stream_lock:
+            if self.stream_loopt:
+                # Loop die net gestopt is maar nog niet klaar is, gaat gewoon door
+                self.is_actief = True
+                return
+            self.stream_loopt = True
+            
+        doel = self.start_replay if self.replay_pad else self.start_tracking
+        
+        def loop():
+            try:
+                doel(socketio)
+            finally:
+                with self.stream_lock:
+                    self.stream_loopt = False
+                    
+        self.tracking_thread = socketio.start_background_task(loop)
+            
+    def verstuur_hub(self, socketio, tijd_ms, gezichten):
+        """Voeg samples toe aan de hub bundel en verstuur die als het interval om is"""
+        if not self.heeft_hubs():
+            return
+        self.hub_uitzender.voeg_toe(tijd_ms, gezichten)
+        batch = self.hub_uitzender.batch(monotone_ms())
+        if batch:
+            self.verstuur(socketio, 'hub_batch', batch, HUB_ROOM, opnemen=False)
+            
+    def camera_actief(self):
+        if self.multi_camera is not None:
+            return self.multi_camera.actief
+        if self.waakhond is not None and self.waakhond.herstelt:
+            return True  # Heropenen loopt al op de achtergrond
+        camera = self.camera.huidige_camera
+        return camera is not None and camera.isOpened()
         
     def start_systeem(self, preferred_camera_index=0):
         """Start camera systeem met voorkeursindex"""
@@ -39,12 +184,15 @@ class OogtrackingServer:
         
         print(f"Beschikbare cameras: {[c['naam'] for c in self.camera.beschikbare_cameras]}")
         
+        if MULTI_CAMERA_CONFIG['actief'] and self.start_multi_camera():
+            return True
+        
         # Controleer of voorkeurscamera beschikbaar is
         voorkeur_beschikbaar = any(cam['index'] == preferred_camera_index for cam in self.camera.beschikbare_cameras)
         
         if voorkeur_beschikbaar:
             print(f"Probeer voorkeurscamera {preferred_camera_index}...")
-            success = self.camera.start_camera(preferred_camera_index)
+            success = blokkerend(self.camera.start_camera, preferred_camera_index)
             if success:
                 print(f"Camera {preferred_camera_index} start succesvol")
                 return True
@@ -61,7 +209,7 @@ class OogtrackingServer:
                 continue
                 
             print(f"Fallback: Camera {camera_index} starten...")
-            success = self.camera.start_camera(camera_index)
+            success = blokkerend(self.camera.start_camera, camera_index)
             if success:
                 print(f"Fallback: Camera {camera_index} succesvol")
                 return True
@@ -69,120 +217,480 @@ class OogtrackingServer:
         print("Fout: Geen werkende cameras gevonden")
         return False
         
+    def start_multi_camera(self):
+        """Alle (of de ingestelde) cameras tegelijk; False als er minder dan twee werken"""
+        indices = [c['index'] for c in self.camera.beschikbare_cameras
+                   if MULTI_CAMERA_CONFIG['indices'] is None or c['index'] in MULTI_CAMERA_CONFIG['indices']]
+        if len(indices) < 2:
+            return False
+        self.camera.stop_camera()
+        multi_camera = MultiCamera(indices, self.camera.beschikbare_cameras, blokkerend, bezet=self.frames_in_gebruik)
+        if not multi_camera.start():
+            print("Multi camera niet mogelijk, terug naar een enkele camera")
+            return False
+        self.multi_camera = multi_camera
+        self.multi_camera.stel_inferentie_breedte_in(self.oog_detector.inferentie_breedte)
+        return True
+        
+    def ruwe_metingen(self):
+        """Bron van de laatste ruwe metingen (detector of multi camera fusie) voor kalibratie"""
+        return self.multi_camera if self.multi_camera is not None else self.oog_detector
+        
+    def camera_naam(self):
+        """Naam van de actieve camera, gebruikt als sleutel voor kalibratie profielen"""
+        if self.multi_camera is not None:
+            # Elke camera heeft een eigen profiel; kalibreren gebeurt op de ruwe meting van de leider
+            return self.multi_camera.leider_naam()
+        camera_info = self.camera.krijg_huidige_camera_info()
+        return camera_info['naam'] if camera_info else f"Camera {self.camera.camera_index}"
+        
+    def laad_kalibratie_profiel(self, gaze_sessie):
+        """Laad het opgeslagen profiel voor huidige camera en de schermgrootte van de sessie"""
+        profiel = self.profiel_opslag.laad(
+            self.camera_naam(), gaze_sessie.scherm_breedte, gaze_sessie.scherm_hoogte
+        )
+        gaze_sessie.stel_kalibratie_profiel_in(profiel)
+        if profiel:
+            print(f"Kalibratie profiel geladen ({profiel.punten} samples, fout {profiel.fout_px:.1f}px)")
+        if self.multi_camera is not None:
+            self.multi_camera.laad_profielen(self.profiel_opslag, gaze_sessie.scherm_breedte, gaze_sessie.scherm_hoogte)
+        return profiel
+        
+    def pas_kwaliteit_toe(self, niveau):
+        """Zet inferentie resolutie en ASCII stream instellingen van een kwaliteit niveau"""
+        self.oog_detector.inferentie_breedte = niveau['inferentie_breedte']
+        if self.multi_camera is not None:
+            self.multi_camera.stel_inferentie_breedte_in(niveau['inferentie_breedte'])
+        self.ascii_fps = niveau['ascii_fps']
+        self.ascii_breedte = niveau['ascii_breedte']
+        self.ascii_hoogte = niveau['ascii_hoogte']
+        
+    def kwaliteit_status(self):
+        return self.regelaar.status() if self.regelaar else None
+        
+    def kies_profiel(self, naam, socketio=None):
+        """Kies een benoemd profiel; ValueError bij een onbekend of ongeldig profiel.
+        
+        Geeft True als het direct is toegepast. Tijdens tracking past de landmarks fase
+        het tussen twee frames in een keer toe, zodat geen frame half oude en half
+        nieuwe instellingen ziet.
+        """
+        profiel = controleer_profiel(naam)
+        with self.profiel_lock:
+            self.volgend_profiel = profiel
+        if self.pipeline is not None and self.pipeline.loopt:
+            return False
+        self.pas_volgend_profiel_toe(socketio)
+        return True
+        
+    def pas_volgend_profiel_toe(self, socketio=None):
+        """Zet config, optical flow, kwaliteit niveaus en capture formaat van het gekozen profiel"""
+        with self.profiel_lock:
+            profiel, self.volgend_profiel = self.volgend_profiel, None
+        if profiel is None:
+            return
+        pas_config_toe(profiel)
+        
+        # Alleen de synchrone FaceMesh detector kent optical flow tussen keyframes
+        if EYE_TRACKING_CONFIG['detector_backend'] == "face_mesh":
+            interval = profiel['keyframe_interval']
+            self.oog_detector.propagator = LandmarkPropagator() if interval > 1 else None
+        
+        # Regelaar begint opnieuw binnen de niveaus van het profiel
+        if LATENTIE_CONFIG['actief']:
+            self.regelaar = LatentieRegelaar(niveaus=profiel['kwaliteit_niveaus'])
+        self.pas_kwaliteit_toe(self.regelaar.niveau if self.regelaar else profiel['kwaliteit_niveaus'][0])
+        
+        if self.multi_camera is not None:
+            print("Multi camera modus: capture formaat en optical flow van de kanalen blijven ongewijzigd")
+        else:
+            with self.camera_lock:
+                if self.waakhond is not None:
+                    self.waakhond.stop()  # Wacht tot de capture thread uit de camera is; de loop start hem weer
+                resolutie = blokkerend(self.camera.stel_profiel_formaat_in, profiel['capture'])
+            if resolutie:
+                print(f"Capture formaat {resolutie[0]}x{resolutie[1]}")
+        
+        self.profiel = profiel['naam']
+        print(f"Prestatie profiel '{self.profiel}' toegepast")
+        if socketio is not None:
+            socketio.emit('profile', self.profiel_status(toegepast=True), to=TRACKING_ROOM)
+            if self.regelaar:
+                socketio.emit('quality_level', self.kwaliteit_status(), to=TRACKING_ROOM)
+        
+    def profiel_status(self, toegepast=True):
+        return {'naam': self.profiel, 'toegepast': toegepast, 'profielen': list(PROFIELEN)}
+        
+    def verstuur(self, socketio, event, data, to, opnemen=True, binair=False):
+        """Enige uitgaande route voor stream events; live tracking en replay delen deze.
+        
+        Met binair gaan events met een vaste layout als struct record via BINAIR_EVENT.
+        """
+        bericht = codeer(event, data) if binair else None
+        if bericht is not None:
+            socketio.emit(BINAIR_EVENT, bericht, to=to)
+        else:
+            socketio.emit(event, data, to=to)
+        if opnemen and self.recorder:
+            self.recorder.registreer(event, data)
+            
+    def verstuur_ascii(self, socketio, grid, tijd_ms, opnemen=True):
+        """ASCII frame naar alle clients: per palet een keer gekwantiseerd, ruwe luminance alleen als nodig"""
+        hoogte, breedte = grid.shape
+        rijen = {}
+        for palet, binair in self.ascii_ontvangers():
+            data = {'width': breedte, 'height': hoogte, 'timestamp': tijd_ms}
+            if palet:
+                if palet not in rijen:
+                    rijen[palet] = self.kwantiseerder.rijen(grid, palet)
+                data['rows'] = rijen[palet]
+            else:
+                # Binair leest de grid direct; JSON heeft geneste lijsten nodig
+                data['luminance_data'] = grid if binair else grid.tolist()
+            self.verstuur(socketio, 'ascii_webcam_frame', data, ascii_room(palet, binair), opnemen=False, binair=binair)
+            
+        # Opname bewaart altijd de ruwe luminance, zodat replay elk palet kan bedienen
+        if opnemen and self.recorder:
+            self.recorder.registreer('ascii_webcam_frame', {
+                'width': breedte, 'height': hoogte, 'luminance_data': grid, 'timestamp': tijd_ms
+            })
+        
+    def verstuur_gaze(self, socketio, sessie, gezichten, tijd_ms, opnemen=True, alle_gezichten=None):
+        """Gaze events voor een sessie volgens haar leveringsmodus.
+        
+        De opname krijgt altijd elk sample, los van hoe deze client het ontvangt.
+        """
+        if alle_gezichten is None:
+            alle_gezichten = EYE_TRACKING_CONFIG['max_gezichten'] > 1
+        if opnemen and self.recorder:
+            self.recorder.registreer('gaze_data', gezichten[0])
+            if alle_gezichten:
+                self.recorder.registreer('gaze_faces', {'gezichten': gezichten, 'timestamp': tijd_ms})
+                
+        events = sessie.levering.voeg_toe(gezichten, tijd_ms, alle_gezichten)
+        for event, data in events:
+            self.verstuur(socketio, event, data, sessie.room, opnemen=False, binair=sessie.binair)
+        if events:
+            sessie.latentie_emit.voeg_toe(monotone_ms() - gezichten[0]['capture_ms'])
+        
+    def verstuur_doelen(self, socketio, sessie, gezichten, tijd_ms):
+        """Enter/leave/dwell voor de doelen van deze client; niets als er geen doelen zijn"""
+        if not sessie.doelen.actief:
+            return
+        for gebeurtenis in sessie.doelen.verwerk(gezichten, tijd_ms):
+            socketio.emit(f"gaze_{gebeurtenis['type']}", gebeurtenis, to=sessie.room)
+        
     def start_tracking(self, socketio):
-        """Start oogtracking loop met webcam ASCII streaming"""
+        """Start de tracking pipeline en wacht tot tracking gestopt wordt.
+        
+        Elke fase draait als eigen background task, zodat de ASCII en gaze streams
+        op hun eigen rate lopen en een trage fase de andere niet ophoudt.
+        """
         self.is_actief = True
-        frame_teller = 0
-        laatste_debug = time.time()
-        laatste_ascii_frame = time.time()
-        ascii_fps = 15  # 15 FPS voor vloeiendere ASCII webcam feed
-        ascii_interval = 1.0 / ascii_fps
+        self.laatste_debug = time.time()
         
-        print("Oogtracking gestart met ASCII webcam streaming")
+        while True:
+            self.pas_volgend_profiel_toe(socketio)
+            pipeline = self.pipeline = self.bouw_pipeline(socketio)
+            pipeline.start(socketio.start_background_task, socketio.sleep)
+            print("Oogtracking gestart met ASCII webcam streaming")
+            
+            while self.is_actief:
+                socketio.sleep(0.1)
+            pipeline.stop()
+            # Detector en sessies zijn niet thread-safe: een volgende pipeline pas na de laatste stap
+            pipeline.wacht_op_einde(2.0)
+            
+            # Tijdens het afbouwen opnieuw gestart (start_stream_thread zette is_actief terug)
+            with self.stream_lock:
+                if not self.is_actief:
+                    return
         
-        while self.is_actief:
-            frame = self.camera.krijg_frame()
-            if frame is None:
-                time.sleep(0.1)
+    def bouw_pipeline(self, socketio):
+        """Standaard graaf plus de aangehaakte consumenten.
+        
+        capture -> frame -> landmarks -> metingen -> gaze -> gaze_resultaat -> emit,
+        en ascii leest naast landmarks hetzelfde frame kanaal. gaze_resultaat is een wachtrij.
+        """
+        pipeline = Pipeline()
+        frame_kanaal = pipeline.kanaal('frame')
+        # Frames: alleen de nieuwste telt. Gaze resultaten worden allemaal opgeslagen en
+        # verstuurd: een korte hapering van emit mag geen samples kosten
+        pipeline.kanaal('gaze_resultaat', wachtrij=PERFORMANCE_CONFIG['gaze_wachtrij'])
+        pipeline.voeg_fase_toe('capture', lambda: self.fase_capture(socketio, frame_kanaal), uitvoer='frame',
+                               hz=lambda: None if self.multi_camera is not None else PERFORMANCE_CONFIG['target_fps'])
+        pipeline.voeg_fase_toe('landmarks', lambda item: self.fase_landmarks(socketio, item),
+                               invoer='frame', uitvoer='metingen')
+        pipeline.voeg_fase_toe('gaze', self.fase_gaze, invoer='metingen', uitvoer='gaze_resultaat')
+        pipeline.voeg_fase_toe('emit', lambda item: self.fase_emit(socketio, item), invoer='gaze_resultaat')
+        pipeline.voeg_fase_toe('ascii', lambda item: self.fase_ascii(socketio, item), invoer='frame',
+                               hz=lambda: self.ascii_fps)
+        for consument in self.consumenten:
+            pipeline.voeg_fase_toe(**consument)
+        return pipeline
+        
+    def voeg_consument_toe(self, naam, functie, invoer, uitvoer=None, hz=None):
+        """Extra fase op een kanaal ('frame', 'metingen', 'gaze_resultaat'), ook tijdens tracking"""
+        consument = {'naam': naam, 'functie': functie, 'invoer': invoer, 'uitvoer': uitvoer, 'hz': hz}
+        self.consumenten.append(consument)
+        if self.pipeline is not None and self.pipeline.loopt:
+            self.pipeline.voeg_fase_toe(**consument)
+        
+    def fase_capture(self, socketio, frame_kanaal):
+        """Nieuw frame met opname tijd; in multi camera modus al met gefuseerde metingen"""
+        if self.multi_camera is not None:
+            # Kanalen draaien in eigen threads; hier alleen het gefuseerde resultaat ophalen
+            resultaat = self.multi_camera.wacht_op_resultaat(0.1)
+            if resultaat is None:
+                return None
+            frame, capture_ms, metingen, actieve_ids = resultaat
+            return {'frame': frame, 'capture_ms': capture_ms, 'metingen': metingen, 'actieve_ids': actieve_ids}
+            
+        if self.waakhond is not None:
+            # Capture thread van de waakhond; hier nooit langer wachten dan de timeout
+            with self.camera_lock:
+                self.waakhond.start()
+                resultaat = self.waakhond.lees_frame(WAAKHOND_CONFIG['lees_timeout_s'])
+            for melding in self.waakhond.meldingen():
+                socketio.emit('camera_health', melding, to=TRACKING_ROOM)
+            if resultaat is None:
+                return None
+            frame, capture_ms = resultaat
+            return {'frame': self.pipeline_frame(frame, frame_kanaal), 'capture_ms': capture_ms}
+            
+        # Camera blokkeert in C; onder eventlet/gevent in de native thread pool
+        with self.camera_lock:
+            frame = blokkerend(self.camera.krijg_frame)
+        if frame is None:
+            socketio.sleep(0.1)
+            return None
+        return {'frame': self.pipeline_frame(frame, frame_kanaal),
+                'capture_ms': self.camera.laatste_capture_ms or monotone_ms()}
+        
+    def frames_in_gebruik(self):
+        """Ids van frames die de pipeline nog leest; multi camera kanalen hergebruiken die buffers niet"""
+        pipeline = self.pipeline
+        if pipeline is None:
+            return set()
+        return {id(item['frame']) for item in pipeline.kanaal('frame').bezet() if item is not None}
+        
+    def pipeline_frame(self, frame, frame_kanaal):
+        """Kopie in een vrije ring buffer: landmarks en ascii lezen het frame terwijl de
+        camera (of waakhond) haar buffer hergebruikt, zonder allocatie per frame"""
+        bezet = {id(item['frame']) for item in frame_kanaal.bezet() if item is not None}
+        kopie = self.capture_buffers.ring_buffer("frame", frame.shape, bezet, frame.dtype)
+        np.copyto(kopie, frame)
+        return kopie
+        
+    def fase_landmarks(self, socketio, item):
+        """Dure stap (landmarks) een keer per frame voor alle gezichten, gedeeld door alle sessies"""
+        # Profiel wissel tussen twee frames; detector en regelaar worden alleen hier gebruikt
+        if self.volgend_profiel is not None:
+            self.pas_volgend_profiel_toe(socketio)
+        if 'metingen' in item:
+            return item
+        start = time.perf_counter()
+        metingen = blokkerend(self.oog_detector.meet_gezichten, item['frame'], item['capture_ms'])
+        actieve_ids = self.oog_detector.gezicht_volger.actieve_ids()
+        
+        # Gemeten inferentietijd bepaalt het kwaliteit niveau
+        if self.regelaar:
+            niveau = self.regelaar.registreer((time.perf_counter() - start) * 1000)
+            if niveau:
+                self.pas_kwaliteit_toe(niveau)
+                print(f"Kwaliteit niveau gewijzigd naar '{niveau['naam']}'")
+                socketio.emit('quality_level', self.kwaliteit_status(), to=TRACKING_ROOM)
+        return {'capture_ms': item['capture_ms'], 'metingen': metingen, 'actieve_ids': actieve_ids}
+        
+    def fase_gaze(self, item):
+        """Goedkope stap: canonieke gaze voor de opslag en per sessie eigen mapping, kalibratie
+        en afvlakking (gebatcht over gezichten)"""
+        metingen, actieve_ids = item['metingen'], item['actieve_ids']
+        tijd_ms = time.time() * 1000
+        opslag_data = bereken_gezichten(self.opslag_sessie.gaze_sessies_voor(metingen, actieve_ids), metingen)
+        
+        bruikbaar = [meting for meting in metingen if meting["confidence"] > 0.1]
+        per_sessie = []
+        for sessie in self.volgende_sessies():
+            if not bruikbaar:
+                per_sessie.append((sessie, []))
                 continue
-                
-            oog_data = self.oog_detector.detecteer_ogen(frame)
-            frame_teller += 1
+            per_sessie.append((sessie, [{
+                'x': gezicht_data["x"],
+                'y': gezicht_data["y"], 
+                'confidence': gezicht_data["confidence"],
+                'timestamp': tijd_ms,
+                'capture_ms': meting["capture_ms"],
+                'gezicht_id': gezicht_data["gezicht_id"],
+                'gezicht_gevonden': gezicht_data["gezicht_gevonden"],
+                'iris_detectie': gezicht_data["iris_detectie"]
+            } for gezicht_data, meting in zip(
+                bereken_gezichten(sessie.gaze_sessies_voor(bruikbaar, actieve_ids), bruikbaar), bruikbaar
+            )]))
+        return {'tijd_ms': tijd_ms, 'opslag_data': opslag_data, 'per_sessie': per_sessie}
+        
+    def fase_emit(self, socketio, item):
+        """Opslag, hubs, HTTP momentopname en de events per client"""
+        tijd_ms, opslag_data = item['tijd_ms'], item['opslag_data']
+        
+        # Bewaar elk sample (ook zonder gezicht) voor aandacht statistieken
+        if self.opslag:
+            if not opslag_data:
+                self.opslag.voeg_toe(tijd_ms, None)
+            for gezicht_data in opslag_data:
+                self.opslag.voeg_toe(tijd_ms, gezicht_data, gezicht_data["gezicht_id"])
+        
+        # Canonieke gaze (standaard scherm) gebundeld naar venue hubs en voor HTTP clients
+        self.verstuur_hub(socketio, tijd_ms, opslag_data)
+        self.momentopname.publiceer(tijd_ms, opslag_data)
+        
+        # Debug info elke 3 seconden
+        nu = time.time()
+        if nu - self.laatste_debug > 3.0:
+            if opslag_data:
+                print(f"Ogen gevonden - X: {opslag_data[0]['x']:.1f}, Y: {opslag_data[0]['y']:.1f}, ASCII frames actief")
+            else:
+                print(f"Geen ogen gedetecteerd (frame {self.pipeline.fasen['landmarks'].verwerkt}), ASCII frames actief")
+            self.laatste_debug = nu
             
-            # Stream ASCII-ready webcam frames (10 FPS)
-            nu = time.time()
-            if nu - laatste_ascii_frame >= ascii_interval:
-                ascii_frame_data = self.maak_ascii_frame(frame)
-                if ascii_frame_data:
-                    socketio.emit('ascii_webcam_frame', ascii_frame_data)
-                laatste_ascii_frame = nu
+        for volgnummer, (sessie, gezichten) in enumerate(item['per_sessie']):
+            # Periodieke klok ping; het antwoord komt binnen via 'clock_pong'
+            if sessie.klok.wil_ping(monotone_ms()):
+                socketio.emit('clock_ping', {'server_ms': monotone_ms()}, to=sessie.room)
+            if gezichten:
+                # Opname volgt de langst volgende client (eigen scherm mapping per client)
+                self.verstuur_gaze(socketio, sessie, gezichten, tijd_ms, opnemen=volgnummer == 0)
+            self.verstuur_doelen(socketio, sessie, gezichten, tijd_ms)
+        
+    def fase_ascii(self, socketio, item):
+        """ASCII-ready webcam frames; rate volgt het kwaliteit niveau, los van de gaze rate"""
+        grid = self.maak_ascii_grid(item['frame'], self.ascii_breedte, self.ascii_hoogte)
+        if grid is not None:
+            self.verstuur_ascii(socketio, grid, time.time() * 1000)
             
-            # Debug info elke 3 seconden
-            if nu - laatste_debug > 3.0:
-                if oog_data:
-                    print(f"Ogen gevonden - X: {oog_data['x']:.1f}, Y: {oog_data['y']:.1f}, ASCII frames actief")
+    def start_replay(self, socketio):
+        """Speel een opname af via dezelfde emit route als live tracking, in een lus.
+        
+        Tijden worden herschaald met replay_snelheid; timestamp en capture_ms worden
+        verschoven naar nu, zodat latentie metingen bij clients blijven kloppen.
+        """
+        self.is_actief = True
+        print(f"Replay gestart: {self.replay_pad} ({self.replay_snelheid}x)")
+        
+        while self.is_actief:
+            start_ms = monotone_ms()
+            eerste_ms = None
+            aantal = 0
+            for tijd_ms, event, data in lees_opname(self.replay_pad):
+                if not self.is_actief:
+                    break
+                if eerste_ms is None:
+                    eerste_ms = tijd_ms
+                wacht = (start_ms + (tijd_ms - eerste_ms) / self.replay_snelheid - monotone_ms()) / 1000
+                if wacht > 0:
+                    socketio.sleep(wacht)
+                    
+                nu_ms = monotone_ms()
+                if 'timestamp' in data:
+                    data['timestamp'] = time.time() * 1000
+                if 'capture_ms' in data:
+                    data['capture_ms'] = nu_ms - (tijd_ms - data['capture_ms']) / self.replay_snelheid
+                    
+                if event == 'gaze_data':
+                    self.verstuur_hub(socketio, data['timestamp'], [data])
+                    self.momentopname.publiceer(data['timestamp'], [data])
+                    for sessie in self.volgende_sessies():
+                        self.verstuur_gaze(socketio, sessie, [data], data['timestamp'],
+                                           opnemen=False, alle_gezichten=False)
+                        self.verstuur_doelen(socketio, sessie, [data], data['timestamp'])
+                elif event == 'gaze_faces':
+                    # Opgenomen gezichten lijst alleen naar clients die elk sample willen
+                    for sessie in self.volgende_sessies():
+                        if sessie.levering.modus == MODUS_ELK:
+                            self.verstuur(socketio, event, data, sessie.room, opnemen=False, binair=sessie.binair)
+                elif event == 'ascii_webcam_frame':
+                    self.verstuur_ascii(socketio, np.asarray(data['luminance_data'], dtype=np.uint8),
+                                        data['timestamp'], opnemen=False)
                 else:
-                    print(f"Geen ogen gedetecteerd (frame {frame_teller}), ASCII frames actief")
-                laatste_debug = nu
+                    self.verstuur(socketio, event, data, TRACKING_ROOM, opnemen=False)
+                aantal += 1
                 
-            # Verstuur gaze data naar frontend
-            if oog_data and oog_data.get("confidence", 0) > 0.1:
-                socketio.emit('gaze_data', {
-                    'x': oog_data["x"],
-                    'y': oog_data["y"], 
-                    'confidence': oog_data.get("confidence", 0),
-                    'timestamp': time.time() * 1000,
-                    'gezicht_gevonden': oog_data.get("gezicht_gevonden", False),
-                    'iris_detectie': oog_data.get("iris_detectie", False)
-                })
+            if aantal == 0:
+                print("Replay opname is leeg")
+                break
                 
-            time.sleep(1/PERFORMANCE_CONFIG['target_fps'])
-            
     def stop_tracking(self):
         """Stop oogtracking"""
         self.is_actief = False
+        if self.waakhond is not None:
+            self.waakhond.stop()
         self.camera.stop_camera()
+        if self.multi_camera is not None:
+            self.multi_camera.stop()
+            self.multi_camera = None
         print("Oogtracking gestopt")
         
     def wissel_camera(self, index):
         """Wissel naar andere camera"""
         print(f"Camera wisselen naar index {index}...")
+        if self.multi_camera is not None:
+            print("Camera wisselen is niet mogelijk in multi camera modus")
+            return False
         
-        # Stop huidige tracking tijdelijk
-        was_actief = self.is_actief
-        if was_actief:
-            self.is_actief = False
-            time.sleep(0.2)  # Wacht tot tracking loop stopt
-        
-        # Gebruik de nieuwe wissel_camera methode
-        success = self.camera.wissel_camera(index)
-        
-        if success:
-            print(f"Camera gewisseld naar {index}")
-            # Herstart tracking als het actief was
-            if was_actief:
-                self.is_actief = True
-            return True
-        else:
+        # De loop wacht op de camera lock in plaats van te stoppen; is_actief uitzetten
+        # liet de loop eindigen zonder dat iemand hem weer startte
+        with self.camera_lock:
+            if self.waakhond is not None:
+                self.waakhond.stop()  # Wacht tot de capture thread uit de camera is; de loop start hem weer
+            
+            # Openen houdt de (native) start lock vast: in de native thread pool, niet op de event loop
+            success = blokkerend(self.camera.wissel_camera, index)
+            
+            if success:
+                print(f"Camera gewisseld naar {index}")
+                return True
             print(f"Kan niet wisselen naar camera {index}")
             # Probeer fallback camera als mogelijk
-            if was_actief:
+            if self.is_actief:
                 self.start_systeem()
-                self.is_actief = True
             return False
     
-    def maak_ascii_frame(self, frame):
-        """Converteer webcam frame naar ASCII-ready format voor frontend"""
+    def heronderhandel_camera(self, index=None):
+        """Vergeet het onthouden capture formaat; de actieve camera onderhandelt meteen opnieuw"""
+        index = self.camera.camera_index if index is None else index
+        if index is None:
+            return False
+        self.camera.vergeet_formaat(index)
+        if self.camera.huidige_camera is None or index != self.camera.camera_index:
+            return True  # De volgende start onderhandelt
+        with self.camera_lock:
+            if self.waakhond is not None:
+                self.waakhond.stop()  # Zoals bij wisselen: de loop start hem weer
+            return blokkerend(self.camera.start_camera, index)
+    
+    def maak_ascii_grid(self, frame, ascii_width=80, ascii_height=40):
+        """Converteer webcam frame naar de luminance grid (uint8) voor de ASCII stream.
+        
+        Gebruikt de eigen buffers van de ASCII fase (niet die van de detector, die
+        tegelijk op een andere thread draait). Het resultaat is een hergebruikte
+        buffer: alleen geldig tot het volgende frame.
+        """
         if frame is None:
             return None
             
         try:
-            # Resize naar ASCII resolutie (80x40 zoals gespecificeerd)
-            ascii_width = 80
-            ascii_height = 40
+            buffers = self.ascii_buffers
+            buffers.nieuw_frame(frame)
+            grijs = buffers.grijs()
             
-            # Resize frame naar ASCII afmetingen
-            resized_frame = cv2.resize(frame, (ascii_width, ascii_height))
+            # Eerst grijs, dan verkleinen: een kanaal schalen in plaats van drie
+            gray_frame = buffers.verklein("ascii", grijs, ascii_width, ascii_height)
             
-            # Converteer naar grayscale voor luminance berekening
-            gray_frame = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2GRAY)
+            # Spiegeling op de kleine ASCII grid als het camera frame niet geflipt is
+            if not self.camera.spiegel_pixels:
+                gray_frame = buffers.spiegel("ascii_spiegel", gray_frame)
             
-            # Maak luminance data array
-            luminance_data = []
-            for y in range(ascii_height):
-                row = []
-                for x in range(ascii_width):
-                    # Krijg pixel waarde (0-255)
-                    pixel_value = int(gray_frame[y, x])
-                    row.append(pixel_value)
-                luminance_data.append(row)
-            
-            return {
-                'width': ascii_width,
-                'height': ascii_height,
-                'luminance_data': luminance_data,
-                'timestamp': time.time() * 1000
-            }
+            return gray_frame
             
         except Exception as e:
             print(f"Fout bij ASCII frame conversie: {e}")
@@ -191,7 +699,8 @@ class OogtrackingServer:
 # Flask setup
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'development-key-change-in-production')
-socketio = SocketIO(app, cors_allowed_origins=SERVER_CONFIG['cors_origins'])
+# Async backend volgt async_modus.activeer() (main_server.py --async-modus); standaard threading
+socketio = SocketIO(app, async_mode=huidige_modus(), cors_allowed_origins=SERVER_CONFIG['cors_origins'])
 
 # Server instance
 server = OogtrackingServer()
@@ -209,10 +718,18 @@ else:
 def index():
     return "Focus Tuin Eye-tracking Server Actief"
 
+# /gaze/latest (ETag long-poll) en /gaze/stream (SSE)
+registreer_routes(app, server.momentopname)
+
 @socketio.on('connect')
-def verbinding_gemaakt():
+def verbinding_gemaakt(auth=None):
     print(f"Client verbonden: {datetime.now()}")
-    emit('connection_status', {'status': 'connected', 'message': 'Server gereed'})
+    sessie = server.krijg_sessie(request.sid)
+    
+    # Opt-in binaire stream: io(url, { auth: { encoding: 'struct' } })
+    codering = auth.get('encoding') if isinstance(auth, dict) else None
+    sessie.codering = codering if codering in CODERINGEN else CODERING_JSON
+    emit('connection_status', {'status': 'connected', 'message': 'Server gereed', 'encoding': sessie.codering})
     
     # Verstuur camera lijst
     emit('camera_list', {
@@ -220,34 +737,91 @@ def verbinding_gemaakt():
         'current_camera': server.camera.camera_index
     })
 
+def volg_ascii(sessie, palet):
+    """Zet de ASCII room van een sessie: gedeelde palet room, of ruwe luminance bij geen/ongeldig palet"""
+    if palet is not None:
+        try:
+            controleer_palet(palet)
+        except ValueError as e:
+            print(f"ASCII palet genegeerd: {e}")
+            palet = None
+    leave_room(sessie.ascii_room)
+    sessie.ascii_palet = palet
+    join_room(sessie.ascii_room)
+
+def stel_levering_in(sessie, instelling):
+    """Leveringsmodus uit {'mode', 'hz', 'interval_ms'}; bij een fout blijft de vorige modus"""
+    try:
+        sessie.levering.stel_in(instelling.get('mode', MODUS_ELK), instelling.get('hz'), instelling.get('interval_ms'))
+    except (AttributeError, TypeError, ValueError) as e:
+        emit('delivery_error', {'error': str(e)})
+        return
+    emit('delivery_set', sessie.levering.status())
+
 @socketio.on('start_tracking')
 def start_tracking_handler(data):
     print("Start tracking aangevraagd")
+    sessie = server.krijg_sessie(request.sid)
     
-    # Stel schermresolutie in
+    # Stel schermresolutie in (alleen voor deze client, gezicht sessies volgen de basis)
     if data and 'screen_width' in data:
-        server.oog_detector.stel_scherm_in(data['screen_width'], data['screen_height'])
+        sessie.gaze_voor_gezicht().stel_scherm_in(data['screen_width'], data['screen_height'])
+        
+    # Replay modus: opgenomen stream in plaats van camera en detectie
+    if server.replay_pad:
+        sessie.volgt = True
+        join_room(TRACKING_ROOM)
+        volg_ascii(sessie, data.get('ascii_palette') if data else None)
+        if data and data.get('delivery'):
+            stel_levering_in(sessie, data['delivery'])
+        server.start_stream_thread(socketio)
+        emit('tracking_status', {
+            'status': 'started',
+            'message': f'Replay van {os.path.basename(server.replay_pad)} ({server.replay_snelheid}x)',
+            'camera_index': None
+        })
+        return
         
-    if not server.start_systeem():
+    # Camera is gedeeld: niet herstarten als een andere client al volgt
+    if not server.camera_actief() and not server.start_systeem():
         emit('tracking_error', {'error': 'Camera kan niet worden gestart'})
         return
         
+    # Opgeslagen kalibratie voor deze camera en schermgrootte direct toepassen
+    profiel = server.laad_kalibratie_profiel(sessie.gaze)
+    if profiel:
+        emit('calibration_loaded', profiel.als_dict())
+        
+    sessie.volgt = True
+    join_room(TRACKING_ROOM)
+    volg_ascii(sessie, data.get('ascii_palette') if data else None)
+    if data and data.get('delivery'):
+        stel_levering_in(sessie, data['delivery'])
+        
     # Start tracking thread
-    if server.tracking_thread is None or not server.tracking_thread.is_alive():
-        server.tracking_thread = threading.Thread(target=server.start_tracking, args=(socketio,))
-        server.tracking_thread.daemon = True
-        server.tracking_thread.start()
+    server.start_stream_thread(socketio)
         
     emit('tracking_status', {
         'status': 'started', 
         'message': f'Tracking gestart met camera {server.camera.camera_index}',
         'camera_index': server.camera.camera_index
     })
+    
+    # Nieuwe client kent het huidige kwaliteit niveau nog niet
+    if server.regelaar:
+        emit('quality_level', server.kwaliteit_status())
 
 @socketio.on('stop_tracking')
 def stop_tracking_handler():
     print("Stop tracking aangevraagd")
-    server.stop_tracking()
+    sessie = server.krijg_sessie(request.sid)
+    sessie.volgt = False
+    leave_room(TRACKING_ROOM)
+    leave_room(sessie.ascii_room)
+    
+    # Camera en loop alleen stoppen als geen enkele client of hub meer volgt
+    if not server.heeft_ontvangers():
+        server.stop_tracking()
     emit('tracking_status', {'status': 'stopped', 'message': 'Tracking gestopt'})
 
 @socketio.on('get_cameras')
@@ -288,6 +862,50 @@ def wissel_camera_handler(data):
     else:
         emit('camera_error', {'error': f'Kan niet wisselen naar camera {index}'})
 
+@socketio.on('renegotiate_camera_format')
+def heronderhandel_formaat_handler(data):
+    """Opnieuw capture formaten testen, bv. na een driver update of ander apparaat op dezelfde poort"""
+    index = (data or {}).get('camera_index')
+    if not server.heronderhandel_camera(index):
+        emit('camera_error', {'error': f'Kan formaat van camera {index} niet opnieuw bepalen'})
+        return
+    socketio.emit('camera_list', {
+        'cameras': server.camera.beschikbare_cameras,
+        'current_camera': server.camera.camera_index if server.camera.huidige_camera else None
+    })
+
+@socketio.on('get_camera_health')
+def krijg_camera_gezondheid():
+    """Toestand van de camera waakhond (None als die uit staat)"""
+    emit('camera_health', server.waakhond.status() if server.waakhond is not None else None)
+
+@socketio.on('get_pipeline_status')
+def krijg_pipeline_status():
+    """Rate, verwerkingstijd en overgeslagen invoer per fase van de tracking pipeline"""
+    pipeline = server.pipeline
+    emit('pipeline_status', pipeline.status() if pipeline is not None and pipeline.loopt else None)
+
+@socketio.on('get_camera_fusion')
+def krijg_camera_fusie():
+    """Leider, lock en rate per camera in multi camera modus (None bij een enkele camera)"""
+    multi_camera = server.multi_camera
+    emit('camera_fusion', multi_camera.status() if multi_camera is not None else None)
+
+@socketio.on('set_profile')
+def zet_profiel(data):
+    """Wissel het prestatie profiel zonder tracking te herstarten"""
+    naam = (data or {}).get('naam')
+    try:
+        toegepast = server.kies_profiel(naam, socketio)
+    except ValueError as e:
+        emit('profile_error', {'error': str(e), 'profielen': list(PROFIELEN)})
+        return
+    emit('profile', dict(server.profiel_status(toegepast), naam=naam))
+
+@socketio.on('get_profile')
+def krijg_profiel():
+    emit('profile', server.profiel_status())
+
 @socketio.on('calibrate_gaze')
 def kalibreer_gaze(data):
     """Kalibreer gaze tracking voor betere nauwkeurigheid"""
@@ -300,9 +918,10 @@ def kalibreer_gaze(data):
     schaal_x = data.get('schaal_x', 1.5)
     schaal_y = data.get('schaal_y', 1.3)
     
-    # Pas kalibratie toe
-    server.oog_detector.kalibreer_centrum(offset_x, offset_y)
-    server.oog_detector.pas_gevoeligheid_aan(schaal_x, schaal_y)
+    # Pas kalibratie toe (alleen voor deze client, optioneel voor een enkel gezicht)
+    gaze_sessie = server.krijg_sessie(request.sid).gaze_voor_gezicht(data.get('gezicht_id'))
+    gaze_sessie.kalibreer_centrum(offset_x, offset_y)
+    gaze_sessie.pas_gevoeligheid_aan(schaal_x, schaal_y)
     
     emit('calibration_applied', {
         'offset_x': offset_x,
@@ -312,11 +931,212 @@ def kalibreer_gaze(data):
         'message': 'Kalibratie toegepast'
     })
 
+@socketio.on('get_attention_stats')
+def krijg_aandacht_statistieken(data):
+    """Verstuur aandacht statistieken uit de lokale opslag over een tijdsbereik"""
+    if server.opslag is None:
+        emit('attention_stats_error', {'error': 'Aandacht opslag is uitgeschakeld'})
+        return
+        
+    data = data or {}
+    resolutie = data.get('resolutie')
+    
+    try:
+        eind_ms = float(data.get('eind_ms', time.time() * 1000))
+        start_ms = float(data.get('start_ms', eind_ms - 24 * 3600 * 1000))
+        antwoord = {
+            'statistieken': server.opslag.statistieken(start_ms, eind_ms),
+            'bezoeken': server.opslag.bezoeken(start_ms, eind_ms)
+        }
+        if resolutie:
+            antwoord['rollups'] = server.opslag.rollups(start_ms, eind_ms, resolutie)
+    except (TypeError, ValueError) as e:
+        emit('attention_stats_error', {'error': str(e)})
+        return
+        
+    emit('attention_stats', antwoord)
+
+@socketio.on('calibration_begin')
+def kalibratie_begin(data):
+    """Start een meerpunts kalibratie sessie op de server"""
+    data = data or {}
+    sessie = server.krijg_sessie(request.sid)
+    if 'screen_width' in data and 'screen_height' in data:
+        sessie.gaze_voor_gezicht().stel_scherm_in(data['screen_width'], data['screen_height'])
+        
+    sessie.kalibratie_verzamelaar = KalibratieVerzamelaar(
+        sessie.gaze.scherm_breedte, sessie.gaze.scherm_hoogte, data.get('graad')
+    )
+    sessie.kalibratie_gezicht_id = data.get('gezicht_id')
+    emit('calibration_started', {
+        'scherm_breedte': sessie.gaze.scherm_breedte,
+        'scherm_hoogte': sessie.gaze.scherm_hoogte
+    })
+
+@socketio.on('calibration_sample')
+def kalibratie_sample(data):
+    """Koppel de meest recente ruwe gaze meting aan het doelpunt waar de bezoeker naar kijkt"""
+    sessie = server.krijg_sessie(request.sid)
+    if sessie.kalibratie_verzamelaar is None:
+        emit('calibration_error', {'error': 'Geen actieve kalibratie sessie'})
+        return
+    if not data or 'doel_x' not in data or 'doel_y' not in data:
+        emit('calibration_error', {'error': 'Geen doelpunt in kalibratie sample'})
+        return
+        
+    # Ruwe meting is sessie-onafhankelijk en dus gedeeld
+    if sessie.kalibratie_gezicht_id is None:
+        meting = server.ruwe_metingen().laatste_meting
+    else:
+        meting = server.ruwe_metingen().laatste_metingen.get(sessie.kalibratie_gezicht_id)
+    if meting is None or time.time() - meting['tijd'] > KALIBRATIE_CONFIG['max_sample_leeftijd']:
+        emit('calibration_error', {'error': 'Geen recente gaze meting beschikbaar'})
+        return
+        
+    try:
+        aantal = sessie.kalibratie_verzamelaar.voeg_sample_toe(meting['gem_rel'], data['doel_x'], data['doel_y'])
+    except (TypeError, ValueError):
+        emit('calibration_error', {'error': 'Ongeldig doelpunt in kalibratie sample'})
+        return
+    emit('calibration_sample_ok', {'aantal': aantal})
+
+@socketio.on('calibration_fit')
+def kalibratie_fit():
+    """Fit de polynoom mapping, sla het profiel op en pas het direct toe"""
+    sessie = server.krijg_sessie(request.sid)
+    if sessie.kalibratie_verzamelaar is None:
+        emit('calibration_error', {'error': 'Geen actieve kalibratie sessie'})
+        return
+        
+    try:
+        profiel = sessie.kalibratie_verzamelaar.fit(server.camera_naam())
+    except ValueError as e:
+        emit('calibration_error', {'error': str(e)})
+        return
+        
+    # Alleen de basis kalibratie wordt bewaard; gezicht ID's zijn niet blijvend
+    sessie.gaze_voor_gezicht(sessie.kalibratie_gezicht_id).stel_kalibratie_profiel_in(profiel)
+    if sessie.kalibratie_gezicht_id is None:
+        server.profiel_opslag.bewaar(profiel)
+        if server.multi_camera is not None:
+            server.multi_camera.laad_profielen(server.profiel_opslag, *profiel.scherm)
+    sessie.kalibratie_verzamelaar = None
+    
+    print(f"Kalibratie profiel gefit: graad {profiel.graad}, fout {profiel.fout_px:.1f}px")
+    emit('calibration_fitted', profiel.als_dict())
+
+@socketio.on('calibration_reset')
+def kalibratie_reset():
+    """Verwijder het opgeslagen profiel en val terug op schaal/offset kalibratie"""
+    sessie = server.krijg_sessie(request.sid)
+    server.profiel_opslag.verwijder(server.camera_naam(), sessie.gaze.scherm_breedte, sessie.gaze.scherm_hoogte)
+    sessie.gaze.stel_kalibratie_profiel_in(None)
+    if server.multi_camera is not None:
+        server.multi_camera.laad_profielen(server.profiel_opslag, sessie.gaze.scherm_breedte, sessie.gaze.scherm_hoogte)
+    sessie.kalibratie_verzamelaar = None
+    emit('calibration_applied', {'message': 'Kalibratie profiel verwijderd'})
+
+@socketio.on('ascii_palette')
+def ascii_palet_handler(data):
+    """Wissel het palet waarmee deze client ASCII rijen ontvangt (null: ruwe luminance)"""
+    sessie = server.krijg_sessie(request.sid)
+    volg_ascii(sessie, (data or {}).get('palette'))
+    emit('ascii_palette_set', {'palette': sessie.ascii_palet})
+
+@socketio.on('set_delivery')
+def zet_levering(data):
+    """Wissel de gaze leveringsmodus van deze client tijdens het volgen"""
+    stel_levering_in(server.krijg_sessie(request.sid), data or {})
+
+@socketio.on('register_gaze_target')
+def registreer_gaze_doel(data):
+    """Benoemde rechthoek in schermcoordinaten van deze client; zelfde id vervangt de vorige"""
+    sessie = server.krijg_sessie(request.sid)
+    try:
+        sessie.doelen.registreer(
+            str(data['id']), float(data['x']), float(data['y']),
+            float(data['width']), float(data['height']),
+            float(data['dwell_ms']) if data.get('dwell_ms') is not None else None
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        emit('gaze_target_error', {'id': (data or {}).get('id'), 'error': str(e)})
+
+@socketio.on('remove_gaze_target')
+def verwijder_gaze_doel(data):
+    sessie = server.krijg_sessie(request.sid)
+    for gebeurtenis in sessie.doelen.verwijder(str((data or {}).get('id')), time.time() * 1000):
+        emit(f"gaze_{gebeurtenis['type']}", gebeurtenis)
+
+@socketio.on('clear_gaze_targets')
+def wis_gaze_doelen(data=None):
+    sessie = server.krijg_sessie(request.sid)
+    for gebeurtenis in sessie.doelen.wis(time.time() * 1000):
+        emit(f"gaze_{gebeurtenis['type']}", gebeurtenis)
+
+@socketio.on('hub_subscribe')
+def hub_abonnement(data=None):
+    """Een venue hub wil de gebundelde binaire gaze stream van deze node"""
+    sessie = server.krijg_sessie(request.sid)
+    if not server.replay_pad and not server.camera_actief() and not server.start_systeem():
+        emit('tracking_error', {'error': 'Camera kan niet worden gestart'})
+        return
+        
+    sessie.hub = True
+    join_room(HUB_ROOM)
+    server.start_stream_thread(socketio)
+    emit('hub_subscribed', {
+        'node': SERVER_CONFIG.get('node_naam') or f"{SERVER_CONFIG['host']}:{SERVER_CONFIG['port']}",
+        'scherm_breedte': server.hub_uitzender.scherm_breedte,
+        'scherm_hoogte': server.hub_uitzender.scherm_hoogte,
+        'batch_hz': HUB_CONFIG['batch_hz']
+    })
+
+@socketio.on('clock_pong')
+def klok_pong(data):
+    """Antwoord op een klok ping: client ontvangst- en verzendtijd op de eigen klok"""
+    ontvangen_ms = monotone_ms()
+    try:
+        server.krijg_sessie(request.sid).klok.voeg_toe(
+            float(data['server_ms']), float(data['client_ontvangen_ms']),
+            float(data['client_verzonden_ms']), ontvangen_ms
+        )
+    except (TypeError, KeyError, ValueError):
+        emit('latency_error', {'error': 'Ongeldig clock_pong bericht'})
+
+@socketio.on('render_report')
+def render_rapport(data):
+    """Render tijden van de client: [[capture_ms, render_client_ms], ...]"""
+    sessie = server.krijg_sessie(request.sid)
+    if sessie.klok.offset_ms is None:
+        return  # Nog geen klok sync, rapporten zijn niet te vertalen
+        
+    for sample in (data or {}).get('samples', []):
+        try:
+            capture_ms, render_ms = float(sample[0]), float(sample[1])
+        except (TypeError, IndexError, ValueError):
+            continue
+        sessie.latentie_render.voeg_toe(sessie.klok.naar_server_ms(render_ms) - capture_ms)
+
+@socketio.on('get_latency_stats')
+def krijg_latentie_statistieken(data=None):
+    """Latentie verdelingen van deze client, of van alle clients met {'alle': true}"""
+    if (data or {}).get('alle'):
+        with server.sessie_lock:
+            sessies = list(server.sessies.values())
+        emit('latency_stats', {'clients': {sessie.sid: sessie.latentie_status() for sessie in sessies}})
+    else:
+        emit('latency_stats', server.krijg_sessie(request.sid).latentie_status())
+
 # Debug preview functionality removed - use standalone debug-camera.bat instead
 
 @socketio.on('disconnect')
 def verbinding_verbroken():
     print(f"Client ontkoppeld: {datetime.now()}")
+    sessie = server.verwijder_sessie(request.sid)
+    
+    # Laatste volgende client of hub weg: camera vrijgeven
+    if sessie and (sessie.volgt or sessie.hub) and not server.heeft_ontvangers():
+        server.stop_tracking()
 
 if __name__ == '__main__':
     print("Focus Tuin Eye-Tracking Server")
@@ -326,4 +1146,8 @@ if __name__ == '__main__':
         socketio.run(app, host='0.0.0.0', port=5001, debug=False)
     except KeyboardInterrupt:
         print("Server gestopt")
-        server.stop_tracking()
\ No newline at end of file
+        server.stop_tracking()
+        if server.opslag:
+            server.opslag.sluit()
+        if server.recorder:
+            server.recorder.sluit()
\ No newline at end of file
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Gaze levering module voor Focus Tuin
+Leveringsmodus per client: elk sample, alleen het laatste op N Hz, of gebundeld per N ms
+"""
+
+from ..core.configuratie import LEVERING_CONFIG
+
+MODUS_ELK = "every"
+MODUS_LAATSTE = "latest"
+MODUS_BATCH = "batch"
+MODI = (MODUS_ELK, MODUS_LAATSTE, MODUS_BATCH)
+
+
+class GazeLevering:
+    """Bepaalt welke gaze events een client per frame krijgt.
+
+    Tussenliggende samples kosten in 'latest' modus niets (alleen een referentie);
+    in 'batch' modus gaan ze samen in een enkel 'gaze_batch' event met eigen timestamps.
+    """
+
+    def __init__(self):
+        self.modus = MODUS_ELK
+        self.interval_ms = 0.0
+        self.laatste_verzonden = None
+        self.bundel = []
+
+    def stel_in(self, modus, hz=None, interval_ms=None):
+        """ValueError bij een onbekende modus of een rate buiten de grenzen"""
+        if modus not in MODI:
+            raise ValueError(f"Onbekende leveringsmodus '{modus}' (kies uit {', '.join(MODI)})")
+        if modus == MODUS_LAATSTE:
+            hz = float(hz if hz is not None else LEVERING_CONFIG['standaard_hz'])
+            if not LEVERING_CONFIG['min_hz'] <= hz <= LEVERING_CONFIG['max_hz']:
+                raise ValueError(f"hz moet tussen {LEVERING_CONFIG['min_hz']} en {LEVERING_CONFIG['max_hz']} liggen")
+            self.interval_ms = 1000.0 / hz
+        elif modus == MODUS_BATCH:
+            interval_ms = float(interval_ms if interval_ms is not None else LEVERING_CONFIG['standaard_batch_ms'])
+            if not LEVERING_CONFIG['min_batch_ms'] <= interval_ms <= LEVERING_CONFIG['max_batch_ms']:
+                raise ValueError(f"interval_ms moet tussen {LEVERING_CONFIG['min_batch_ms']} "
+                                 f"en {LEVERING_CONFIG['max_batch_ms']} liggen")
+            self.interval_ms = interval_ms
+        else:
+            self.interval_ms = 0.0
+        self.modus = modus
+        self.laatste_verzonden = None
+        self.bundel = []
+
+    def status(self):
+        status = {'mode': self.modus}
+        if self.modus == MODUS_LAATSTE:
+            status['hz'] = round(1000.0 / self.interval_ms, 3)
+        elif self.modus == MODUS_BATCH:
+            status['interval_ms'] = self.interval_ms
+        return status
+
+    def _interval_om(self, tijd_ms):
+        if self.laatste_verzonden is None or tijd_ms - self.laatste_verzonden >= self.interval_ms:
+            self.laatste_verzonden = tijd_ms
+            return True
+        return False
+
+    def voeg_toe(self, gezichten, tijd_ms, alle_gezichten=False):
+        """Gaze van een frame; geeft de (event, data) paren terug die nu verstuurd moeten worden"""
+        if self.modus == MODUS_BATCH:
+            self.bundel.extend(gezichten if alle_gezichten else gezichten[:1])
+            if self.laatste_verzonden is None:
+                self.laatste_verzonden = tijd_ms  # Eerste bundel loopt een volledig interval
+                return []
+            if not self._interval_om(tijd_ms):
+                return []
+            samples, self.bundel = self.bundel, []
+            return [('gaze_batch', {'samples': samples, 'timestamp': tijd_ms})]
+
+        if self.modus == MODUS_LAATSTE and not self._interval_om(tijd_ms):
+            return []
+        events = [('gaze_data', gezichten[0])]
+        if alle_gezichten:
+            events.append(('gaze_faces', {'gezichten': gezichten, 'timestamp': tijd_ms}))
+        return events
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+HTTP gaze module voor Focus Tuin
+Laatste gaze sample voor clients zonder Socket.IO: long-poll met ETag en een SSE stream
+"""
+
+import json
+import time
+import threading
+from flask import Response, request
+from ..core.configuratie import HTTP_GAZE_CONFIG
+
+
+class GazeMomentopname:
+    """Laatste gaze toestand, gedeeld door alle HTTP clients.
+
+    De tracking loop legt alleen een referentie naar de gezichten lijst vast (die
+    lijst wordt per frame nieuw gebouwd en daarna niet meer gewijzigd) en wekt
+    wachtende clients. Afronden en JSON codering gebeuren aan de request kant,
+    buiten de lock, een keer per versie.
+    """
+
+    def __init__(self):
+        self._conditie = threading.Condition()
+        self._versie = 0
+        self._sample = None
+        self._gecodeerd = (0, b'{"gezicht_gevonden":false,"gezichten":[]}')
+
+    def publiceer(self, tijd_ms, gezichten):
+        with self._conditie:
+            self._versie += 1
+            self._sample = (tijd_ms, gezichten)
+            self._conditie.notify_all()
+
+    @staticmethod
+    def _codeer(tijd_ms, gezichten):
+        return json.dumps({
+            'timestamp': tijd_ms,
+            'gezicht_gevonden': bool(gezichten),
+            'gezichten': [{
+                'gezicht_id': g['gezicht_id'], 'x': round(g['x'], 1), 'y': round(g['y'], 1),
+                'confidence': round(g['confidence'], 3)
+            } for g in gezichten]
+        }, separators=(',', ':')).encode('utf-8')
+
+    def huidige(self):
+        """(versie, JSON bytes) van de laatste toestand"""
+        with self._conditie:
+            versie, sample, gecodeerd = self._versie, self._sample, self._gecodeerd
+        if gecodeerd[0] == versie:
+            return gecodeerd
+        # Gelijktijdige clients coderen hooguit dezelfde versie dubbel; de nieuwste wint
+        gecodeerd = (versie, self._codeer(*sample))
+        with self._conditie:
+            if self._gecodeerd[0] < versie:
+                self._gecodeerd = gecodeerd
+        return gecodeerd
+
+    def wacht_op_nieuw(self, versie, timeout):
+        """Blokkeer tot er een nieuwere versie is dan versie, of tot de timeout"""
+        with self._conditie:
+            self._conditie.wait_for(lambda: self._versie != versie, timeout)
+            return self._versie != versie
+
+
+def etag(versie):
+    return f'"{versie}"'
+
+
+def laatste_gaze_route(momentopname):
+    """GET: laatste sample. Met If-None-Match en ?wacht=s wordt gewacht op een nieuwer sample (long-poll)"""
+    def route():
+        versie, inhoud = momentopname.huidige()
+        if request.headers.get('If-None-Match') == etag(versie):
+            wacht = min(request.args.get('wacht', 0, type=float), HTTP_GAZE_CONFIG['max_long_poll_s'])
+            if wacht <= 0 or not momentopname.wacht_op_nieuw(versie, wacht):
+                return Response(status=304, headers={'ETag': etag(versie)})
+            versie, inhoud = momentopname.huidige()
+        return Response(inhoud, mimetype='application/json',
+                        headers={'ETag': etag(versie), 'Cache-Control': 'no-cache'})
+    return route
+
+
+def gaze_stream_route(momentopname):
+    """GET: Server-Sent Events met het laatste sample, maximaal ?hz= keer per seconde"""
+    def route():
+        hz = min(max(request.args.get('hz', HTTP_GAZE_CONFIG['sse_hz'], type=float), 0.1),
+                 HTTP_GAZE_CONFIG['max_sse_hz'])
+
+        def stream():
+            interval = 1.0 / hz
+            verstuurd = None
+            while True:
+                # Op de tracking rate wachten is zinloos: alleen de nieuwste versie per interval
+                if momentopname.wacht_op_nieuw(verstuurd, HTTP_GAZE_CONFIG['sse_keepalive_s']):
+                    versie, inhoud = momentopname.huidige()
+                    verstuurd = versie
+                    yield b'id: %d\ndata: %s\n\n' % (versie, inhoud)
+                    time.sleep(interval)
+                else:
+                    # Commentaar regel houdt proxies en de verbinding open
+                    yield b': keepalive\n\n'
+
+        return Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    return route
+
+
+def registreer_routes(app, momentopname):
+    app.add_url_rule('/gaze/latest', 'gaze_latest', laatste_gaze_route(momentopname))
+    app.add_url_rule('/gaze/stream', 'gaze_stream', gaze_stream_route(momentopname))
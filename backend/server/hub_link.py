@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Hub link module voor Focus Tuin
+Compact binair formaat tussen tracker nodes en de venue hub, plus de node-kant buffer
+"""
+
+import struct
+import threading
+import numpy as np
+from ..core.configuratie import HUB_CONFIG
+
+# Room met hubs die op deze node geabonneerd zijn
+HUB_ROOM = "hub"
+
+HUB_MAGIC = b"FTHB"
+HUB_VERSIE = 1
+
+# Batch: magic, versie, node wandklok (ms), aantal samples
+BATCH_HEADER = struct.Struct('<4sHdI')
+# Sample: wandklok (ms), x, y, confidence, gezicht_id, vlaggen
+SAMPLE_RECORD = np.dtype([
+    ('tijd_ms', '<f8'), ('x', '<f4'), ('y', '<f4'), ('confidence', '<f4'),
+    ('gezicht_id', 'u1'), ('vlaggen', 'u1')
+])
+
+VLAG_GEZICHT = 1
+VLAG_FOCUS = 2
+
+
+def pak_batch(node_tijd_ms, samples):
+    """Samples (structured array met SAMPLE_RECORD) naar een binair bericht"""
+    return BATCH_HEADER.pack(HUB_MAGIC, HUB_VERSIE, node_tijd_ms, len(samples)) + samples.tobytes()
+
+
+def pak_uit_batch(bericht):
+    """Binair bericht terug naar (node_tijd_ms, samples); ValueError bij een ongeldig bericht"""
+    bericht = bytes(bericht)
+    if len(bericht) < BATCH_HEADER.size:
+        raise ValueError("Hub batch te kort")
+    magic, versie, node_tijd_ms, aantal = BATCH_HEADER.unpack_from(bericht)
+    if magic != HUB_MAGIC or versie != HUB_VERSIE:
+        raise ValueError("Onbekend hub batch formaat")
+    if len(bericht) != BATCH_HEADER.size + aantal * SAMPLE_RECORD.itemsize:
+        raise ValueError("Hub batch lengte klopt niet")
+    return node_tijd_ms, np.frombuffer(bericht, dtype=SAMPLE_RECORD, offset=BATCH_HEADER.size, count=aantal)
+
+
+class HubUitzender:
+    """Verzamelt gaze samples van deze node en levert ze gebundeld aan de hub.
+
+    Focus wordt hier al bepaald (zelfde strikte tolerantie als de frontend focus
+    zone, rond het schermcentrum), zodat de hub alleen hoeft op te tellen.
+    """
+
+    def __init__(self, scherm_breedte=1920, scherm_hoogte=1080):
+        self.scherm_breedte = scherm_breedte
+        self.scherm_hoogte = scherm_hoogte
+        self._lock = threading.Lock()
+        self._samples = []
+        self._laatste_batch = 0.0
+
+    def in_focus(self, x, y, confidence):
+        return (confidence >= HUB_CONFIG['min_confidence']
+                and abs(x - self.scherm_breedte / 2) <= HUB_CONFIG['focus_tolerantie_x']
+                and abs(y - self.scherm_hoogte / 2) <= HUB_CONFIG['focus_tolerantie_y'])
+
+    def voeg_toe(self, tijd_ms, gezichten):
+        """Gaze resultaten van een frame; een lege lijst telt als frame zonder gezicht"""
+        with self._lock:
+            if not gezichten:
+                self._samples.append((tijd_ms, np.nan, np.nan, 0.0, 0, 0))
+            for gezicht in gezichten:
+                vlaggen = VLAG_GEZICHT
+                if self.in_focus(gezicht['x'], gezicht['y'], gezicht['confidence']):
+                    vlaggen |= VLAG_FOCUS
+                self._samples.append((tijd_ms, gezicht['x'], gezicht['y'], gezicht['confidence'],
+                                      gezicht.get('gezicht_id', 0) & 0xFF, vlaggen))
+
+    def batch(self, nu_ms):
+        """Binair bericht als het batch interval verstreken is, anders None"""
+        if nu_ms - self._laatste_batch < 1000 / HUB_CONFIG['batch_hz']:
+            return None
+        self._laatste_batch = nu_ms
+        with self._lock:
+            samples, self._samples = self._samples, []
+        if not samples:
+            return None
+        return pak_batch(nu_ms, np.array(samples, dtype=SAMPLE_RECORD))
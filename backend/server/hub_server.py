@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Hub server module voor Focus Tuin
+Volgt meerdere tracker nodes, voegt hun gaze en focus samen en publiceert venue statistieken
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from datetime import datetime
+import numpy as np
+from flask import Flask, jsonify
+from flask_socketio import SocketIO, emit, join_room, leave_room
+
+from ..core.configuratie import HUB_CONFIG, SERVER_CONFIG
+from .hub_link import pak_uit_batch, SAMPLE_RECORD, VLAG_GEZICHT, VLAG_FOCUS
+
+try:
+    import socketio as socketio_client
+except ImportError:
+    socketio_client = None
+
+DASHBOARD_ROOM = "dashboard"
+
+
+class NodeAggregaat:
+    """Schuivend venster van ontvangen batches van een node"""
+
+    def __init__(self, naam):
+        self.naam = naam
+        self.batches = deque()   # (ontvangen monotone s, samples)
+        self.laatst_gezien = None
+        self.verbonden = False
+        self.ongeldig = 0
+
+    def voeg_toe(self, samples, nu):
+        self.batches.append((nu, samples))
+        self.laatst_gezien = nu
+        self._snoei(nu)
+
+    def _snoei(self, nu):
+        grens = nu - HUB_CONFIG['venster_s']
+        while self.batches and self.batches[0][0] < grens:
+            self.batches.popleft()
+
+    def online(self, nu):
+        return self.laatst_gezien is not None and nu - self.laatst_gezien <= HUB_CONFIG['node_timeout_s']
+
+    def samenvatting(self, nu):
+        self._snoei(nu)
+        if self.batches:
+            samples = np.concatenate([s for _, s in self.batches])
+            venster = max(nu - self.batches[0][0], 1.0 / HUB_CONFIG['batch_hz'])
+        else:
+            samples = np.empty(0, dtype=SAMPLE_RECORD)
+            venster = 0.0
+        gezicht = (samples['vlaggen'] & VLAG_GEZICHT) != 0
+        focus = (samples['vlaggen'] & VLAG_FOCUS) != 0
+
+        # Actieve bezoekers: verschillende gezichten in de meest recente batch
+        actief = 0
+        laatste_blik = []
+        if self.batches and self.online(nu):
+            recent = self.batches[-1][1]
+            recent = recent[(recent['vlaggen'] & VLAG_GEZICHT) != 0]
+            ids, eerste = np.unique(recent['gezicht_id'][::-1], return_index=True)
+            actief = len(ids)
+            # Nieuwste punt per gezicht (downsampled stream voor het dashboard)
+            nieuwste = recent[::-1][eerste]
+            laatste_blik = [{'gezicht_id': int(s['gezicht_id']), 'x': round(float(s['x']), 1),
+                             'y': round(float(s['y']), 1), 'in_focus': bool(s['vlaggen'] & VLAG_FOCUS)}
+                            for s in nieuwste]
+
+        return {
+            'node': self.naam,
+            'verbonden': self.verbonden,
+            'online': self.online(nu),
+            'laatst_gezien_s': None if self.laatst_gezien is None else round(nu - self.laatst_gezien, 2),
+            'actieve_bezoekers': actief,
+            'samples': int(len(samples)),
+            'samples_per_s': round(len(samples) / venster, 2) if venster else 0.0,
+            'gezicht_ratio': round(float(gezicht.mean()), 3) if len(samples) else None,
+            'focus_ratio': round(float(focus.sum() / gezicht.sum()), 3) if gezicht.any() else None,
+            '_gezicht': int(gezicht.sum()),
+            '_focus': int(focus.sum()),
+            'laatste_blik': laatste_blik,
+            'ongeldige_batches': self.ongeldig
+        }
+
+
+class VenueHub:
+    """Fan-in van alle nodes naar per-node en venue-brede statistieken"""
+
+    def __init__(self):
+        self.nodes = {}
+        self.lock = threading.Lock()
+        self.clients = []
+
+    def node(self, naam):
+        with self.lock:
+            if naam not in self.nodes:
+                self.nodes[naam] = NodeAggregaat(naam)
+            return self.nodes[naam]
+
+    def ontvang_batch(self, naam, bericht):
+        node = self.node(naam)
+        try:
+            _, samples = pak_uit_batch(bericht)
+        except ValueError as e:
+            node.ongeldig += 1
+            print(f"Ongeldige batch van {naam}: {e}")
+            return
+        with self.lock:
+            node.voeg_toe(samples, time.monotonic())
+
+    def statistieken(self):
+        nu = time.monotonic()
+        with self.lock:
+            per_node = [node.samenvatting(nu) for node in self.nodes.values()]
+        gezicht = sum(n.pop('_gezicht') for n in per_node)
+        focus = sum(n.pop('_focus') for n in per_node)
+        return {
+            'timestamp': time.time() * 1000,
+            'venue': {
+                'nodes': len(per_node),
+                'nodes_online': sum(1 for n in per_node if n['online']),
+                'actieve_bezoekers': sum(n['actieve_bezoekers'] for n in per_node),
+                'samples_per_s': round(sum(n['samples_per_s'] for n in per_node), 2),
+                'focus_ratio': round(focus / gezicht, 3) if gezicht else None,
+                'venster_s': HUB_CONFIG['venster_s']
+            },
+            'nodes': per_node
+        }
+
+    def verbind_node(self, url):
+        """Socket.IO client naar een tracker node; herverbindt zelf"""
+        client = socketio_client.Client(reconnection=True)
+        node = self.node(url)
+
+        @client.event
+        def connect():
+            node.verbonden = True
+            client.emit('hub_subscribe', {})
+            print(f"Verbonden met node {url}")
+
+        @client.event
+        def disconnect():
+            node.verbonden = False
+            print(f"Node {url} ontkoppeld")
+
+        @client.on('hub_batch')
+        def hub_batch(bericht):
+            self.ontvang_batch(url, bericht)
+
+        @client.on('tracking_error')
+        def tracking_fout(data):
+            print(f"Node {url} meldt fout: {data}")
+
+        def verbind():
+            try:
+                client.connect(url, wait_timeout=10, retry=True)
+            except Exception as e:
+                print(f"Kan niet verbinden met node {url}: {e}")
+
+        threading.Thread(target=verbind, daemon=True).start()
+        self.clients.append(client)
+        return client
+
+    def stop(self):
+        for client in self.clients:
+            try:
+                client.disconnect()
+            except Exception as e:
+                print(f"Fout bij ontkoppelen node: {e}")
+
+
+def publiceer_loop(socketio):
+    """Downsampled venue updates naar dashboards, onafhankelijk van node batch rates"""
+    while True:
+        socketio.sleep(1.0 / HUB_CONFIG['dashboard_hz'])
+        socketio.emit('venue_update', hub.statistieken(), to=DASHBOARD_ROOM)
+
+
+# Flask app setup
+app = Flask(__name__)
+app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'development-key-change-in-production')
+socketio = SocketIO(app, cors_allowed_origins=SERVER_CONFIG['cors_origins'])
+
+hub = VenueHub()
+publiceer_thread = None
+
+
+def start_hub(node_urls):
+    """Verbind met alle nodes en start de dashboard publicatie"""
+    global publiceer_thread
+    if socketio_client is None:
+        raise RuntimeError("python-socketio client ontbreekt (pip install requests websocket-client)")
+    for url in node_urls:
+        hub.verbind_node(url)
+    if publiceer_thread is None:
+        publiceer_thread = socketio.start_background_task(publiceer_loop, socketio)
+
+
+@app.route('/')
+def index():
+    return jsonify(hub.statistieken())
+
+@socketio.on('connect')
+def verbinding_gemaakt():
+    print(f"Dashboard verbonden: {datetime.now()}")
+
+@socketio.on('dashboard_subscribe')
+def dashboard_abonnement(data=None):
+    join_room(DASHBOARD_ROOM)
+    emit('venue_update', hub.statistieken())
+
+@socketio.on('dashboard_unsubscribe')
+def dashboard_opzeggen(data=None):
+    leave_room(DASHBOARD_ROOM)
+
+@socketio.on('get_venue_stats')
+def krijg_venue_statistieken(data=None):
+    emit('venue_update', hub.statistieken())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Klok sync module voor Focus Tuin
+NTP-achtige klok offset per client en latentie verdelingen (capture -> emit/render)
+"""
+
+import time
+from collections import deque
+import numpy as np
+from ..core.configuratie import LATENTIE_METING_CONFIG
+
+
+def monotone_ms():
+    """Server klok voor alle latentie metingen (niet de wandklok)"""
+    return time.monotonic() * 1000
+
+
+class KlokSchatter:
+    """Schat client klok - server klok uit ping/pong rondes.
+
+    Per ronde: s0 server verzonden, c1 client ontvangen, c2 client verzonden,
+    s3 server ontvangen. Zoals bij NTP telt de ronde met de kleinste round-trip,
+    omdat die het minst door wachtrijen verstoord is.
+    """
+
+    def __init__(self, max_samples=None):
+        self.samples = deque(maxlen=max_samples or LATENTIE_METING_CONFIG['klok_samples'])
+        self.laatste_ping = 0.0
+
+    def wil_ping(self, nu_ms):
+        if nu_ms - self.laatste_ping >= LATENTIE_METING_CONFIG['ping_interval'] * 1000:
+            self.laatste_ping = nu_ms
+            return True
+        return False
+
+    def voeg_toe(self, s0, c1, c2, s3):
+        rtt = (s3 - s0) - (c2 - c1)
+        if rtt < 0:
+            return
+        offset = ((c1 - s0) + (c2 - s3)) / 2
+        self.samples.append((rtt, offset))
+
+    @property
+    def offset_ms(self):
+        if not self.samples:
+            return None
+        return min(self.samples)[1]
+
+    @property
+    def rtt_ms(self):
+        if not self.samples:
+            return None
+        return min(self.samples)[0]
+
+    def naar_server_ms(self, client_ms):
+        offset = self.offset_ms
+        return None if offset is None else client_ms - offset
+
+
+class LatentieVerdeling:
+    """Schuivend venster van latenties in ms met percentielen"""
+
+    def __init__(self, grootte=None):
+        self.waarden = deque(maxlen=grootte or LATENTIE_METING_CONFIG['verdeling_grootte'])
+        self.totaal = 0
+
+    def voeg_toe(self, latentie_ms):
+        self.waarden.append(latentie_ms)
+        self.totaal += 1
+
+    def samenvatting(self):
+        if not self.waarden:
+            return {"aantal": 0, "totaal": self.totaal}
+        waarden = np.fromiter(self.waarden, dtype=np.float64, count=len(self.waarden))
+        p50, p90, p99 = np.percentile(waarden, [50, 90, 99])
+        return {
+            "aantal": len(waarden),
+            "totaal": self.totaal,
+            "gemiddeld_ms": round(float(waarden.mean()), 2),
+            "p50_ms": round(float(p50), 2),
+            "p90_ms": round(float(p90), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(waarden.max()), 2)
+        }
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Sessie opname module voor Focus Tuin
+Compact binair logboek van uitgaande stream events, voor replay en load tests
+"""
+
+import os
+import json
+import time
+import struct
+import threading
+from datetime import datetime
+import numpy as np
+from ..core.configuratie import RECORDER_CONFIG
+
+MAGIC = b"FTSR"
+VERSIE = 1
+
+# Bestand: magic, versie, wandklok start (ms)
+BESTAND_HEADER = struct.Struct('<4sHd')
+# Record: monotone tijd (ms), type, payload lengte
+RECORD_HEADER = struct.Struct('<dBI')
+
+TYPE_JSON = 0
+TYPE_GAZE = 1
+TYPE_ASCII = 2
+
+# gaze_data: x, y, confidence, timestamp, capture_ms, gezicht_id, gezicht_gevonden, iris_detectie
+GAZE_RECORD = struct.Struct('<dddddhBB')
+GAZE_VELDEN = {'x', 'y', 'confidence', 'timestamp', 'capture_ms', 'gezicht_id', 'gezicht_gevonden', 'iris_detectie'}
+# ascii_webcam_frame: breedte, hoogte, timestamp, daarna breedte * hoogte luminance bytes
+ASCII_HEADER = struct.Struct('<HHd')
+
+
+def pak_gaze(gezicht):
+    """Gaze sample (dict met GAZE_VELDEN) naar een GAZE_RECORD; gedeeld met de binaire stream"""
+    return GAZE_RECORD.pack(
+        gezicht['x'], gezicht['y'], gezicht['confidence'], gezicht['timestamp'], gezicht['capture_ms'],
+        gezicht['gezicht_id'], gezicht['gezicht_gevonden'], gezicht['iris_detectie']
+    )
+
+
+def lees_gaze(buffer, offset=0):
+    """GAZE_RECORD op offset terug naar het gaze sample"""
+    x, y, confidence, timestamp, capture_ms, gezicht_id, gevonden, iris = GAZE_RECORD.unpack_from(buffer, offset)
+    return {
+        'x': x, 'y': y, 'confidence': confidence, 'timestamp': timestamp, 'capture_ms': capture_ms,
+        'gezicht_id': gezicht_id, 'gezicht_gevonden': bool(gevonden), 'iris_detectie': bool(iris)
+    }
+
+
+def codeer_event(event, data):
+    """Event naar (type, payload); onbekende vormen vallen terug op JSON"""
+    if event == 'gaze_data' and set(data) == GAZE_VELDEN:
+        return TYPE_GAZE, pak_gaze(data)
+    if event == 'ascii_webcam_frame' and 'luminance_data' in data:
+        luminance = np.asarray(data['luminance_data'], dtype=np.uint8)
+        return TYPE_ASCII, ASCII_HEADER.pack(data['width'], data['height'], data['timestamp']) + luminance.tobytes()
+    return TYPE_JSON, json.dumps({'event': event, 'data': data}, separators=(',', ':')).encode('utf-8')
+
+
+def decodeer_event(type_code, payload):
+    """(type, payload) terug naar (event, data) zoals het oorspronkelijk verstuurd is"""
+    if type_code == TYPE_GAZE:
+        return 'gaze_data', lees_gaze(payload)
+    if type_code == TYPE_ASCII:
+        breedte, hoogte, timestamp = ASCII_HEADER.unpack_from(payload)
+        luminance = np.frombuffer(payload, dtype=np.uint8, offset=ASCII_HEADER.size).reshape(hoogte, breedte)
+        return 'ascii_webcam_frame', {
+            'width': breedte, 'height': hoogte, 'luminance_data': luminance.tolist(), 'timestamp': timestamp
+        }
+    bericht = json.loads(payload.decode('utf-8'))
+    return bericht['event'], bericht['data']
+
+
+class SessieRecorder:
+    """Schrijft uitgaande events met hun monotone verzendtijd naar een binair bestand"""
+
+    def __init__(self, pad=None):
+        if pad is None:
+            os.makedirs(RECORDER_CONFIG['map'], exist_ok=True)
+            pad = os.path.join(RECORDER_CONFIG['map'], datetime.now().strftime("opname_%Y%m%d_%H%M%S.ftsr"))
+        self.pad = pad
+        self._lock = threading.Lock()
+        self._bestand = open(pad, 'wb')
+        self._bestand.write(BESTAND_HEADER.pack(MAGIC, VERSIE, time.time() * 1000))
+        self.aantal = 0
+
+    def registreer(self, event, data, tijd_ms=None):
+        type_code, payload = codeer_event(event, data)
+        tijd_ms = time.monotonic() * 1000 if tijd_ms is None else tijd_ms
+        with self._lock:
+            if self._bestand is None:
+                return
+            self._bestand.write(RECORD_HEADER.pack(tijd_ms, type_code, len(payload)))
+            self._bestand.write(payload)
+            self.aantal += 1
+
+    def sluit(self):
+        with self._lock:
+            if self._bestand is not None:
+                self._bestand.close()
+                self._bestand = None
+        print(f"Opname gesloten: {self.pad} ({self.aantal} events)")
+
+
+def lees_opname(pad):
+    """Genereer (tijd_ms, event, data) uit een opname bestand"""
+    with open(pad, 'rb') as f:
+        header = f.read(BESTAND_HEADER.size)
+        if len(header) < BESTAND_HEADER.size:
+            raise ValueError(f"Geen geldige opname: {pad}")
+        magic, versie, _ = BESTAND_HEADER.unpack(header)
+        if magic != MAGIC or versie != VERSIE:
+            raise ValueError(f"Onbekend opname formaat in {pad}")
+
+        while True:
+            record_header = f.read(RECORD_HEADER.size)
+            if len(record_header) < RECORD_HEADER.size:
+                return  # Einde, of een afgebroken laatste record
+            tijd_ms, type_code, lengte = RECORD_HEADER.unpack(record_header)
+            payload = f.read(lengte)
+            if len(payload) < lengte:
+                return
+            event, data = decodeer_event(type_code, payload)
+            yield tijd_ms, event, data
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Beeld benchmark voor Focus Tuin
+Vergelijkt het oude frame pad (flip, dubbele conversies, kopieen) met het buffer pad
+"""
+
+import argparse
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from ..core.kader_buffers import KaderBuffers
+
+
+def oud_pad(ruw, ascii_breedte, ascii_hoogte):
+    """Frame pad zoals het was: elke stap alloceert een volledig nieuw beeld"""
+    frame = cv2.flip(ruw, 1)                                   # krijg_frame
+    rgb = cv2.cvtColor(frame.copy(), cv2.COLOR_BGR2RGB)        # debug kopie + detecteer_ogen
+    grijs = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)            # optical flow
+    klein = cv2.resize(frame, (ascii_breedte, ascii_hoogte))   # maak_ascii_frame
+    klein_grijs = cv2.cvtColor(klein, cv2.COLOR_BGR2GRAY)
+    luminance = [[int(klein_grijs[y, x]) for x in range(ascii_breedte)] for y in range(ascii_hoogte)]
+    return rgb, grijs, luminance
+
+
+def buffer_pad(ruw, buffers, ascii_breedte, ascii_hoogte):
+    """Nieuw pad: geen flip, een RGB en een grijs conversie per frame in vaste buffers"""
+    buffers.nieuw_frame(ruw)
+    rgb = buffers.rgb()
+    grijs = buffers.grijs()
+    klein = buffers.spiegel("ascii_spiegel", buffers.verklein("ascii", grijs, ascii_breedte, ascii_hoogte))
+    return rgb, grijs, klein.tolist()
+
+
+def meet(pad, frames, herhalingen):
+    """Doorvoer en extra geheugen per frame (tracemalloc piek boven de basislijn)"""
+    # Opwarmen zodat buffers en OpenCV interne caches al bestaan
+    for frame in frames[:5]:
+        pad(frame)
+
+    start = time.perf_counter()
+    for _ in range(herhalingen):
+        for frame in frames:
+            pad(frame)
+    duur = time.perf_counter() - start
+    aantal = herhalingen * len(frames)
+
+    tracemalloc.start()
+    pieken = []
+    for frame in frames:
+        basis, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        resultaat = pad(frame)
+        _, piek = tracemalloc.get_traced_memory()
+        pieken.append(piek - basis)
+        del resultaat
+    tracemalloc.stop()
+
+    return {
+        "fps": aantal / duur,
+        "ms_per_frame": duur / aantal * 1000,
+        "piek_bytes_per_frame": float(np.median(pieken))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark van het per-frame beeld pad")
+    parser.add_argument("--breedte", type=int, default=640)
+    parser.add_argument("--hoogte", type=int, default=480)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--herhalingen", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (args.hoogte, args.breedte, 3), dtype=np.uint8) for _ in range(args.frames)]
+    buffers = KaderBuffers()
+
+    resultaten = {
+        "oud": meet(lambda f: oud_pad(f, 80, 40), frames, args.herhalingen),
+        "buffers": meet(lambda f: buffer_pad(f, buffers, 80, 40), frames, args.herhalingen)
+    }
+
+    print(f"Frame {args.breedte}x{args.hoogte}, {args.frames * args.herhalingen} frames per pad")
+    for naam, r in resultaten.items():
+        print(f"  {naam:8s} {r['fps']:8.1f} fps  {r['ms_per_frame']:6.3f} ms/frame  "
+              f"{r['piek_bytes_per_frame'] / 1024:8.1f} KiB extra geheugen per frame")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Belasting test voor Focus Tuin
+Start honderden headless Socket.IO clients in een proces en meet de fan-out van eye_server.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+import numpy as np
+
+try:
+    import socketio
+except ImportError:  # Alleen nodig voor de echte verbindingen, niet voor de rapport functies
+    socketio = None
+
+STREAM_EVENTS = ('gaze_data', 'ascii_webcam_frame')
+
+
+def wand_ms():
+    return time.time() * 1000
+
+
+class KlantMeter:
+    """Ontvangstmetingen van een client: rate, inter-arrival jitter en lag per event"""
+
+    def __init__(self, nummer):
+        self.nummer = nummer
+        self.aankomsten = {event: [] for event in STREAM_EVENTS}   # monotone ms
+        self.lags = {event: [] for event in STREAM_EVENTS}         # ontvangst - server timestamp (ms)
+        self.jitter = {event: 0.0 for event in STREAM_EVENTS}      # RFC 3550 schatting
+        self._vorige = {}
+        self.fouten = []
+        self.verbonden_ms = None
+
+    def ontvang(self, event, data, ontvangen_mono_ms, ontvangen_wand_ms):
+        self.aankomsten[event].append(ontvangen_mono_ms)
+        server_ms = data.get('timestamp') if isinstance(data, dict) else None
+        if server_ms is None:
+            return
+        self.lags[event].append(ontvangen_wand_ms - server_ms)
+
+        # Verschil in transit tijd tussen opeenvolgende berichten, gladgestreken met 1/16
+        vorige = self._vorige.get(event)
+        if vorige is not None:
+            d = (ontvangen_mono_ms - vorige[0]) - (server_ms - vorige[1])
+            self.jitter[event] += (abs(d) - self.jitter[event]) / 16
+        self._vorige[event] = (ontvangen_mono_ms, server_ms)
+
+    def samenvatting(self, duur_s):
+        resultaat = {"client": self.nummer, "fouten": self.fouten, "verbonden_ms": self.verbonden_ms}
+        for event in STREAM_EVENTS:
+            aankomsten = np.asarray(self.aankomsten[event])
+            tussentijden = np.diff(aankomsten) if len(aankomsten) > 1 else np.empty(0)
+            resultaat[event] = {
+                "aantal": int(len(aankomsten)),
+                "rate": round(len(aankomsten) / duur_s, 2) if duur_s > 0 else 0.0,
+                "tussentijd_std_ms": round(float(tussentijden.std()), 3) if len(tussentijden) else None,
+                "jitter_ms": round(self.jitter[event], 3),
+                "lag": percentielen(self.lags[event])
+            }
+        return resultaat
+
+
+def percentielen(waarden, eenheid="_ms"):
+    if not len(waarden):
+        return None
+    waarden = np.asarray(waarden, dtype=np.float64)
+    p50, p90, p99 = np.percentile(waarden, [50, 90, 99])
+    return {"p50" + eenheid: round(float(p50), 2), "p90" + eenheid: round(float(p90), 2),
+            "p99" + eenheid: round(float(p99), 2), "max" + eenheid: round(float(waarden.max()), 2)}
+
+
+class BelastingKlant:
+    """Een headless client die de gaze en ASCII streams volgt zoals de frontend"""
+
+    def __init__(self, nummer, url, scherm, transports):
+        self.meter = KlantMeter(nummer)
+        self.url = url
+        self.scherm = scherm
+        self.transports = transports
+        self.client = socketio.Client(reconnection=False)
+        self._registreer()
+
+    def _registreer(self):
+        client = self.client
+
+        for event in STREAM_EVENTS:
+            client.on(event, self._maak_handler(event))
+
+        @client.on('clock_ping')
+        def klok_ping(data):
+            # Zelfde antwoord als de browser, zodat de server latentie statistieken meetelt
+            nu = time.monotonic() * 1000
+            client.emit('clock_pong', {'server_ms': data['server_ms'],
+                                       'client_ontvangen_ms': nu, 'client_verzonden_ms': nu})
+
+        @client.on('tracking_error')
+        def tracking_fout(data):
+            self.meter.fouten.append(str(data))
+
+    def _maak_handler(self, event):
+        def handler(data):
+            self.meter.ontvang(event, data, time.monotonic() * 1000, wand_ms())
+        return handler
+
+    def start(self):
+        start = time.perf_counter()
+        try:
+            self.client.connect(self.url, transports=self.transports, wait_timeout=10)
+            self.client.emit('start_tracking', {'screen_width': self.scherm[0], 'screen_height': self.scherm[1]})
+            self.meter.verbonden_ms = round((time.perf_counter() - start) * 1000, 2)
+        except Exception as e:
+            self.meter.fouten.append(f"verbinden: {e}")
+
+    def stop(self):
+        try:
+            if self.client.connected:
+                self.client.disconnect()
+        except Exception as e:
+            self.meter.fouten.append(f"ontkoppelen: {e}")
+
+
+def maak_rapport(meters, duur_s, instellingen):
+    """Totaalrapport over alle clients plus de samenvatting per client"""
+    per_client = [meter.samenvatting(duur_s) for meter in meters]
+    totaal = {"clients": len(meters), "mislukt": sum(1 for c in per_client if c["fouten"])}
+    for event in STREAM_EVENTS:
+        rates = [c[event]["rate"] for c in per_client]
+        jitters = [c[event]["jitter_ms"] for c in per_client if c[event]["aantal"] > 1]
+        alle_lags = [lag for meter in meters for lag in meter.lags[event]]
+        totaal[event] = {
+            "berichten": sum(c[event]["aantal"] for c in per_client),
+            "rate_per_client": percentielen(rates, eenheid=""),
+            "rate_min": min(rates) if rates else None,
+            "jitter": percentielen(jitters),
+            "lag": percentielen(alle_lags)
+        }
+    return {
+        "tijd": datetime.now().isoformat(timespec="seconds"),
+        "instellingen": instellingen,
+        "duur_s": round(duur_s, 2),
+        "totaal": totaal,
+        "per_client": per_client
+    }
+
+
+def vergelijk(rapport, vorig):
+    """Regels met de verschuiving van de kerngetallen ten opzichte van een eerder rapport"""
+    regels = []
+    for event in STREAM_EVENTS:
+        nu, toen = rapport["totaal"][event], vorig["totaal"].get(event, {})
+        for sleutel in ("lag", "jitter"):
+            for p in ("p50_ms", "p99_ms"):
+                a = (toen.get(sleutel) or {}).get(p)
+                b = (nu.get(sleutel) or {}).get(p)
+                if a is not None and b is not None:
+                    regels.append(f"{event} {sleutel} {p}: {a} -> {b} ({b - a:+.2f})")
+        a = (toen.get("rate_per_client") or {}).get("p50")
+        b = (nu.get("rate_per_client") or {}).get("p50")
+        if a is not None and b is not None:
+            regels.append(f"{event} rate p50: {a} -> {b} ({b - a:+.2f}/s)")
+    return regels
+
+
+def draai(url, aantal, duur_s, opstart_interval, scherm, transports):
+    klanten = [BelastingKlant(i, url, scherm, transports) for i in range(aantal)]
+
+    # Geleidelijk opstarten; een storm van verbindingen meet iets anders dan fan-out
+    draden = []
+    for klant in klanten:
+        draad = threading.Thread(target=klant.start, daemon=True)
+        draad.start()
+        draden.append(draad)
+        time.sleep(opstart_interval)
+    for draad in draden:
+        draad.join()
+
+    # Meetvenster begint pas als iedereen verbonden is
+    for klant in klanten:
+        for event in STREAM_EVENTS:
+            klant.meter.aankomsten[event].clear()
+            klant.meter.lags[event].clear()
+    start = time.perf_counter()
+    time.sleep(duur_s)
+    gemeten = time.perf_counter() - start
+
+    for klant in klanten:
+        klant.stop()
+    return [klant.meter for klant in klanten], gemeten
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO belasting test voor de eye tracking server")
+    parser.add_argument("--url", default="http://localhost:5001")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duur", type=float, default=30.0, help="Meetvenster in seconden")
+    parser.add_argument("--opstart-interval", type=float, default=0.02, help="Seconden tussen client starts")
+    parser.add_argument("--scherm", default="1920x1080")
+    parser.add_argument("--transport", choices=["websocket", "polling"], default="websocket")
+    parser.add_argument("--rapport", help="Schrijf het JSON rapport naar dit pad")
+    parser.add_argument("--vergelijk", help="Eerder rapport om tegen te vergelijken")
+    args = parser.parse_args()
+
+    if socketio is None:
+        raise SystemExit("python-socketio client ontbreekt (pip install python-socketio requests websocket-client)")
+
+    scherm = tuple(int(d) for d in args.scherm.lower().split("x"))
+    print(f"{args.clients} clients naar {args.url}, meetvenster {args.duur}s...")
+    meters, gemeten = draai(args.url, args.clients, args.duur, args.opstart_interval, scherm, [args.transport])
+
+    rapport = maak_rapport(meters, gemeten, {
+        "url": args.url, "clients": args.clients, "duur_s": args.duur,
+        "transport": args.transport, "scherm": args.scherm
+    })
+
+    totaal = rapport["totaal"]
+    print(f"Clients: {totaal['clients']} (mislukt: {totaal['mislukt']})")
+    for event in STREAM_EVENTS:
+        t = totaal[event]
+        print(f"  {event}: {t['berichten']} berichten, rate/client {t['rate_per_client']}, "
+              f"jitter {t['jitter']}, lag {t['lag']}")
+
+    if args.rapport:
+        with open(args.rapport, 'w', encoding='utf-8') as f:
+            json.dump(rapport, f, indent=2)
+        print(f"Rapport geschreven naar {args.rapport}")
+
+    if args.vergelijk:
+        with open(args.vergelijk, 'r', encoding='utf-8') as f:
+            vorig = json.load(f)
+        print("Vergelijking met", args.vergelijk)
+        for regel in vergelijk(rapport, vorig):
+            print("  " + regel)
+
+
+if __name__ == '__main__':
+    main()
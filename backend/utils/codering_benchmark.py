@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Codering benchmark voor Focus Tuin
+Vergelijkt encode tijd en bytes per event tussen de JSON route en de binaire struct records
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+from ..core.ascii_palet import PaletKwantiseerder
+from ..server.binaire_codering import codeer, decodeer
+
+
+def json_codeer(event, data):
+    """Zoals python-socketio een event pakket serialiseert"""
+    return json.dumps([event, data], separators=(',', ':')).encode('utf-8')
+
+
+def maak_voorbeelden(rng):
+    def gezicht(gezicht_id):
+        return {
+            'x': float(rng.uniform(0, 1920)), 'y': float(rng.uniform(0, 1080)),
+            'confidence': float(rng.uniform(0.5, 1.0)), 'timestamp': time.time() * 1000,
+            'capture_ms': time.monotonic() * 1000, 'gezicht_id': gezicht_id,
+            'gezicht_gevonden': True, 'iris_detectie': True
+        }
+
+    grid = rng.integers(0, 256, (40, 80), dtype=np.uint8)
+    rijen = PaletKwantiseerder().rijen(grid, ' .,;xe$@')
+    return {
+        'gaze_data': gezicht(0),
+        'gaze_faces (3)': {'gezichten': [gezicht(i) for i in range(3)], 'timestamp': time.time() * 1000},
+        'gaze_batch (6)': {'samples': [gezicht(0) for _ in range(6)], 'timestamp': time.time() * 1000},
+        'ascii rijen 80x40': {'width': 80, 'height': 40, 'rows': rijen, 'timestamp': time.time() * 1000},
+        'ascii luminance 80x40': {'width': 80, 'height': 40, 'luminance_data': grid.tolist(),
+                                  'timestamp': time.time() * 1000},
+    }
+
+
+def meet(functie, herhalingen):
+    start = time.perf_counter()
+    for _ in range(herhalingen):
+        resultaat = functie()
+    return (time.perf_counter() - start) / herhalingen * 1e6, len(resultaat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON versus binaire codering van stream events")
+    parser.add_argument("--herhalingen", type=int, default=5000)
+    args = parser.parse_args()
+
+    voorbeelden = maak_voorbeelden(np.random.default_rng(0))
+    print(f"{'event':24s} {'json us':>9s} {'json B':>8s} {'struct us':>10s} {'struct B':>9s} {'bytes':>7s}")
+    for naam, data in voorbeelden.items():
+        event = naam.split(' ')[0]
+        if event == 'ascii':
+            event = 'ascii_webcam_frame'
+        bericht = codeer(event, data)
+        terug_event, terug = decodeer(bericht)
+        assert terug_event == event and terug == data, f"Roundtrip verschilt voor {naam}"
+
+        json_us, json_bytes = meet(lambda: json_codeer(event, data), args.herhalingen)
+        struct_us, struct_bytes = meet(lambda: codeer(event, data), args.herhalingen)
+        print(f"{naam:24s} {json_us:9.2f} {json_bytes:8d} {struct_us:10.2f} {struct_bytes:9d} "
+              f"{struct_bytes / json_bytes:6.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -76,7 +76,7 @@ class DebugCameraPreview:
                 fps_counter = 0
             
             # Detecteer ogen en iris
-            oog_data = self.oog_detector.detecteer_ogen(frame.copy())
+            oog_data = self.oog_detector.detecteer_ogen(frame)
             
             # Teken visualisaties
             debug_frame = self.teken_debug_info(frame, oog_data, fps_display)
@@ -103,7 +103,12 @@ class DebugCameraPreview:
                 
     def teken_debug_info(self, frame, oog_data, fps):
         """Teken alle debug visualisaties op frame"""
-        debug_frame = frame.copy()
+        # Tekenen gebeurt in een vaste buffer; bij landmark spiegeling wordt het beeld hier geflipt
+        if self.camera.spiegel_pixels:
+            debug_frame = self.oog_detector.buffers.buffer("weergave", frame.shape)
+            np.copyto(debug_frame, frame)
+        else:
+            debug_frame = self.oog_detector.buffers.spiegel("weergave", frame)
         
         if oog_data and oog_data.get('iris_detectie', False):
             # Teken iris punten
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Duurtest voor Focus Tuin
+Draait de volledige pipeline urenlang versneld op een opgenomen of synthetische bron en bewaakt geheugen, bestanden, threads en latentie
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+import cv2
+import numpy as np
+from ..core.camera_manager import CameraDetectie
+from ..core.configuratie import PERFORMANCE_CONFIG
+from .belasting_test import percentielen
+
+# Toegestane groei tussen begin en eind van de meting (na de opwarmtijd)
+DREMPELS = {
+    "rss_mb": ("relatief", 0.10),
+    "tracemalloc_mb": ("relatief", 0.10),
+    "bestanden": ("absoluut", 4),
+    "threads": ("absoluut", 2),
+    "frame_p99_ms": ("relatief", 0.25),
+    "emit_p99_ms": ("relatief", 0.25),
+}
+
+
+class BronCamera(CameraDetectie):
+    """Camera vervanger: een video bestand in een lus of synthetische frames, op een vaste rate.
+
+    Twee indices, zodat camera wissels (en het heropenen van VideoCapture) meegetest worden.
+    """
+
+    def __init__(self, video_pad=None, fps=30.0, breedte=640, hoogte=480):
+        super().__init__()
+        self.video_pad = video_pad
+        self.interval = 1.0 / fps
+        self.breedte = breedte
+        self.hoogte = hoogte
+        self.beschikbare_cameras = [
+            {'index': i, 'naam': f"Duurtest bron {i}", 'resolutie': f"{breedte}x{hoogte}"} for i in range(2)
+        ]
+        self._volgende = 0.0
+        self._synthetisch = None
+        self._teller = 0
+
+    def zoek_cameras(self):
+        return True
+
+    def _start_camera(self, index, onderhandel):
+        index = self.beschikbare_cameras[0]['index'] if index is None else index
+        self._ontkoppel_camera()
+        if self.video_pad:
+            capture = cv2.VideoCapture(self.video_pad)
+            if not capture.isOpened():
+                print(f"Video {self.video_pad} kan niet worden geopend")
+                return False
+        else:
+            capture = _SynthetischeCapture()
+            rng = np.random.default_rng(index)
+            self._synthetisch = rng.integers(0, 256, (self.hoogte, self.breedte, 3), dtype=np.uint8)
+        with self._lees_lock:
+            self.huidige_camera = capture
+        self.camera_index = index
+        return True
+
+    def _lees(self, capture):
+        """Vervangt grab/retrieve; krijg_frame houdt de lezer administratie bij"""
+        if not capture.isOpened():
+            return None
+
+        # Vaste rate zoals een echte sensor, ook als de loop sneller kan
+        wacht = self._volgende - time.perf_counter()
+        if wacht > 0:
+            time.sleep(wacht)
+        self._volgende = max(self._volgende + self.interval, time.perf_counter())
+        self.laatste_capture_ms = time.monotonic() * 1000
+
+        if self.video_pad:
+            ret, frame = capture.read(self._frame_buffer)
+            if not ret:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = capture.read(self._frame_buffer)
+                if not ret:
+                    return None
+            self._frame_buffer = frame
+            return frame
+
+        # Verschuivend patroon in een vaste buffer, zodat het beeld per frame verandert
+        self._teller += 1
+        if self._frame_buffer is None:
+            self._frame_buffer = np.empty_like(self._synthetisch)
+        verschuiving = self._teller % self.breedte
+        self._frame_buffer[:, :self.breedte - verschuiving] = self._synthetisch[:, verschuiving:]
+        self._frame_buffer[:, self.breedte - verschuiving:] = self._synthetisch[:, :verschuiving]
+        return self._frame_buffer
+
+
+class _SynthetischeCapture:
+    def __init__(self):
+        self.open = True
+
+    def isOpened(self):
+        return self.open
+
+    def release(self):
+        self.open = False
+
+
+def lees_proc_status(veld):
+    """Waarde uit /proc/self/status (Linux); None op andere platformen"""
+    try:
+        with open("/proc/self/status") as bestand:
+            for regel in bestand:
+                if regel.startswith(veld + ":"):
+                    return int(regel.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def open_bestanden():
+    for pad in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(pad))
+        except OSError:
+            continue
+    return None
+
+
+class ResourceMeter:
+    """Periodieke metingen van het eigen proces, plus de top allocaties volgens tracemalloc"""
+
+    def __init__(self, top=10):
+        self.top = top
+        self.metingen = []
+        self.vorige_snapshot = None
+        self.groeiers = []
+
+    def meet(self, verstreken_s, frame_tijden, emit_latenties, frames):
+        rss_kb = lees_proc_status("VmRSS")
+        native_threads = lees_proc_status("Threads")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        if self.vorige_snapshot is not None:
+            self.groeiers = [
+                f"{verschil.traceback[0].filename}:{verschil.traceback[0].lineno} "
+                f"{verschil.size_diff / 1024:+.1f} KiB ({verschil.count_diff:+d})"
+                for verschil in snapshot.compare_to(self.vorige_snapshot, "lineno")[:self.top]
+                if verschil.size_diff > 0
+            ]
+        self.vorige_snapshot = snapshot
+
+        frame_p = percentielen(frame_tijden) or {}
+        emit_p = percentielen(emit_latenties) or {}
+        meting = {
+            "verstreken_s": round(verstreken_s, 1),
+            "frames": frames,
+            "rss_mb": round(rss_kb / 1024, 2) if rss_kb is not None else None,
+            "tracemalloc_mb": round(tracemalloc.get_traced_memory()[0] / 2 ** 20, 2),
+            "bestanden": open_bestanden(),
+            "threads": native_threads if native_threads is not None else threading.active_count(),
+            "frame_p50_ms": frame_p.get("p50_ms"),
+            "frame_p99_ms": frame_p.get("p99_ms"),
+            "emit_p50_ms": emit_p.get("p50_ms"),
+            "emit_p99_ms": emit_p.get("p99_ms"),
+        }
+        self.metingen.append(meting)
+        return meting
+
+
+def beoordeel(metingen, opwarm_s):
+    """Groei per metriek: mediaan van het laatste derde tegen het eerste derde na de opwarmtijd.
+
+    Geeft (trends, fouten); een fout als de groei boven de drempel ligt en de helling positief is.
+    """
+    bruikbaar = [m for m in metingen if m["verstreken_s"] >= opwarm_s]
+    trends, fouten = {}, []
+    if len(bruikbaar) < 6:
+        return trends, ["Te weinig metingen na de opwarmtijd voor een trend"]
+
+    for metriek, (soort, drempel) in DREMPELS.items():
+        reeks = [(m["verstreken_s"], m[metriek]) for m in bruikbaar if m[metriek] is not None]
+        if len(reeks) < 6:
+            continue
+        derde = len(reeks) // 3
+        tijden, waarden = np.array(reeks, dtype=np.float64).T
+        begin = float(np.median(waarden[:derde]))
+        eind = float(np.median(waarden[-derde:]))
+        helling_per_uur = float(np.polyfit(tijden, waarden, 1)[0]) * 3600
+        groei = (eind - begin) / begin if soort == "relatief" and begin > 0 else eind - begin
+        trends[metriek] = {"begin": round(begin, 2), "eind": round(eind, 2),
+                           "groei": round(groei, 3), "helling_per_uur": round(helling_per_uur, 3)}
+        if groei > drempel and helling_per_uur > 0:
+            eenheid = f"{groei:+.1%}" if soort == "relatief" else f"{groei:+.1f}"
+            fouten.append(f"{metriek} stijgt: {begin:.2f} -> {eind:.2f} ({eenheid}, drempel {drempel})")
+    return trends, fouten
+
+
+class Klanten:
+    """In-process Socket.IO clients die volgen; de oudste wordt periodiek vervangen"""
+
+    def __init__(self, eye_server, aantal):
+        self.eye_server = eye_server
+        self.actief = [self._nieuw() for _ in range(aantal)]
+        self.ontvangen = 0
+
+    def _nieuw(self):
+        klant = self.eye_server.socketio.test_client(self.eye_server.app)
+        klant.emit('start_tracking', {'screen_width': 1920, 'screen_height': 1080})
+        return klant
+
+    def leeg(self):
+        """Ontvangen pakketten weggooien; anders groeit de wachtrij van de test client"""
+        for klant in self.actief:
+            self.ontvangen += len(klant.get_received())
+
+    def vervang_oudste(self):
+        if not self.actief:
+            return
+        oudste = self.actief.pop(0)
+        oudste.disconnect()
+        self.actief.append(self._nieuw())
+
+    def stop(self):
+        for klant in self.actief:
+            if klant.is_connected():
+                klant.disconnect()
+        self.actief = []
+
+
+def draai(args):
+    # Server pas hier importeren: dat start cameradetectie en Socket.IO
+    from ..core.aandacht_opslag import AandachtOpslag
+    from ..core.camera_waakhond import CameraWaakhond
+    from ..server import eye_server
+    from ..server.async_modus import blokkerend
+
+    server = eye_server.server
+    PERFORMANCE_CONFIG['target_fps'] = args.fps * args.versnelling
+    if args.replay:
+        server.replay_pad = args.replay
+        server.replay_snelheid = args.versnelling
+    else:
+        server.camera = BronCamera(args.video, fps=args.fps * args.versnelling)
+        server.camera.start_camera(0)
+        if server.waakhond is not None:
+            server.waakhond = CameraWaakhond(server.camera, blokkerend)
+    opslag_map = tempfile.mkdtemp(prefix="duurtest_opslag_")
+    if server.opslag is not None:
+        server.opslag.sluit()
+        server.opslag = AandachtOpslag(opslag_map)
+
+    # Frame tijd via de latentie regelaar, die elke verwerkte frametijd al krijgt
+    frame_tijden = []
+    if server.regelaar is not None:
+        registreer = server.regelaar.registreer
+
+        def meet_frame(verwerkingstijd_ms):
+            frame_tijden.append(verwerkingstijd_ms)
+            return registreer(verwerkingstijd_ms)
+        server.regelaar.registreer = meet_frame
+
+    tracemalloc.start(args.tracemalloc_diepte)
+    meter = ResourceMeter()
+    klanten = Klanten(eye_server, args.clients)
+    start = time.perf_counter()
+    volgende_meting = volgende_wissel = volgende_churn = 0.0
+    camera_index = 0
+    print(f"Duurtest gestart: {args.duur:.0f}s, bron {args.replay or args.video or 'synthetisch'}, "
+          f"{args.fps * args.versnelling:.0f} fps ({args.versnelling}x), {args.clients} clients")
+
+    try:
+        while (verstreken := time.perf_counter() - start) < args.duur:
+            time.sleep(0.05)
+            klanten.leeg()
+            if args.wissel_elke and verstreken >= volgende_wissel and not args.replay:
+                if volgende_wissel:
+                    camera_index = 1 - camera_index
+                    server.wissel_camera(camera_index)
+                volgende_wissel = verstreken + args.wissel_elke
+            if args.churn_elke and verstreken >= volgende_churn:
+                if volgende_churn:
+                    klanten.vervang_oudste()
+                volgende_churn = verstreken + args.churn_elke
+            if verstreken >= volgende_meting:
+                emit_latenties = [w for sessie in list(server.sessies.values())
+                                  for w in sessie.latentie_emit.waarden]
+                meting = meter.meet(verstreken, frame_tijden, emit_latenties, len(frame_tijden))
+                frame_tijden.clear()
+                print(f"[{meting['verstreken_s']:8.0f}s] rss {meting['rss_mb']} MB, "
+                      f"tracemalloc {meting['tracemalloc_mb']} MB, fds {meting['bestanden']}, "
+                      f"threads {meting['threads']}, frame p99 {meting['frame_p99_ms']} ms, "
+                      f"emit p99 {meting['emit_p99_ms']} ms")
+                volgende_meting = verstreken + args.interval
+    finally:
+        klanten.stop()
+        server.stop_tracking()
+        if server.opslag is not None:
+            server.opslag.sluit()
+        tracemalloc.stop()
+
+    trends, fouten = beoordeel(meter.metingen, args.opwarm)
+    nominale_uren = sum(m["frames"] for m in meter.metingen) / args.fps / 3600
+    return {
+        "tijd": datetime.now().isoformat(timespec="seconds"),
+        "instellingen": vars(args),
+        "nominale_uren": round(nominale_uren, 2),
+        "ontvangen_pakketten": klanten.ontvangen,
+        "opslag_map": opslag_map,
+        "trends": trends,
+        "groeiers": meter.groeiers,
+        "fouten": fouten,
+        "metingen": meter.metingen,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Duurtest van de tracking pipeline met resource bewaking")
+    bron = parser.add_mutually_exclusive_group()
+    bron.add_argument("--video", help="Video bestand als camera bron (in een lus); standaard synthetische frames")
+    bron.add_argument("--replay", help="Opname (main_server.py --opnemen) afspelen in plaats van een camera")
+    parser.add_argument("--duur", type=float, default=3600.0, help="Seconden wandtijd")
+    parser.add_argument("--fps", type=float, default=30.0, help="Nominale camera rate")
+    parser.add_argument("--versnelling", type=float, default=4.0, help="Bron en loop draaien zoveel keer sneller")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--churn-elke", type=float, default=30.0, help="Seconden tussen client wissels (0 = uit)")
+    parser.add_argument("--wissel-elke", type=float, default=300.0, help="Seconden tussen camera wissels (0 = uit)")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconden tussen resource metingen")
+    parser.add_argument("--opwarm", type=float, default=120.0, help="Seconden die niet meetellen voor trends")
+    parser.add_argument("--tracemalloc-diepte", type=int, default=1)
+    parser.add_argument("--rapport", help="Schrijf het rapport als JSON naar dit pad")
+    args = parser.parse_args()
+
+    rapport = draai(args)
+    print(f"\nNominaal {rapport['nominale_uren']} uur aan frames verwerkt")
+    for metriek, trend in rapport["trends"].items():
+        print(f"  {metriek:16s} {trend['begin']:>10} -> {trend['eind']:<10} ({trend['helling_per_uur']:+}/uur)")
+    if rapport["groeiers"]:
+        print("Grootste groei sinds de vorige meting (tracemalloc):")
+        for regel in rapport["groeiers"]:
+            print(f"  {regel}")
+    if args.rapport:
+        with open(args.rapport, "w") as bestand:
+            json.dump(rapport, bestand, indent=2)
+        print(f"Rapport geschreven naar {args.rapport}")
+
+    if rapport["fouten"]:
+        print("DUURTEST MISLUKT:")
+        for fout in rapport["fouten"]:
+            print(f"  {fout}")
+        sys.exit(1)
+    print("Duurtest geslaagd: geen stijgende trends")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Focus Tuin Venue Hub Entry Point
+Bundelt meerdere tracker nodes voor een centraal dashboard
+"""
+
+import sys
+import os
+import argparse
+
+# Voeg backend directory toe aan Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from backend.server.hub_server import app, socketio, hub, start_hub, HUB_CONFIG
+
+
+def lees_argumenten():
+    parser = argparse.ArgumentParser(description="Focus Tuin Venue Hub")
+    parser.add_argument("nodes", nargs="+", metavar="URL",
+                        help="Tracker nodes, bijvoorbeeld http://localhost:5001 http://localhost:5002")
+    parser.add_argument("--port", type=int, default=HUB_CONFIG['port'])
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = lees_argumenten()
+    print("Focus Tuin Venue Hub")
+    print(f"Luistert op http://{HUB_CONFIG['host']}:{args.port}, {len(args.nodes)} nodes")
+    
+    try:
+        start_hub(args.nodes)
+        socketio.run(app, host=HUB_CONFIG['host'], port=args.port)
+    except KeyboardInterrupt:
+        print("Hub gestopt")
+    finally:
+        hub.stop()
@@ -6,15 +6,61 @@ Gebruik de nieuwe backend structuur
 
 import sys
 import os
+import argparse
 
 # Voeg backend directory toe aan Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
-from backend.server.eye_server import app, socketio, SERVER_CONFIG
+# Alleen configuratie en async keuze voor de monkey patch; de server zelf pas daarna importeren
+from backend.core.configuratie import SERVER_CONFIG, PROFIELEN, STANDAARD_PROFIEL
+from backend.server import async_modus
+
+
+def lees_argumenten():
+    parser = argparse.ArgumentParser(description="Focus Tuin Eye-Tracking Server")
+    parser.add_argument("--opnemen", nargs="?", const="", metavar="PAD",
+                        help="Neem de uitgaande gaze/ASCII stream op (standaard in data/opnames)")
+    parser.add_argument("--replay", metavar="PAD",
+                        help="Speel een opname af in plaats van de camera te gebruiken")
+    parser.add_argument("--snelheid", type=float, default=1.0,
+                        help="Replay snelheid, bijvoorbeeld 4 voor 4x (standaard 1)")
+    parser.add_argument("--port", type=int, default=SERVER_CONFIG['port'],
+                        help="Poort, zodat meerdere nodes naast elkaar kunnen draaien (bijv. replay achter een hub)")
+    parser.add_argument("--async-modus", choices=async_modus.ASYNC_MODI, default=SERVER_CONFIG['async_mode'],
+                        help="Socket.IO backend: threading (standaard); eventlet/gevent voor veel WebSocket clients "
+                             "zijn experimenteel")
+    parser.add_argument("--profiel", choices=list(PROFIELEN), default=STANDAARD_PROFIEL,
+                        help="Prestatie profiel (capture, inferentie, ASCII en leverings rates); "
+                             "tijdens het draaien te wisselen met het 'set_profile' event")
+    return parser.parse_args()
+
 
 if __name__ == '__main__':
+    args = lees_argumenten()
+    SERVER_CONFIG['port'] = args.port
+    async_modus.activeer(args.async_modus)
+    
+    from backend.server.eye_server import app, socketio, server
+    from backend.server.sessie_opname import SessieRecorder
+    
+    if args.replay:
+        if args.snelheid <= 0:
+            sys.exit("--snelheid moet groter dan 0 zijn")
+        server.replay_pad = args.replay
+        server.replay_snelheid = args.snelheid
+    if args.opnemen is not None and server.recorder is None:
+        server.recorder = SessieRecorder(args.opnemen or None)
+    if args.profiel and args.profiel != server.profiel:
+        server.kies_profiel(args.profiel)
+        
     print("Focus Tuin Eye-Tracking Server")
-    print(f"Luistert op http://{SERVER_CONFIG['host']}:{SERVER_CONFIG['port']}")
+    print(f"Luistert op http://{SERVER_CONFIG['host']}:{SERVER_CONFIG['port']} ({socketio.async_mode})")
+    if server.replay_pad:
+        print(f"Replay modus: {server.replay_pad} ({server.replay_snelheid}x)")
+    if server.recorder:
+        print(f"Opname naar {server.recorder.pad}")
+    if server.profiel:
+        print(f"Prestatie profiel: {server.profiel}")
     
     try:
         socketio.run(
@@ -24,4 +70,9 @@ if __name__ == '__main__':
             debug=SERVER_CONFIG['debug']
         )
     except KeyboardInterrupt:
-        print("Server gestopt")
\ No newline at end of file
+        print("Server gestopt")
+    finally:
+        if server.opslag:
+            server.opslag.sluit()
+        if server.recorder:
+            server.recorder.sluit()
@@ -0,0 +1,86 @@
+// Decoder voor de binaire stream ('stream_bin') van de Python backend
+// Spiegel van backend/server/binaire_codering.py: little-endian struct records
+
+const TYPE_GAZE = 1;
+const TYPE_ASCII = 2;
+const TYPE_ASCII_RIJEN = 3;
+const TYPE_GEZICHTEN = 4;
+const TYPE_BATCH = 5;
+
+// GAZE_RECORD '<dddddhBB': x, y, confidence, timestamp, capture_ms, gezicht_id, gevonden, iris
+const GAZE_RECORD_GROOTTE = 44;
+// LIJST_HEADER '<dH': timestamp, aantal
+const LIJST_HEADER_GROOTTE = 10;
+// ASCII_HEADER '<HHd': breedte, hoogte, timestamp
+const ASCII_HEADER_GROOTTE = 12;
+
+function leesGaze(view, offset) {
+  return {
+    x: view.getFloat64(offset, true),
+    y: view.getFloat64(offset + 8, true),
+    confidence: view.getFloat64(offset + 16, true),
+    timestamp: view.getFloat64(offset + 24, true),
+    capture_ms: view.getFloat64(offset + 32, true),
+    gezicht_id: view.getInt16(offset + 40, true),
+    gezicht_gevonden: view.getUint8(offset + 42) !== 0,
+    iris_detectie: view.getUint8(offset + 43) !== 0
+  };
+}
+
+function leesGazeLijst(view, offset) {
+  const timestamp = view.getFloat64(offset, true);
+  const aantal = view.getUint16(offset + 8, true);
+  const gezichten = [];
+  for (let i = 0; i < aantal; i++) {
+    gezichten.push(leesGaze(view, offset + LIJST_HEADER_GROOTTE + i * GAZE_RECORD_GROOTTE));
+  }
+  return { timestamp, gezichten };
+}
+
+// Geeft { event, data } terug in dezelfde vorm als de JSON events, of null bij een onbekend type
+export function decodeerBinair(buffer) {
+  const bytes = buffer instanceof Uint8Array ? buffer : new Uint8Array(buffer);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const type = view.getUint8(0);
+
+  switch (type) {
+    case TYPE_GAZE:
+      return { event: 'gaze_data', data: leesGaze(view, 1) };
+
+    case TYPE_GEZICHTEN: {
+      const lijst = leesGazeLijst(view, 1);
+      return { event: 'gaze_faces', data: { gezichten: lijst.gezichten, timestamp: lijst.timestamp } };
+    }
+
+    case TYPE_BATCH: {
+      const lijst = leesGazeLijst(view, 1);
+      return { event: 'gaze_batch', data: { samples: lijst.gezichten, timestamp: lijst.timestamp } };
+    }
+
+    case TYPE_ASCII:
+    case TYPE_ASCII_RIJEN: {
+      const breedte = view.getUint16(1, true);
+      const hoogte = view.getUint16(3, true);
+      const timestamp = view.getFloat64(5, true);
+      const inhoud = bytes.subarray(1 + ASCII_HEADER_GROOTTE);
+      const data = { width: breedte, height: hoogte, timestamp };
+
+      if (type === TYPE_ASCII_RIJEN) {
+        // Latin-1: een byte is een karakter code
+        data.rows = [];
+        for (let y = 0; y < hoogte; y++) {
+          data.rows.push(String.fromCharCode.apply(null, inhoud.subarray(y * breedte, (y + 1) * breedte)));
+        }
+      } else {
+        data.luminance_data = [];
+        for (let y = 0; y < hoogte; y++) {
+          data.luminance_data.push(inhoud.subarray(y * breedte, (y + 1) * breedte));
+        }
+      }
+      return { event: 'ascii_webcam_frame', data };
+    }
+
+    default:
+      return null;
+  }
+}
@@ -3,6 +3,8 @@
 
 import { FOCUS_ZONE_CONFIG } from '../core/focus_zone_config.js';
 import { afstandTotCentrum } from '../utils/math_utils.js';
+import { ASCIIConfig } from '../tuin/ascii_config.js';
+import { decodeerBinair } from './binaire_codering.js';
 
 export class OogDetectie {
   constructor() {
@@ -20,6 +22,8 @@ export class OogDetectie {
     // Socket connection
     this.socket = null;
     this.backendUrl = 'http://localhost:5001';
+    // 'struct': hoog-frequente events als binaire records in plaats van JSON ('json' om uit te zetten)
+    this.codering = 'struct';
     
     // Prevent duplicate initialization
     this.initialiseerBezig = false;
@@ -29,9 +33,14 @@ export class OogDetectie {
       dataCount: 0,
       lastDataTime: 0,
       isConnected: false,
-      lastGazeData: null
+      lastGazeData: null,
+      kwaliteitNiveau: null
     };
     
+    // Render tijden voor end-to-end latentie (capture -> render), gebundeld verstuurd
+    this.renderRapporten = [];
+    this.renderRapportInterval = null;
+    
 
   }
 
@@ -87,7 +96,7 @@ export class OogDetectie {
       console.log('Verbinden met Python backend op:', this.backendUrl);
       
       // Maak WebSocket verbinding
-      this.socket = io(this.backendUrl);
+      this.socket = io(this.backendUrl, { auth: { encoding: this.codering } });
       
       // Setup event listeners
       this.setupSocketEvents();
@@ -138,6 +147,13 @@ export class OogDetectie {
         confidence: data.confidence || 1.0
       }, data.timestamp || Date.now());
       
+      // Eerstvolgende getekende frame telt als render moment
+      if (data.capture_ms !== undefined) {
+        requestAnimationFrame(() => {
+          this.renderRapporten.push([data.capture_ms, performance.now()]);
+        });
+      }
+      
       // Update debug display
     });
     
@@ -166,6 +182,58 @@ export class OogDetectie {
     
 
     
+    // Klok sync: server meet de offset tussen zijn klok en performance.now()
+    this.socket.on('clock_ping', (data) => {
+      const ontvangen = performance.now();
+      this.socket.emit('clock_pong', {
+        server_ms: data.server_ms,
+        client_ontvangen_ms: ontvangen,
+        client_verzonden_ms: performance.now()
+      });
+    });
+    
+    this.socket.on('latency_stats', (data) => {
+      this.debugInfo.latentie = data;
+    });
+    
+    if (!this.renderRapportInterval) {
+      this.renderRapportInterval = setInterval(() => this.verstuurRenderRapporten(), 1000);
+    }
+    
+    // Kwaliteit niveau van de latentie regelaar (ASCII rate/grid en inferentie resolutie)
+    this.socket.on('quality_level', (data) => {
+      this.debugInfo.kwaliteitNiveau = data;
+      console.log(`Kwaliteit niveau: ${data.naam} (${data.niveau + 1}/${data.aantal_niveaus}), ` +
+                  `ASCII ${data.ascii_breedte}x${data.ascii_hoogte} @ ${data.ascii_fps} FPS`);
+    });
+    
+    // Gaze doelen: server meldt alleen overgangen, als DOM event voor alle componenten
+    ['gaze_enter', 'gaze_leave', 'gaze_dwell'].forEach((naam) => {
+      this.socket.on(naam, (data) => {
+        document.dispatchEvent(new CustomEvent('gazeTarget', { detail: data }));
+      });
+    });
+    
+    // Binaire stream: decoderen en doorgeven aan dezelfde handlers als de JSON events
+    this.socket.on('stream_bin', (buffer) => {
+      const bericht = decodeerBinair(buffer);
+      if (!bericht) return;
+      this.socket.listeners(bericht.event).forEach((handler) => handler(bericht.data));
+    });
+    
+    // Alleen in 'batch' leveringsmodus: meerdere samples met eigen timestamps per event
+    this.socket.on('gaze_batch', (data) => {
+      document.dispatchEvent(new CustomEvent('gazeBatch', { detail: data }));
+    });
+    
+    this.socket.on('delivery_error', (data) => {
+      console.warn('Leveringsmodus geweigerd:', data.error);
+    });
+    
+    this.socket.on('gaze_target_error', (data) => {
+      console.warn(`Gaze doel ${data.id} geweigerd:`, data.error);
+    });
+    
     // Debug preview functionality removed - use standalone debug-camera.bat instead
     
     // Verbindingsstatus updates
@@ -197,13 +265,46 @@ export class OogDetectie {
     });
   }
 
+  // Registreer een element (of rechthoek in viewport pixels) als benoemd gaze doel
+  registreerGazeDoel(id, doel, dwellMs = null) {
+    if (!this.socket || !this.socket.connected) return;
+    const rect = doel instanceof Element ? doel.getBoundingClientRect() : doel;
+    this.socket.emit('register_gaze_target', {
+      id,
+      x: rect.left ?? rect.x,
+      y: rect.top ?? rect.y,
+      width: rect.width,
+      height: rect.height,
+      dwell_ms: dwellMs
+    });
+  }
+  
+  // 'every' (standaard), 'latest' met { hz } of 'batch' met { interval_ms }
+  stelLeveringIn(mode, opties = {}) {
+    if (!this.socket || !this.socket.connected) return;
+    this.socket.emit('set_delivery', { mode, ...opties });
+  }
+  
+  verwijderGazeDoel(id) {
+    if (!this.socket || !this.socket.connected) return;
+    this.socket.emit('remove_gaze_target', { id });
+  }
+
+  verstuurRenderRapporten() {
+    if (!this.socket || !this.socket.connected || this.renderRapporten.length === 0) return;
+    this.socket.emit('render_report', { samples: this.renderRapporten });
+    this.renderRapporten = [];
+  }
+
   startBackendTracking() {
     if (!this.socket) return;
     
     // Verstuur schermresolutie naar backend
     const screenData = {
       screen_width: window.innerWidth,
-      screen_height: window.innerHeight
+      screen_height: window.innerHeight,
+      // Server stuurt ASCII rijen in dit palet in plaats van ruwe luminance
+      ascii_palette: ASCIIConfig.paletten.webcam
     };
     
     console.log('Start eye tracking op backend...', screenData);
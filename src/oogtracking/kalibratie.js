@@ -140,6 +140,14 @@ export class OogKalibratie {
     this.huidigeSamples = 0;
     this.kalibratieData = [];
     
+    // Server verzamelt ruwe gaze samples en fit een polynoom mapping
+    if (this.oogDetectie.socket) {
+      this.oogDetectie.socket.emit('calibration_begin', {
+        screen_width: window.innerWidth,
+        screen_height: window.innerHeight
+      });
+    }
+    
     // Toon overlay en maak cursor zichtbaar
     this.kalibratieOverlay.style.display = 'block';
     this.kalibratieOverlay.focus();
@@ -196,6 +204,14 @@ export class OogKalibratie {
     const oogPositie = this.oogDetectie.krijgHuidigeOogPositie();
     const punt = this.kalibratiePunten[this.kalibratieStap];
     
+    // Server koppelt zijn meest recente ruwe gaze meting aan dit doelpunt
+    if (this.oogDetectie.socket) {
+      this.oogDetectie.socket.emit('calibration_sample', {
+        doel_x: punt.x * window.innerWidth,
+        doel_y: punt.y * window.innerHeight
+      });
+    }
+    
     if (oogPositie && oogPositie.x && oogPositie.y) {
       // Sla kalibratie data op
       this.kalibratieData.push({
@@ -240,6 +256,32 @@ export class OogKalibratie {
     this.statusElement.textContent = 'Kalibratie data verwerken...';
     this.voortgangElement.textContent = 'Berekening van correctie matrix...';
     
+    if (this.oogDetectie.socket) {
+      // Server fit en bewaart het profiel per camera en schermgrootte.
+      // Maar een van beide events komt; de andere listener moet weg, anders vuurt
+      // die later (bijv. een sample fout tijdens de volgende kalibratie).
+      const socket = this.oogDetectie.socket;
+      const opGefit = (profiel) => {
+        socket.off('calibration_error', opFout);
+        this.kalibratieMatrix = { bron: 'server', graad: profiel.graad };
+        this.gemiddeldeAfwijking = profiel.fout_px;
+        this.slaKalibratieDataOp();
+        this.rondKalibratieAf();
+      };
+      const opFout = () => {
+        socket.off('calibration_fitted', opGefit);
+        // Terugval op lokale offset kalibratie
+        this.berekenKalibratieMatrix();
+        this.slaKalibratieDataOp();
+        this.pasKalibratieToe();
+        this.rondKalibratieAf();
+      };
+      socket.once('calibration_fitted', opGefit);
+      socket.once('calibration_error', opFout);
+      socket.emit('calibration_fit');
+      return;
+    }
+    
     // Bereken kalibratie matrix
     this.berekenKalibratieMatrix();
     
@@ -249,6 +291,10 @@ export class OogKalibratie {
     // Pas kalibratie toe op oog detectie
     this.pasKalibratieToe();
     
+    this.rondKalibratieAf();
+  }
+  
+  rondKalibratieAf() {
     // Verstuur event naar hoofdapplicatie
     const kalibratieEvent = new CustomEvent('kalibratieVoltooid', {
       detail: {
@@ -325,6 +371,9 @@ export class OogKalibratie {
   }
   
   pasKalibratieToe() {
+    // Server profielen worden door de backend zelf geladen bij start_tracking
+    if (this.kalibratieMatrix && this.kalibratieMatrix.bron === 'server') return;
+    
     if (this.kalibratieMatrix && this.oogDetectie) {
       // Stuur kalibratie naar Python backend
       if (this.oogDetectie.socket) {
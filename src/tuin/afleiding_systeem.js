@@ -46,10 +46,15 @@ export class AfleidingSysteem {
     this.dashboardContainer = null;
     this.pseudoControls = null;
     
+    // Popups als gaze doelen: de server meldt enter/leave/dwell, de browser test zelf niets
+    this.gazeDoelen = new Map();
+    this.onGazeTarget = (event) => this.handleGazeTarget(event.detail);
+    
     this.initialiseer();
   }
   
   initialiseer() {
+    document.addEventListener('gazeTarget', this.onGazeTarget);
     this.createUIElementen();
     this.startAfleidingCyclus();
     this.startBalanceMonitoring();
@@ -339,8 +344,14 @@ export class AfleidingSysteem {
     popup.style.left = x + '%';
     popup.style.top = y + '%';
     
+    // Registreren als gaze doel; handleGazeTarget verwerkt de events van de server
+    const doelId = `popup-${type}-${Date.now()}`;
+    const oogDetectie = window.focusTuin?.oogDetectie;
+    
     if (this.popupContainer) {
       this.popupContainer.appendChild(popup);
+      this.gazeDoelen.set(doelId, { type, popup });
+      oogDetectie?.registreerGazeDoel(doelId, popup);
       
       // Play popup sound effect
       audioManager.playPopupSound();
@@ -351,6 +362,8 @@ export class AfleidingSysteem {
       if (popup.parentNode) {
         popup.remove();
       }
+      this.gazeDoelen.delete(doelId);
+      oogDetectie?.verwijderGazeDoel(doelId);
     }, 3000 + Math.random() * 4000);
   }
   
@@ -729,6 +742,26 @@ export class AfleidingSysteem {
     console.log(`🎯 Afleiding intensiteit verhoogd`);
   }
   
+  // Gaze doel events van de server (zie OogDetectie.registreerGazeDoel)
+  handleGazeTarget(data) {
+    const doel = data && this.gazeDoelen.get(data.doel);
+    if (!doel) return;
+    
+    switch (data.type) {
+      case 'enter':
+        doel.popup.style.borderColor = '#ffffff';
+        break;
+      case 'leave':
+        doel.popup.style.borderColor = '#ff4444';
+        break;
+      case 'dwell':
+        // Bekeken popup = geoogste aandacht
+        this.cognitieveOogst += 1;
+        this.trackInteraction('popup_gaze_dwell', { type: doel.type, duur_ms: data.duur_ms });
+        break;
+    }
+  }
+  
   // Track user interactions for adaptive behavior
   trackInteraction(type, data = {}) {
     this.performanceMetrics.interactionHistory.push({
@@ -900,6 +933,11 @@ export class AfleidingSysteem {
   cleanup() {
     this.isActief = false;
     
+    document.removeEventListener('gazeTarget', this.onGazeTarget);
+    const oogDetectie = window.focusTuin?.oogDetectie;
+    this.gazeDoelen.forEach((_, doelId) => oogDetectie?.verwijderGazeDoel(doelId));
+    this.gazeDoelen.clear();
+    
     // Clear alle timers
     if (this.popupTimer) clearTimeout(this.popupTimer);
     if (this.surveillanceUpdateTimer) clearInterval(this.surveillanceUpdateTimer);
@@ -42,7 +42,9 @@ export const ASCIIConfig = {
     basis: ' .`\'"^~-_=+<>ilIc/\\|()1{}[]?-~<>i!lI;:,"^`". ',
     focus: ' .,:-=+*xX#@',
     evolutie: ' .,:;+=*xX#@&%',
-    blink: '.*+xoO@#'
+    blink: '.*+xoO@#',
+    // Webcam basislaag; de server kwantiseert hiermee en stuurt kant-en-klare rijen
+    webcam: ' .,;xe$@'
   },
   
   // Focus intensiteit karakters - meer detail niveaus
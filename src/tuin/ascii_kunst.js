@@ -252,45 +252,63 @@ export class ASCIIKunst {
 class WebcamProcessor {
   constructor(parent) {
     this.parent = parent;
-    this.luminancePalette = ' .,;xe$@';
-    this.foundationLayer = [];
+    this.palette = ASCIIConfig.paletten.webcam;
+    this.layer = null;
     this.frameAvailable = false;
   }
   
   initialiseer() {
-    this.foundationLayer = Array(this.parent.canvasHoogte).fill().map(() => 
-      Array(this.parent.canvasBreedte).fill(' ')
-    );
+    this.layer = null;
+    this.frameAvailable = false;
   }
   
   processFrame(frameData) {
-    if (!frameData || !frameData.luminance_data) return;
-    
+    // Server kwantiseert met ASCIIConfig.paletten.webcam; weigert hij het palet dan
+    // komt ruwe luminance en kwantiseren we hier zelf
+    // Eenmaal per ontvangen frame opbouwen; effecten en vervorming werken op een kopie
+    if (frameData && frameData.rows) {
+      this.layer = this.rowsToLayer(frameData.rows);
+    } else if (frameData && frameData.luminance_data) {
+      this.layer = this.luminanceToLayer(frameData.luminance_data);
+    } else {
+      return;
+    }
     this.frameAvailable = true;
-    const newFrame = Array(this.parent.canvasHoogte).fill().map(() => 
-      Array(this.parent.canvasBreedte).fill(' ')
-    );
-    
-    const frameWidth = Math.min(frameData.width, this.parent.canvasBreedte);
-    const frameHeight = Math.min(frameData.height, this.parent.canvasHoogte);
-    
-    for (let y = 0; y < frameHeight; y++) {
-      for (let x = 0; x < frameWidth; x++) {
-        const luminance = frameData.luminance_data[y][x];
-        const charIndex = Math.floor((luminance / 255) * (this.luminancePalette.length - 1));
-        const clampedIndex = Math.max(0, Math.min(this.luminancePalette.length - 1, charIndex));
-        newFrame[y][x] = this.luminancePalette[clampedIndex];
+  }
+  
+  // Grid kan kleiner of groter zijn dan het canvas (kwaliteit niveaus): aanvullen of afkappen
+  rowsToLayer(rows) {
+    const breedte = this.parent.canvasBreedte;
+    const layer = [];
+    for (let y = 0; y < this.parent.canvasHoogte; y++) {
+      const row = y < rows.length ? rows[y] : '';
+      layer.push(row.length === breedte ? row.split('') : row.padEnd(breedte).slice(0, breedte).split(''));
+    }
+    return layer;
+  }
+  
+  luminanceToLayer(luminance) {
+    const breedte = this.parent.canvasBreedte;
+    const maxIndex = this.palette.length - 1;
+    const layer = [];
+    for (let y = 0; y < this.parent.canvasHoogte; y++) {
+      const row = Array(breedte).fill(' ');
+      const bron = y < luminance.length ? luminance[y] : null;
+      const lengte = bron ? Math.min(bron.length, breedte) : 0;
+      for (let x = 0; x < lengte; x++) {
+        // Zelfde afronding als de server LUT
+        row[x] = this.palette[Math.floor((bron[x] / 255) * maxIndex)];
       }
+      layer.push(row);
     }
-    
-    this.foundationLayer = newFrame;
+    return layer;
   }
   
   getFoundationLayer() {
-    if (this.frameAvailable) {
-      return this.foundationLayer.map(row => [...row]);
+    if (!this.frameAvailable) {
+      return this.generateFallbackPattern();
     }
-    return this.generateFallbackPattern();
+    return this.layer;
   }
   
   generateFallbackPattern() {